@@ -0,0 +1,60 @@
+"""
+Micro-benchmarks of ArrayR: allocation against the previous list-filled
+constructor, single-slot reads and writes, and copying a range with
+copy_from or a slice against a loop, for ArrayR and Int64ArrayR.
+
+Run with `python -m benchmarks.bench_array`.
+"""
+from __future__ import annotations
+from ctypes import py_object
+import timeit
+
+from data_structures.referential_array import ArrayR, Int64ArrayR
+
+
+class ListFilledArrayR(ArrayR):
+    """Initialises as ArrayR did before, from a list of Nones."""
+
+    def __init__(self, length: int) -> None:
+        self.array = (length * py_object)()
+        self.array[:] = [None for _ in range(length)]
+
+
+def best(statement, number: int) -> float:
+    """Seconds per run of statement, best of five."""
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number
+
+
+def copy_loop(target: ArrayR, source: ArrayR, n: int) -> None:
+    for i in range(n):
+        target[i] = source[i]
+
+
+def main() -> None:
+    print(f"{'length':>8} {'list-filled ms':>15} {'memmove ms':>11} {'Int64ArrayR ms':>15}")
+    for length in [1000, 100_000, 1_572_869]:
+        number = max(1, 200_000 // length)
+        before = best(lambda: ListFilledArrayR(length), number)
+        after = best(lambda: ArrayR(length), number)
+        typed = best(lambda: Int64ArrayR(length), number)
+        print(f"{length:>8} {before * 1e3:>15.3f} {after * 1e3:>11.3f} {typed * 1e3:>15.3f}")
+
+    length = 100_000
+    print(f"\n{length} slots, ns per slot")
+    print(f"{'operation':<24} {'ArrayR':>8} {'Int64ArrayR':>12}")
+    for name, operation in [
+        ("read", lambda a, b: [a[i] for i in range(length)]),
+        ("write", lambda a, b: [a.__setitem__(i, 1) for i in range(length)]),
+        ("copy loop", lambda a, b: copy_loop(a, b, length)),
+        ("copy slice", lambda a, b: a.__setitem__(slice(0, length), b[0:length])),
+        ("copy_from", lambda a, b: a.copy_from(b, 0, 0, length)),
+    ]:
+        times = []
+        for array_class in [ArrayR, Int64ArrayR]:
+            a, b = array_class(length), array_class(length)
+            times.append(best(lambda: operation(a, b), 3) / length)
+        print(f"{name:<24} {times[0] * 1e9:>8.1f} {times[1] * 1e9:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
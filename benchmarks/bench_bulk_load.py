@@ -0,0 +1,42 @@
+"""
+Loading a batch into LinearProbeTable and DoubleKeyTable one key at a time,
+against `from_items` with and without placing keys in order of position.
+
+Run with `python -m benchmarks.bench_bulk_load [entries]`.
+"""
+from __future__ import annotations
+import sys
+import time
+
+from data_structures.hash_table import LinearProbeTable
+from double_key_table import DoubleKeyTable
+
+
+def one_by_one(table_class, items: list) -> object:
+    table = table_class()
+    for key, value in items:
+        table[key] = value
+    return table
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    double_items = [((f"d{i % 10}", f"mountain-{i}"), i) for i in range(n)]
+    single_items = [(key2, value) for (_, key2), value in double_items]
+    print(f"{n} entries")
+    print(f"{'table':<18} {'one by one s':>13} {'from_items s':>13} {'sorted s':>9}")
+    for name, table_class, items in [("LinearProbeTable", LinearProbeTable, single_items), ("DoubleKeyTable", DoubleKeyTable, double_items)]:
+        times = []
+        for load in [
+            lambda: one_by_one(table_class, items),
+            lambda: table_class.from_items(items),
+            lambda: table_class.from_items(items, sort_by_bucket=True),
+        ]:
+            start = time.perf_counter()
+            load()
+            times.append(time.perf_counter() - start)
+        print(f"{name:<18} {times[0]:>13.2f} {times[1]:>13.2f} {times[2]:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
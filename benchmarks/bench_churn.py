@@ -0,0 +1,64 @@
+"""
+Interleaved deletes and inserts into a LinearProbeTable held at 50% load,
+with backward-shift deletion against the previous deletion, which emptied
+the slot and then hashed and reinserted the rest of the cluster.
+
+Run with `python -m benchmarks.bench_churn [operations]`.
+"""
+from __future__ import annotations
+import random
+import sys
+import time
+
+from data_structures.hash_table import LinearProbeTable
+
+
+class ReinsertingTable(LinearProbeTable):
+    """Deletes as LinearProbeTable did before backward shifting."""
+
+    def _remove_at(self, position: int) -> None:
+        self.array[position] = None
+        self.hashes[position] = 0
+        self.occupied[position] = 0
+        position = (position + 1) % self.table_size
+        while self.array[position] is not None:
+            item = self.array[position]
+            self.array[position] = None
+            self.hashes[position] = 0
+            self.occupied[position] = 0
+            newpos = self._linear_probe(item[0], True)
+            self.array[newpos] = item
+            self.hashes[newpos] = self._hash_key(item[0])[0]
+            self.occupied[newpos] = 1
+            position = (position + 1) % self.table_size
+
+
+def churn(table_class, size: int, operations: int, seed: int = 1008) -> float:
+    """Fills a table of the given size to just under half, then deletes a random key and inserts a new one per operation."""
+    rng = random.Random(seed)
+    table = table_class(sizes=[size])
+    live = [f"mountain-{i}" for i in range(size // 2)]
+    for key in live:
+        table[key] = 0
+    new_keys = [f"peak-{i}" for i in range(operations)]
+    victims = [rng.randrange(len(live)) for _ in range(operations)]
+    start = time.perf_counter()
+    for key, victim in zip(new_keys, victims):
+        del table[live[victim]]
+        table[key] = 0
+        live[victim] = key
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    print(f"{operations} deletes + inserts at 50% load")
+    print(f"{'table size':>10} {'reinsert us/op':>15} {'shift us/op':>12}")
+    for size in [1543, 24593, 196613]:
+        before = churn(ReinsertingTable, size, operations)
+        after = churn(LinearProbeTable, size, operations)
+        print(f"{size:>10} {before / operations * 1e6:>15.2f} {after / operations * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+ColumnarTrail against the linked Trail on a trail with about a million mountains.
+
+Run with `python -m benchmarks.bench_columnar [mountains]`.
+"""
+from __future__ import annotations
+import sys
+import timeit
+
+from benchmarks.trail_generators import wide_trail
+from columnar_trail import ColumnarTrail
+from personality import TopWalker
+
+
+def best(func, repeat: int = 3) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main() -> None:
+    mountains = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    branch_length = 5
+    trail = wide_trail(mountains // (2 * branch_length), branch_length)
+    convert = best(lambda: ColumnarTrail.from_trail(trail), repeat=1)
+    columnar = ColumnarTrail.from_trail(trail)
+    print(f"{len(columnar.names)} mountains, {len(columnar)} nodes, from_trail {convert*1000:.0f} ms")
+
+    cases = [
+        ("collect_all_mountains", lambda: trail.collect_all_mountains(), lambda: columnar.collect_all_mountains()),
+        ("mountain rows only", lambda: trail.collect_all_mountains(), lambda: list(columnar.iter_mountain_rows())),
+        ("path_statistics", lambda: trail.path_statistics(), lambda: columnar.path_statistics()),
+        ("follow_path TopWalker", lambda: trail.follow_path(TopWalker()), lambda: columnar.follow_path(TopWalker())),
+        ("difficulty_maximum_paths", lambda: trail.difficulty_maximum_paths(0), lambda: columnar.difficulty_maximum_paths(0)),
+    ]
+    for name, linked_case, columnar_case in cases:
+        print(f"{name:<28} linked {best(linked_case)*1000:>9.0f} ms   columnar {best(columnar_case)*1000:>9.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Memory and speed of CompactProbeTable (an int index into dense entry arrays)
+against LinearProbeTable (an ArrayR of (key, value) tuples beside an ArrayR
+of hashes), from 10^3 to 10^6 entries.
+
+Run with `python -m benchmarks.bench_compact_table [largest]`.
+"""
+from __future__ import annotations
+import sys
+import time
+import tracemalloc
+
+from data_structures.hash_table import CompactProbeTable, HashTable, LinearProbeTable
+
+
+def build(table_class, keys: list[str]) -> HashTable:
+    table = table_class()
+    for i, key in enumerate(keys):
+        table[key] = i
+    return table
+
+
+def measure(table_class, keys: list[str]) -> tuple[float, float, float, float]:
+    """Returns bytes per entry, and seconds to insert every key, look every key up and list the values."""
+    tracemalloc.start()
+    table = build(table_class, keys)
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del table
+    # Timed apart, as tracing slows allocation down.
+    start = time.perf_counter()
+    table = build(table_class, keys)
+    insert = time.perf_counter() - start
+    start = time.perf_counter()
+    for key in keys:
+        table[key]
+    lookup = time.perf_counter() - start
+    start = time.perf_counter()
+    table.values()
+    values = time.perf_counter() - start
+    return used / len(keys), insert, lookup, values
+
+
+def main() -> None:
+    largest = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"{'entries':>8} {'table':<18} {'bytes/entry':>11} {'insert s':>9} {'lookup s':>9} {'values ms':>10}")
+    n = 1000
+    while n <= largest:
+        # Keep the keys out of the measurement.
+        keys = [f"mountain-{i}" for i in range(n)]
+        for table_class in [LinearProbeTable, CompactProbeTable]:
+            per_entry, insert, lookup, values = measure(table_class, keys)
+            print(f"{n:>8} {table_class.__name__:<18} {per_entry:>11.1f} {insert:>9.3f} {lookup:>9.3f} {values * 1e3:>10.2f}")
+        n *= 10
+
+
+if __name__ == "__main__":
+    main()
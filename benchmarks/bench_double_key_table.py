@@ -0,0 +1,126 @@
+"""
+Inserts and lookups in DoubleKeyTable, against the previous layout in which
+every top-level slot held an ArrayR of (key1, key2, value) tuples and all of
+the internal arrays were resized in lockstep with the top level.
+
+The lockstep layout holds (top size) x (internal size) slots, so it is only
+run while that stays small; DoubleKeyTable is run up to the 1 million entry limit.
+
+Run with `python -m benchmarks.bench_double_key_table [max entries]`.
+"""
+from __future__ import annotations
+import sys
+import time
+
+from data_structures.referential_array import ArrayR
+from double_key_table import DoubleKeyTable
+
+
+class LockstepTable:
+    """The previous layout, with its bugs fixed so that it can be measured."""
+
+    TABLE_SIZES = DoubleKeyTable.TABLE_SIZES
+    HASH_BASE = DoubleKeyTable.HASH_BASE
+
+    def __init__(self) -> None:
+        self.size_index = 0
+        self.count = 0
+        self._new_arrays()
+
+    def _new_arrays(self) -> None:
+        size = self.TABLE_SIZES[self.size_index]
+        # The top level, with the key1 and number of entries of each internal array.
+        self.keys1 = ArrayR(size)
+        self.counts = ArrayR(size)
+        self.array = ArrayR(size)
+        for i in range(size):
+            self.array[i] = ArrayR(size)
+            self.counts[i] = 0
+        self.top_count = 0
+
+    hash = DoubleKeyTable.hash1
+
+    @property
+    def table_size(self) -> int:
+        return len(self.array)
+
+    def _probe(self, key1: str, key2: str, is_insert: bool) -> tuple[int, int]:
+        size = self.table_size
+        top = self.hash(key1)
+        while self.keys1[top] is not None and self.keys1[top] != key1:
+            top = (top + 1) % size
+        if self.keys1[top] is None:
+            if not is_insert:
+                raise KeyError(key1, key2)
+            self.keys1[top] = key1
+            self.top_count += 1
+        inner = self.array[top]
+        position = self.hash(key2)
+        while inner[position] is not None:
+            if inner[position][1] == key2:
+                return top, position
+            position = (position + 1) % size
+        if not is_insert:
+            raise KeyError(key1, key2)
+        return top, position
+
+    def __setitem__(self, key: tuple[str, str], value: object) -> None:
+        top, position = self._probe(key[0], key[1], True)
+        inner = self.array[top]
+        if inner[position] is None:
+            self.count += 1
+            self.counts[top] += 1
+        inner[position] = (key[0], key[1], value)
+        if self.counts[top] > self.table_size / 2 or self.top_count > self.table_size / 2:
+            self._rehash()
+
+    def __getitem__(self, key: tuple[str, str]) -> object:
+        top, position = self._probe(key[0], key[1], False)
+        return self.array[top][position][2]
+
+    def _rehash(self) -> None:
+        """Grows the top level and every internal array together."""
+        old = self.array
+        self.size_index += 1
+        self._new_arrays()
+        self.count = 0
+        for inner in old:
+            for item in inner:
+                if item is not None:
+                    self[item[0], item[1]] = item[2]
+
+
+def keys(n: int) -> list[tuple[str, str]]:
+    """n key pairs, spread over up to 10 top-level keys like the difficulty levels in main.py."""
+    return [(f"d{i % 10}", f"mountain-{i}") for i in range(n)]
+
+
+def run(table_class, pairs: list[tuple[str, str]]) -> tuple[float, float]:
+    table = table_class()
+    start = time.perf_counter()
+    for i, pair in enumerate(pairs):
+        table[pair] = i
+    inserted = time.perf_counter()
+    for pair in pairs:
+        table[pair]
+    looked_up = time.perf_counter()
+    return inserted - start, looked_up - inserted
+
+
+def main() -> None:
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"{'entries':>9} {'layout':<16} {'insert us/op':>13} {'lookup us/op':>13}")
+    n = 1_000
+    while n <= limit:
+        pairs = keys(n)
+        layouts = [("DoubleKeyTable", DoubleKeyTable)]
+        if n <= 10_000:
+            layouts.append(("lockstep", LockstepTable))
+        for name, table_class in layouts:
+            insert, lookup = run(table_class, pairs)
+            print(f"{n:>9} {name:<16} {insert / n * 1e6:>13.2f} {lookup / n * 1e6:>13.2f}")
+        n *= 10
+
+
+if __name__ == "__main__":
+    main()
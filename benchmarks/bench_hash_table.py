@@ -0,0 +1,38 @@
+"""
+Insert latency of LinearProbeTable, resizing all at once against
+incrementally. The worst insert is the one which crosses a TABLE_SIZES
+boundary in the first case.
+
+Run with `python -m benchmarks.bench_hash_table [entries]`.
+"""
+from __future__ import annotations
+import sys
+import time
+
+from data_structures.hash_table import LinearProbeTable
+
+
+def insert_latencies(table: LinearProbeTable, keys: list[str]) -> list[float]:
+    latencies = []
+    clock = time.perf_counter
+    for i, key in enumerate(keys):
+        start = clock()
+        table[key] = i
+        latencies.append(clock() - start)
+    return latencies
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    keys = [f"mountain-{i}" for i in range(n)]
+    print(f"{n} inserts")
+    print(f"{'rehash':<12} {'total s':>8} {'mean us':>8} {'p99.9 us':>9} {'max ms':>8}")
+    for name, incremental in [("all at once", False), ("incremental", True)]:
+        latencies = insert_latencies(LinearProbeTable(incremental=incremental), keys)
+        ordered = sorted(latencies)
+        total = sum(latencies)
+        print(f"{name:<12} {total:>8.2f} {total / n * 1e6:>8.2f} {ordered[int(n * 0.999)] * 1e6:>9.1f} {ordered[-1] * 1e3:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
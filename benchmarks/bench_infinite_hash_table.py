@@ -0,0 +1,113 @@
+"""
+Memory and speed of InfiniteHashTable, which keeps only the positions in use
+at each level, against tables of a full TABLE_SIZE slot ArrayR per level.
+
+Reads one word per line from the given file (such as /usr/share/dict/words),
+or makes up English-like words when there is none.
+
+Run with `python -m benchmarks.bench_infinite_hash_table [words file] [count]`.
+"""
+from __future__ import annotations
+import random
+import sys
+import time
+import tracemalloc
+
+from data_structures.referential_array import ArrayR
+from infinite_hash_table import InfiniteHashTable
+
+
+ONSETS = ["", "b", "bl", "br", "c", "ch", "cl", "cr", "d", "dr", "f", "fl", "g", "gr", "h", "j", "k", "l", "m", "n", "p", "pl", "pr", "qu", "r", "s", "sh", "sl", "st", "t", "th", "tr", "v", "w", "wh", "y", "z"]
+VOWELS = ["a", "e", "i", "o", "u", "ai", "ea", "ee", "ie", "oa", "ou", "y"]
+CODAS = ["", "", "b", "ck", "d", "ft", "g", "l", "ll", "m", "n", "nd", "ng", "nt", "p", "r", "rd", "s", "ss", "st", "t", "x"]
+SUFFIXES = ["", "", "", "s", "ed", "er", "ing", "ly", "ness", "tion", "able"]
+
+
+def made_up_words(count: int, seed: int = 1008) -> list[str]:
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < count:
+        syllables = rng.choice([1, 2, 2, 3, 3, 4])
+        words.add("".join(rng.choice(ONSETS) + rng.choice(VOWELS) + rng.choice(CODAS) for _ in range(syllables)) + rng.choice(SUFFIXES))
+    return list(words)
+
+
+class FullTable:
+    """A level of the table with a TABLE_SIZE slot ArrayR, holding (key, value) pairs or the next level."""
+
+    TABLE_SIZE = InfiniteHashTable.TABLE_SIZE
+
+    def __init__(self, level: int = 0) -> None:
+        self.level = level
+        self.array = ArrayR(self.TABLE_SIZE)
+
+    def hash(self, key: str) -> int:
+        if self.level < len(key):
+            return ord(key[self.level]) % (self.TABLE_SIZE-1)
+        return self.TABLE_SIZE-1
+
+    def __setitem__(self, key: str, value) -> None:
+        table = self
+        while True:
+            position = table.hash(key)
+            item = table.array[position]
+            if item is None or (isinstance(item, tuple) and item[0] == key):
+                table.array[position] = (key, value)
+                return
+            if isinstance(item, tuple):
+                following = FullTable(table.level + 1)
+                following.array[following.hash(item[0])] = item
+                table.array[position] = following
+                item = following
+            table = item
+
+    def __getitem__(self, key: str):
+        table = self
+        while True:
+            item = table.array[table.hash(key)]
+            if isinstance(item, tuple) and item[0] == key:
+                return item[1]
+            if not isinstance(item, FullTable):
+                raise KeyError(key)
+            table = item
+
+
+def measure(table_class, words: list[str]) -> tuple[float, float, float]:
+    """Returns bytes per word, and seconds to insert and to look up every word."""
+    tracemalloc.start()
+    table = table_class()
+    for i, word in enumerate(words):
+        table[word] = i
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del table
+    # Timed apart, as tracing slows allocation down.
+    start = time.perf_counter()
+    table = table_class()
+    for i, word in enumerate(words):
+        table[word] = i
+    insert = time.perf_counter() - start
+    start = time.perf_counter()
+    for word in words:
+        table[word]
+    lookup = time.perf_counter() - start
+    return used / len(words), insert, lookup
+
+
+def main() -> None:
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as file:
+            words = list(dict.fromkeys(line.strip().lower() for line in file if line.strip()))
+    else:
+        words = made_up_words(200_000)
+    if len(sys.argv) > 2:
+        words = words[:int(sys.argv[2])]
+    print(f"{len(words)} words")
+    print(f"{'table':<18} {'bytes/word':>10} {'insert s':>9} {'lookup s':>9}")
+    for name, table_class in [("full levels", FullTable), ("bitmap levels", InfiniteHashTable)]:
+        per_word, insert, lookup = measure(table_class, words)
+        print(f"{name:<18} {per_word:>10.1f} {insert:>9.2f} {lookup:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
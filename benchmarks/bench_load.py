@@ -0,0 +1,58 @@
+"""
+Load time of a generated trail saved as JSON and in the binary format.
+
+Run with `python -m benchmarks.bench_load [nodes]`.
+"""
+from __future__ import annotations
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.trail_generators import wide_trail
+from serialize import serialize_file, deserialize_file
+from binary_trail import serialize_binary, load_binary
+from personality import TopWalker
+
+
+def timed(func):
+    start = time.perf_counter()
+    res = func()
+    return res, time.perf_counter() - start
+
+
+def main() -> None:
+    nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    branch_length = 5
+    # Each split brings 2 branches of branch_length series, each series a mountain and 2 trails.
+    trail = wide_trail(max(1, nodes // (2 * branch_length * 3 + 6)), branch_length)
+    directory = tempfile.mkdtemp()
+    json_path = os.path.join(directory, "trail.json")
+    binary_path = os.path.join(directory, "trail.trail")
+    with open(json_path, "w") as f:
+        serialize_file(trail, f)
+    with open(binary_path, "wb") as f:
+        serialize_binary(trail, f)
+    del trail
+    print(f"JSON {os.path.getsize(json_path) / 1e6:.1f} MB, binary {os.path.getsize(binary_path) / 1e6:.1f} MB")
+
+    def load_json():
+        with open(json_path) as f:
+            return deserialize_file(f)
+    linked, json_time = timed(load_json)
+    del linked
+    columnar, map_time = timed(lambda: load_binary(binary_path))
+    _, walk_time = timed(lambda: columnar.trail().follow_path(TopWalker()))
+    _, full_time = timed(lambda: columnar.to_trail())
+    print(f"JSON deserialize_file           {json_time * 1000:>9.1f} ms")
+    print(f"binary load_binary (mmap)       {map_time * 1000:>9.1f} ms")
+    print(f"  + lazy TopWalker walk         {walk_time * 1000:>9.1f} ms")
+    print(f"  + full to_trail               {full_time * 1000:>9.1f} ms")
+    del columnar
+    os.remove(json_path)
+    os.remove(binary_path)
+    os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Bytes per node of the slotted trail classes, against the same
+dataclasses with a per-instance __dict__ (the layout before slots).
+
+Run with `python -m benchmarks.bench_memory`.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+import tracemalloc
+
+from mountain import Mountain
+from trail import Trail, TrailSeries, TrailSplit
+
+
+@dataclass
+class DictMountain:
+    name: str
+    difficulty_level: int
+    length: int
+
+@dataclass
+class DictTrail:
+    store: object = None
+
+@dataclass
+class DictTrailSeries:
+    mountain: object
+    following: object
+
+@dataclass
+class DictTrailSplit:
+    top: object
+    bottom: object
+    following: object
+
+
+def build(names: list[str], mountain_class, trail_class, series_class, split_class) -> tuple[object, int]:
+    """Builds a series (with its own mountain and trail) per name and a split every second one, returning the node count."""
+    trail = trail_class(None)
+    nodes = 1
+    for i in range(len(names)):
+        trail = trail_class(series_class(mountain_class(names[i], i % 10, i % 7), trail))
+        nodes += 3
+        if i % 2:
+            trail = trail_class(split_class(trail_class(None), trail_class(None), trail))
+            nodes += 4
+    return trail, nodes
+
+
+def measure(n: int, *classes) -> float:
+    # Keep the mountain names out of the measurement.
+    names = [f"m{i}" for i in range(n)]
+    tracemalloc.start()
+    trail, nodes = build(names, *classes)
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return used / nodes
+
+
+def main() -> None:
+    n = 200_000
+    before = measure(n, DictMountain, DictTrail, DictTrailSeries, DictTrailSplit)
+    after = measure(n, Mountain, Trail, TrailSeries, TrailSplit)
+    print(f"__dict__ nodes {before:>8.1f} bytes/node")
+    print(f"slotted nodes  {after:>8.1f} bytes/node  ({after / before:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+`Trail.difficulty_difference_paths` against brute-force enumeration
+(every path is built, then its min/max difficulty checked) on random trails.
+
+Run with `python -m benchmarks.bench_paths`.
+"""
+from __future__ import annotations
+import timeit
+
+from benchmarks.trail_generators import random_trail
+from trail import Trail, TrailSeries
+
+
+def all_paths(trail: Trail, after: list[Trail]) -> list[list]:
+    """Every path through trail followed by each trail in after, without any pruning."""
+    store = trail.store
+    if store is None:
+        if not after:
+            return [[]]
+        return all_paths(after[0], after[1:])
+    if isinstance(store, TrailSeries):
+        return [[store.mountain] + path for path in all_paths(store.following, after)]
+    return all_paths(store.top, [store.following] + after) + all_paths(store.bottom, [store.following] + after)
+
+
+def brute_force_difference_paths(trail: Trail, max_difference: int) -> list[list]:
+    res = []
+    for path in all_paths(trail, []):
+        difficulties = [mountain.difficulty_level for mountain in path]
+        if not difficulties or max(difficulties) - min(difficulties) <= max_difference:
+            res.append(path)
+    return res
+
+
+def main() -> None:
+    for splits in (10, 12, 14, 16, 18, 20):
+        for max_difference in (4, 7, 10):
+            trail = random_trail(splits, seed=splits)
+            expected = brute_force_difference_paths(trail, max_difference)
+            actual = trail.difficulty_difference_paths(max_difference)
+            key = lambda path: [mountain.name for mountain in path]
+            assert sorted(map(key, expected)) == sorted(map(key, actual))
+            brute = min(timeit.repeat(lambda: brute_force_difference_paths(trail, max_difference), number=1, repeat=3))
+            pruned = min(timeit.repeat(lambda: trail.difficulty_difference_paths(max_difference), number=1, repeat=3))
+            print(f"{splits:>3} splits  max_difference {max_difference}  {len(actual):>7} paths  brute force {brute*1000:>9.2f} ms  pruned {pruned*1000:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Probe lengths of LinearProbeTable with and without Robin Hood insertion, for
+mountain names sharing long prefixes, and the time taken by lookups of names
+which are not in the table.
+
+Run with `python -m benchmarks.bench_probe_lengths [entries]`.
+"""
+from __future__ import annotations
+import sys
+import time
+
+from data_structures.hash_table import LinearProbeTable
+
+
+PREFIXES = ["Mount ", "Mount Saint ", "Pic du ", "Cerro "]
+
+
+def names(n: int, tag: str) -> list[str]:
+    return [f"{PREFIXES[i % len(PREFIXES)]}{tag}{i}" for i in range(n)]
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 49_000
+    present, missing = names(n, "A-"), names(n, "B-")
+    print(f"{n} names, table at load ~{n / 98317:.2f} for the default sizes")
+    print(f"{'insertion':<12} {'mean probe':>10} {'max probe':>10} {'miss us/op':>11}")
+    for name, robin_hood in [("linear", False), ("robin hood", True)]:
+        table = LinearProbeTable(robin_hood=robin_hood)
+        for i, key in enumerate(present):
+            table[key] = i
+        stats = table.probe_statistics()
+        start = time.perf_counter()
+        for key in missing:
+            key in table
+        miss = (time.perf_counter() - start) / n
+        print(f"{name:<12} {stats.mean_probe_length:>10.3f} {stats.max_probe_length:>10} {miss * 1e6:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Throughput of `Trail.follow_path` on deep and wide synthetic trails,
+and of `Trail.follow_paths` against one `follow_path` per walker.
+
+Run with `python -m benchmarks.bench_traversal`.
+"""
+from __future__ import annotations
+import timeit
+
+from benchmarks.trail_generators import deep_trail, wide_trail, series_trail
+from personality import TopWalker, BottomWalker, LazyWalker
+
+
+def bench(name: str, trail, walker_class, repeat: int = 5) -> None:
+    def run():
+        trail.follow_path(walker_class())
+    best = min(timeit.repeat(run, number=1, repeat=repeat))
+    walker = walker_class()
+    trail.follow_path(walker)
+    rate = len(walker.mountains) / best if best > 0 else float("inf")
+    print(f"{name:<28}{walker_class.__name__:<14}{len(walker.mountains):>10} mountains {best*1000:>10.2f} ms {rate:>14,.0f} mountains/s")
+
+
+def bench_batch(name: str, trail, walker_count: int, repeat: int = 3) -> None:
+    walker_classes = [TopWalker, BottomWalker, LazyWalker]
+    def make_walkers():
+        return [walker_classes[i % len(walker_classes)]() for i in range(walker_count)]
+    def run_each():
+        for walker in make_walkers():
+            trail.follow_path(walker)
+    def run_batch():
+        trail.follow_paths(make_walkers())
+    each = min(timeit.repeat(run_each, number=1, repeat=repeat))
+    batch = min(timeit.repeat(run_batch, number=1, repeat=repeat))
+    print(f"{name:<28}{walker_count:>6} walkers  each {each*1000:>10.2f} ms  batched {batch*1000:>10.2f} ms")
+
+
+def main() -> None:
+    trails = [
+        ("series 100000", series_trail(100_000)),
+        ("deep 50000 splits", deep_trail(50_000)),
+        ("wide 20000 splits", wide_trail(20_000)),
+    ]
+    for name, trail in trails:
+        for walker_class in (TopWalker, BottomWalker, LazyWalker):
+            bench(name, trail, walker_class)
+    for name, trail in trails[1:]:
+        bench_batch(name, trail, 30)
+
+
+if __name__ == "__main__":
+    main()
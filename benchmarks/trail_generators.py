@@ -0,0 +1,73 @@
+"""
+Synthetic trails used by the benchmarks.
+
+Every generator builds its trail bottom-up with plain loops, so the
+depth of the result is not limited by the recursion limit.
+"""
+from __future__ import annotations
+import random
+
+from mountain import Mountain
+from trail import Trail, TrailSeries, TrailSplit
+
+
+def series_trail(n: int, following: Trail|None=None) -> Trail:
+    """A straight line of n mountains, then `following` (an empty trail by default)."""
+    trail = following if following is not None else Trail(None)
+    for i in range(n - 1, -1, -1):
+        trail = Trail(TrailSeries(Mountain(f"s{i}", i % 10, i % 7), trail))
+    return trail
+
+
+def deep_trail(depth: int) -> Trail:
+    """
+    `depth` splits nested inside each other's top branch.
+    Every split has a single mountain on the bottom and following branches.
+    """
+    trail = Trail(TrailSeries(Mountain("peak", 5, 5), Trail(None)))
+    for i in range(depth):
+        trail = Trail(TrailSplit(
+            trail,
+            Trail(TrailSeries(Mountain(f"b{i}", i % 10, 1), Trail(None))),
+            Trail(TrailSeries(Mountain(f"f{i}", i % 10, 2), Trail(None))),
+        ))
+    return trail
+
+
+def wide_trail(width: int, branch_length: int = 3) -> Trail:
+    """`width` splits one after the other, each branch holding a short series."""
+    trail = Trail(None)
+    for i in range(width):
+        trail = Trail(TrailSplit(
+            series_trail(branch_length),
+            series_trail(branch_length),
+            trail,
+        ))
+    return trail
+
+
+def random_trail(splits: int, seed: int = 0, max_difficulty: int = 10) -> Trail:
+    """
+    A trail with exactly `splits` splits, placed at random positions
+    in the top/bottom/following slots of one another.
+    """
+    rng = random.Random(seed)
+    mountain_count = 0
+
+    def mountains(trail: Trail) -> Trail:
+        nonlocal mountain_count
+        for _ in range(rng.randint(0, 2)):
+            mountain_count += 1
+            trail = Trail(TrailSeries(
+                Mountain(f"m{mountain_count}", rng.randint(0, max_difficulty), rng.randint(1, 10)),
+                trail,
+            ))
+        return trail
+
+    pieces = [mountains(Trail(None)) for _ in range(splits * 2 + 1)]
+    for _ in range(splits):
+        top = pieces.pop(rng.randrange(len(pieces)))
+        bottom = pieces.pop(rng.randrange(len(pieces)))
+        following = pieces.pop(rng.randrange(len(pieces)))
+        pieces.append(mountains(Trail(TrailSplit(top, bottom, following))))
+    return pieces[0]
@@ -0,0 +1,128 @@
+"""
+Binary trail files.
+
+A compact alternative to the JSON files written by serialize.py: the columns of a
+ColumnarTrail, written one after the other, plus a table of mountain names.
+Loading memory-maps the file and views the columns in place, so nothing is
+parsed or copied up front; Trail objects are only built as they are inspected.
+
+Layout (little-endian, every section 8-byte aligned):
+
+    header           magic b"TRLB", version, node count N, mountain count M, string bytes S, root
+    int64[N] x 4     mountain, top, bottom, following
+    int64[M] x 2     difficulty_level, length
+    int64[M+1]       offset of each name in the string table (and the end of the last one)
+    int8[N]          kind, padded to a multiple of 8
+    bytes[S]         string table, names encoded as UTF-8
+"""
+from __future__ import annotations
+from array import array
+import mmap
+import struct
+import sys
+from typing import IO
+
+from trail import Trail, LazyTrail
+from columnar_trail import ColumnarTrail
+
+MAGIC = b"TRLB"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sIqqqq")
+
+
+class _NameTable:
+    """The mountain names of a loaded file, decoded when accessed."""
+
+    def __init__(self, strings: memoryview, offsets) -> None:
+        self.strings = strings
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        return str(self.strings[self.offsets[index]:self.offsets[index + 1]], "utf-8")
+
+
+def _padding(size: int) -> bytes:
+    return bytes(-size % 8)
+
+def _int64s(column) -> array:
+    """The column as little-endian int64s."""
+    res = array('q', column)
+    if sys.byteorder == "big":
+        res.byteswap()
+    return res
+
+def serialize_binary(trail: Trail|ColumnarTrail, f: IO[bytes]) -> None:
+    """
+    Writes trail to the binary file object f.
+
+    :complexity: O(N + C) where N is the number of nodes and C the number of characters in names.
+    """
+    columnar = trail if isinstance(trail, ColumnarTrail) else ColumnarTrail.from_trail(trail)
+    encoded = [name.encode("utf-8") for name in columnar.names]
+    offsets = array('q', [0])
+    for name in encoded:
+        offsets.append(offsets[-1] + len(name))
+    strings = b"".join(encoded)
+
+    f.write(_HEADER.pack(MAGIC, VERSION, len(columnar), len(columnar.names), len(strings), columnar.root))
+    for column in (columnar.mountain, columnar.top, columnar.bottom, columnar.following,
+                   columnar.difficulty_level, columnar.length, offsets):
+        f.write(_int64s(column))
+    f.write(bytes(array('b', columnar.kind)))
+    f.write(_padding(len(columnar)))
+    f.write(strings)
+
+def load_binary(path: str) -> ColumnarTrail:
+    """
+    Memory-maps the binary trail file at path and returns a read-only ColumnarTrail
+    viewing its columns in place. The file stays mapped while the result is in use.
+
+    :raises ValueError: when the file is not a binary trail file of a known version.
+    :complexity: O(1), as no node is read until it is accessed.
+    """
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(data)
+    if len(view) < _HEADER.size:
+        raise ValueError(f"{path} is not a binary trail file")
+    magic, version, nodes, mountains, string_bytes, root = _HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a binary trail file")
+    if version != VERSION:
+        raise ValueError(f"{path} has unsupported binary trail version {version}")
+    expected = _HEADER.size + 8 * (4 * nodes + 3 * mountains + 1) + nodes + len(_padding(nodes)) + string_bytes
+    if len(view) != expected:
+        raise ValueError(f"{path} is truncated or corrupt")
+
+    pos = _HEADER.size
+    def take(count: int, item_size: int, typecode: str):
+        nonlocal pos
+        section = view[pos:pos + count * item_size]
+        pos += count * item_size
+        if typecode == "q" and sys.byteorder == "big":
+            # Views are in native order, so big-endian machines get a swapped copy.
+            res = array('q', bytes(section))
+            res.byteswap()
+            return res
+        return section.cast(typecode)
+
+    mountain, top, bottom, following = (take(nodes, 8, "q") for _ in range(4))
+    difficulty_level, length = (take(mountains, 8, "q") for _ in range(2))
+    offsets = take(mountains + 1, 8, "q")
+    kind = take(nodes, 1, "b")
+    pos += len(_padding(nodes))
+    strings = take(string_bytes, 1, "B")
+    return ColumnarTrail.from_columns(
+        kind, mountain, top, bottom, following,
+        _NameTable(strings, offsets), difficulty_level, length, root,
+    )
+
+def deserialize_binary(path: str) -> LazyTrail:
+    """Returns the trail saved in the binary file at path, built only as far as it is inspected."""
+    return load_binary(path).trail()
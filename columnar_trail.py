@@ -0,0 +1,435 @@
+"""
+Columnar trails.
+
+A ColumnarTrail stores a whole trail as parallel integer arrays: a node table
+(kind, mountain, top, bottom, following) and a mountain table (name,
+difficulty_level, length). Nodes are numbered so that every child comes before
+its parent, which turns the bottom-up passes of `Trail` into a single loop.
+
+The integer columns are `array.array`s, so they are unboxed and expose the
+buffer protocol (e.g. `numpy.frombuffer(columnar.difficulty_level, dtype=numpy.int64)`
+is a zero-copy view) for bulk analytics.
+"""
+from __future__ import annotations
+from array import array
+from fractions import Fraction
+from typing import TYPE_CHECKING, Iterator
+
+from mountain import Mountain
+from trail import Trail, TrailSeries, TrailSplit, TrailStore, LazyTrail, PathStatistics, PendingChains, EMPTY_RANGE, EMPTY_RANGES, combine_ranges
+from personality_decision import PersonalityDecision
+from data_structures.linked_stack import LinkedStack
+# Avoid circular imports for typing.
+if TYPE_CHECKING:
+    from personality import WalkerPersonality
+
+
+class ColumnarTrail:
+    """
+    Array-backed trail.
+
+    Mountains handed out (by `get_mountain`, `follow_path`, the path methods...)
+    are built once per row of the mountain table, when first needed, and then
+    shared, as a linked trail shares them. Changing one does not change the table.
+    `get_mountain` builds only the row asked for, so a lazy view of a loaded file
+    reads only the mountains it reaches; the bulk methods build every row at once.
+
+    Unless stated otherwise, all methods have O(1) complexity.
+    """
+
+    EMPTY = 0
+    SERIES = 1
+    SPLIT = 2
+
+    NO_NODE = -1
+
+    def __init__(self) -> None:
+        # Node table.
+        self.kind = array('b')
+        self.mountain = array('q')
+        self.top = array('q')
+        self.bottom = array('q')
+        self.following = array('q')
+        # Mountain table.
+        self.names: list[str] = []
+        self.difficulty_level = array('q')
+        self.length = array('q')
+        # Mountain objects for the first rows of the mountain table, None for those not built yet.
+        self._mountains: list[Mountain|None] = []
+        # Number of Nones in _mountains.
+        self._missing = 0
+        # Every empty trail is this node.
+        self.empty = self._add_node(self.EMPTY)
+        self.root = self.empty
+
+    @classmethod
+    def from_columns(cls, kind, mountain, top, bottom, following, names, difficulty_level, length, root: int) -> ColumnarTrail:
+        """
+        Returns a ColumnarTrail over existing columns, without copying them.
+        Any indexable sequences will do, e.g. memoryviews of a loaded file, in which case
+        the trail is read-only. Node 0 must be the empty trail, and children must come before parents.
+        """
+        res = cls.__new__(cls)
+        res.kind, res.mountain, res.top, res.bottom, res.following = kind, mountain, top, bottom, following
+        res.names, res.difficulty_level, res.length = names, difficulty_level, length
+        res._mountains = []
+        res._missing = 0
+        res.empty = 0
+        res.root = root
+        return res
+
+    def __len__(self) -> int:
+        """Returns the number of nodes."""
+        return len(self.kind)
+
+    def _add_node(self, kind: int, mountain: int = NO_NODE, top: int = NO_NODE, bottom: int = NO_NODE, following: int = NO_NODE) -> int:
+        self.kind.append(kind)
+        self.mountain.append(mountain)
+        self.top.append(top)
+        self.bottom.append(bottom)
+        self.following.append(following)
+        return len(self.kind) - 1
+
+    def add_mountain(self, name: str, difficulty_level: int, length: int) -> int:
+        """Adds a row to the mountain table and returns its index."""
+        self.names.append(name)
+        self.difficulty_level.append(difficulty_level)
+        self.length.append(length)
+        return len(self.names) - 1
+
+    def add_series(self, mountain: int, following: int) -> int:
+        """Adds a node for mountain index `mountain` followed by node `following`, returning its index."""
+        return self._add_node(self.SERIES, mountain=mountain, following=following)
+
+    def add_split(self, top: int, bottom: int, following: int) -> int:
+        """Adds a node splitting into nodes `top` and `bottom` then `following`, returning its index."""
+        return self._add_node(self.SPLIT, top=top, bottom=bottom, following=following)
+
+    def _mountain_slots(self) -> list[Mountain|None]:
+        """
+        Returns the Mountains built so far, with a None for every other row of the mountain table.
+
+        :complexity: O(M) for M rows added since the last call, O(1) otherwise.
+        """
+        mountains = self._mountains
+        if len(mountains) < len(self.names):
+            self._missing += len(self.names) - len(mountains)
+            mountains.extend([None] * (len(self.names) - len(mountains)))
+        return mountains
+
+    def _mountain_list(self) -> list[Mountain]:
+        """
+        Returns the Mountain of every row of the mountain table, building those not built yet.
+        Only for the bulk methods, which hand out most rows anyway.
+
+        :complexity: O(M) for M rows not built yet, O(1) otherwise.
+        """
+        mountains = self._mountain_slots()
+        if self._missing:
+            names, difficulty_level, length = self.names, self.difficulty_level, self.length
+            for row, mountain in enumerate(mountains):
+                if mountain is None:
+                    mountains[row] = Mountain(names[row], difficulty_level[row], length[row])
+            self._missing = 0
+        return mountains
+
+    def get_mountain(self, index: int) -> Mountain:
+        """Returns the Mountain for row `index` of the mountain table, building only that row."""
+        mountains = self._mountain_slots()
+        mountain = mountains[index]
+        if mountain is None:
+            mountain = mountains[index] = Mountain(self.names[index], self.difficulty_level[index], self.length[index])
+            self._missing -= 1
+        return mountain
+
+    # Conversions
+
+    @classmethod
+    def from_trail(cls, trail: Trail) -> ColumnarTrail:
+        """
+        Returns the columnar form of a linked trail.
+        Trail and Mountain objects shared within the trail are stored once.
+
+        :complexity: O(N) where N is the number of nodes in the trail.
+        """
+        res = cls()
+        mountain_rows: dict[int, int] = {}
+
+        def series(mountain: Mountain, following: int) -> int:
+            row = mountain_rows.get(id(mountain))
+            if row is None:
+                row = res.add_mountain(mountain.name, mountain.difficulty_level, mountain.length)
+                mountain_rows[id(mountain)] = row
+            return res.add_series(row, following)
+
+        res.root = trail._fold(res.empty, series, res.add_split)[id(trail)]
+        return res
+
+    def to_trail(self, node: int|None = None) -> Trail:
+        """
+        Returns the linked trail for `node` (the root by default).
+        Nodes and mountains stored once are shared in the result.
+
+        :complexity: O(N + M) where N is the number of nodes and M of mountains.
+        """
+        if node is None:
+            node = self.root
+        mountains = self._mountain_list()
+        trails: list[Trail] = []
+        for i in range(node + 1):
+            kind = self.kind[i]
+            if kind == self.EMPTY:
+                trails.append(Trail(None))
+            elif kind == self.SERIES:
+                trails.append(Trail(TrailSeries(mountains[self.mountain[i]], trails[self.following[i]])))
+            else:
+                trails.append(Trail(TrailSplit(trails[self.top[i]], trails[self.bottom[i]], trails[self.following[i]])))
+        return trails[node]
+
+    def trail(self, node: int|None = None) -> LazyTrail:
+        """Returns a lazy linked view of `node` (the root by default), built only as far as it is inspected."""
+        if node is None:
+            node = self.root
+        return ColumnarBranch(self, node)
+
+    def _store(self, node: int) -> TrailStore:
+        kind = self.kind[node]
+        if kind == self.EMPTY:
+            return None
+        if kind == self.SERIES:
+            return TrailSeries(self.get_mountain(self.mountain[node]), ColumnarBranch(self, self.following[node]))
+        return TrailSplit(ColumnarBranch(self, self.top[node]), ColumnarBranch(self, self.bottom[node]), ColumnarBranch(self, self.following[node]))
+
+    # Trail methods
+
+    def follow_path(self, personality: WalkerPersonality) -> None:
+        """
+        Follow a path from the root and add mountains according to a personality.
+        Branches are offered to the personality as lazy trails, whose stores are
+        only built if the personality looks at them.
+
+        :complexity: O(N) where N is the number of nodes on the path taken,
+            plus whatever the personality inspects.
+        """
+        kind, mountain, top, bottom, following = self.kind, self.mountain, self.top, self.bottom, self.following
+        mountains, get_mountain = self._mountain_slots(), self.get_mountain
+        empty, series = self.EMPTY, self.SERIES
+        add_mountain, select_branch = personality.add_mountain, personality.select_branch
+        stop, take_top = PersonalityDecision.STOP, PersonalityDecision.TOP
+        following_stack = []
+        node = self.root
+        while True:
+            node_kind = kind[node]
+            if node_kind == empty:
+                if not following_stack:
+                    return
+                node = following_stack.pop()
+            elif node_kind == series:
+                row = mountain[node]
+                add_mountain(mountains[row] or get_mountain(row))
+                node = following[node]
+            else:
+                decision = select_branch(ColumnarBranch(self, top[node]), ColumnarBranch(self, bottom[node]))
+                if decision == stop:
+                    return
+                following_stack.append(following[node])
+                node = top[node] if decision == take_top else bottom[node]
+
+    def iter_mountain_rows(self) -> Iterator[int]:
+        """
+        Yields the mountain table row of every mountain on the trail, in the same order
+        as `Trail.iter_mountains`.
+
+        :complexity: O(N) where N is the number of nodes reachable from the root.
+        """
+        kind, mountain, top, bottom, following = self.kind, self.mountain, self.top, self.bottom, self.following
+        empty, series = self.EMPTY, self.SERIES
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            node_kind = kind[node]
+            while node_kind != empty:
+                if node_kind == series:
+                    yield mountain[node]
+                    node = following[node]
+                else:
+                    stack.append(following[node])
+                    stack.append(bottom[node])
+                    node = top[node]
+                node_kind = kind[node]
+
+    def mountain_rows(self) -> list[int]:
+        """
+        Returns the rows of `iter_mountain_rows` as a list.
+
+        :complexity: O(N) where N is the number of nodes reachable from the root.
+        """
+        return list(self.iter_mountain_rows())
+
+    def iter_mountains(self) -> Iterator[Mountain]:
+        """See Trail.iter_mountains."""
+        mountains = self._mountain_list()
+        for row in self.iter_mountain_rows():
+            yield mountains[row]
+
+    def collect_all_mountains(self) -> list[Mountain]:
+        """See Trail.collect_all_mountains."""
+        mountains = self._mountain_list()
+        return list(map(mountains.__getitem__, self.mountain_rows()))
+
+    def _unwind(self, path: tuple|None) -> list[Mountain]:
+        """Turns a linked (row, rest) chain, most recent row first, into a list of mountains in walking order."""
+        res = []
+        while path is not None:
+            row, path = path
+            res.append(self.get_mountain(row))
+        res.reverse()
+        return res
+
+    def iter_difficulty_maximum_paths(self, max_difficulty: int) -> Iterator[list[Mountain]]:
+        """
+        See Trail.iter_difficulty_maximum_paths.
+        Whether each node can be completed is a single loop over the node table.
+        """
+        kind, mountain, top, bottom, following = self.kind, self.mountain, self.top, self.bottom, self.following
+        completable = bytearray(len(self))
+        for i in range(len(self)):
+            if kind[i] == self.EMPTY:
+                completable[i] = True
+            elif kind[i] == self.SERIES:
+                completable[i] = self.difficulty_level[mountain[i]] <= max_difficulty and completable[following[i]]
+            else:
+                completable[i] = (completable[top[i]] or completable[bottom[i]]) and completable[following[i]]
+        if not completable[self.root]:
+            return
+
+        frames = LinkedStack()
+        frames.push((self.root, None, None))
+        while not frames.is_empty():
+            node, path, pending = frames.pop()
+            while True:
+                if kind[node] == self.EMPTY:
+                    if pending is None:
+                        yield self._unwind(path)
+                        break
+                    node, pending = pending
+                elif kind[node] == self.SERIES:
+                    path = (mountain[node], path)
+                    node = following[node]
+                else:
+                    pending = (following[node], pending)
+                    if completable[bottom[node]]:
+                        frames.push((bottom[node], path, pending))
+                    if completable[top[node]]:
+                        frames.push((top[node], path, pending))
+                    break
+
+    def difficulty_maximum_paths(self, max_difficulty: int) -> list[list[Mountain]]:
+        """See Trail.difficulty_maximum_paths."""
+        return list(self.iter_difficulty_maximum_paths(max_difficulty))
+
+    def iter_difficulty_difference_paths(self, max_difference: int) -> Iterator[list[Mountain]]:
+        """
+        See Trail.iter_difficulty_difference_paths.
+        The difficulty ranges of each node are a single loop over the node table.
+        """
+        kind, mountain, top, bottom, following = self.kind, self.mountain, self.top, self.bottom, self.following
+        difficulty_level = self.difficulty_level
+        ranges = []
+        for i in range(len(self)):
+            if kind[i] == self.EMPTY:
+                ranges.append(EMPTY_RANGES)
+            elif kind[i] == self.SERIES:
+                difficulty = difficulty_level[mountain[i]]
+                ranges.append(combine_ranges(((difficulty, difficulty),), ranges[following[i]], max_difference))
+            else:
+                ranges.append(combine_ranges(ranges[top[i]] | ranges[bottom[i]], ranges[following[i]], max_difference))
+        if not ranges[self.root]:
+            return
+
+        chains = PendingChains(max_difference)
+        frames = LinkedStack()
+        frames.push((self.root, None, EMPTY_RANGE[0], EMPTY_RANGE[1], None))
+        while not frames.is_empty():
+            node, path, low, high, pending = frames.pop()
+            while True:
+                if kind[node] == self.EMPTY:
+                    if pending is None:
+                        yield self._unwind(path)
+                        break
+                    node, pending, _ = pending
+                elif kind[node] == self.SERIES:
+                    path = (mountain[node], path)
+                    difficulty = difficulty_level[mountain[node]]
+                    low = min(low, difficulty)
+                    high = max(high, difficulty)
+                    node = following[node]
+                else:
+                    pending = chains.after_split(node, following[node], ranges[following[node]], pending)
+                    for branch in (bottom[node], top[node]):
+                        if chains.can_enter(low, high, ranges[branch], pending):
+                            frames.push((branch, path, low, high, pending))
+                    break
+
+    def difficulty_difference_paths(self, max_difference: int) -> list[list[Mountain]]:
+        """See Trail.difficulty_difference_paths."""
+        return list(self.iter_difficulty_difference_paths(max_difference))
+
+    def path_statistics(self) -> PathStatistics:
+        """
+        See Trail.path_statistics.
+        Computed in a single loop over the node table, one column per aggregate.
+
+        :complexity: O(N) arithmetic operations where N is the number of nodes.
+        """
+        kind, mountain, top, bottom, following = self.kind, self.mountain, self.top, self.bottom, self.following
+        count, min_len, max_len, sum_len, min_diff, max_diff, sum_diff = ([] for _ in range(7))
+        for i in range(len(self)):
+            if kind[i] == self.EMPTY:
+                values = (1, 0, 0, 0, 0, 0, 0)
+            elif kind[i] == self.SERIES:
+                f = following[i]
+                length = self.length[mountain[i]]
+                difficulty = self.difficulty_level[mountain[i]]
+                values = (
+                    count[f],
+                    min_len[f] + length, max_len[f] + length, sum_len[f] + count[f] * length,
+                    min_diff[f] + difficulty, max_diff[f] + difficulty, sum_diff[f] + count[f] * difficulty,
+                )
+            else:
+                t, b, f = top[i], bottom[i], following[i]
+                branch_count = count[t] + count[b]
+                values = (
+                    branch_count * count[f],
+                    min(min_len[t], min_len[b]) + min_len[f],
+                    max(max_len[t], max_len[b]) + max_len[f],
+                    (sum_len[t] + sum_len[b]) * count[f] + sum_len[f] * branch_count,
+                    min(min_diff[t], min_diff[b]) + min_diff[f],
+                    max(max_diff[t], max_diff[b]) + max_diff[f],
+                    (sum_diff[t] + sum_diff[b]) * count[f] + sum_diff[f] * branch_count,
+                )
+            for column, value in zip((count, min_len, max_len, sum_len, min_diff, max_diff, sum_diff), values):
+                column.append(value)
+        r = self.root
+        return PathStatistics(
+            count[r],
+            min_len[r], max_len[r], Fraction(sum_len[r], count[r]),
+            min_diff[r], max_diff[r], Fraction(sum_diff[r], count[r]),
+        )
+
+
+class ColumnarBranch(LazyTrail):
+    """
+    A LazyTrail for a node of a ColumnarTrail.
+    Holds the trail (in `_load`) and node directly, rather than a closure over them,
+    as two are made at every split a walker decides on.
+    """
+
+    __slots__ = ("node",)
+
+    def __init__(self, columnar: ColumnarTrail, node: int) -> None:
+        self._load = columnar
+        self.node = node
+
+    def _build(self) -> TrailStore:
+        return self._load._store(self.node)
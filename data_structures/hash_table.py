@@ -7,24 +7,45 @@ __author__ = 'Jackson Goerner'
 __since__ = '07/02/2023'
 
 
-from typing import TypeVar, Generic
-from data_structures.referential_array import ArrayR
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import TypeVar, Generic, Iterable, Iterator
+from data_structures.referential_array import ArrayR, Int32ArrayR, UInt64ArrayR
 
 K = TypeVar('K')
 V = TypeVar('V')
 
+# Full hashes are kept to 64 bits.
+HASH_MASK = (1 << 64) - 1
+
 class FullError(Exception):
     pass
 
+# Marks a slot of the previous array which was moved during an incremental rehash.
+# Unlike None, it does not end a probe.
+_MOVED = object()
+
+# Marks the place of a deleted entry in the dense arrays of a CompactProbeTable.
+DELETED = object()
 
-class LinearProbeTable(Generic[K, V]):
+@dataclass
+class ProbeStatistics:
+    """
+    How far entries sit from the slot they hash to.
+    A lookup of an entry at probe length p reads p + 1 slots.
     """
-    Linear Probe Table.
 
-    Type Arguments:
-        - K:    Key Type. In most cases should be string.
-                Otherwise `hash` should be overwritten.
-        - V:    Value Type.
+    # histogram[p] is the number of entries at probe length p.
+    histogram: list[int]
+    max_probe_length: int
+    mean_probe_length: float
+
+
+class HashTable(ABC, Generic[K, V]):
+    """
+    Abstract Hash Table: the sizes it goes through as it grows, hashing keys,
+    and setting many (key, value) pairs at once.
+    Subclasses choose where entries are kept and how they are probed.
 
     Unless stated otherwise, all methods have O(1) complexity.
     """
@@ -34,33 +55,84 @@ class LinearProbeTable(Generic[K, V]):
 
     HASH_BASE = 31
 
-    def __init__(self, sizes=None) -> None:
+    # The table grows once more than this fraction of it is full.
+    MAX_LOAD_FACTOR = 0.5
+
+    def __init__(self, sizes=None, max_load_factor: float|None=None) -> None:
         """
         Initialise the Hash Table.
+
+        :param sizes: Sizes the table goes through as it grows.
+        :param max_load_factor: Overrides MAX_LOAD_FACTOR for this table.
+        :raises ValueError: when max_load_factor is not in (0, 1).
         """
         if sizes is not None:
             self.TABLE_SIZES = sizes
+        if max_load_factor is not None:
+            if not 0 < max_load_factor < 1:
+                raise ValueError("max_load_factor should be in (0, 1).")
+            self.MAX_LOAD_FACTOR = max_load_factor
         self.size_index = 0
-        self.array:ArrayR[tuple[K, V]] = ArrayR(self.TABLE_SIZES[self.size_index])
         self.count = 0
 
-    def hash(self, key: K) -> int:
+    def full_hash(self, key: K) -> int:
         """
-        Hash a key for insert/retrieve/update into the hashtable.
+        Hash a key independently of the table size, to 64 bits.
+        The polynomial hash is mixed afterwards, so that keys differing only in
+        their last few characters do not land in one cluster.
 
         :complexity: O(len(key))
         """
-
         value = 0
-        a = 31415
         for char in key:
-            value = (ord(char) + a * value) % self.table_size
-            a = a * self.HASH_BASE % (self.table_size - 1)
+            value = (value * self.HASH_BASE + ord(char)) & HASH_MASK
+        # Finaliser from MurmurHash3.
+        value ^= value >> 33
+        value = (value * 0xff51afd7ed558ccd) & HASH_MASK
+        value ^= value >> 33
         return value
 
+    def hash(self, key: K) -> int:
+        """
+        Hash a key for insert/retrieve/update into the hashtable.
+
+        :complexity: O(len(key))
+        """
+        return self.full_hash(key) % self.table_size
+
+    def _has_full_hash(self) -> bool:
+        """Whether positions come from `full_hash`, so that it can be kept for each key."""
+        return getattr(self.hash, "__func__", None) is HashTable.hash
+
+    def _hash_key(self, key: K) -> tuple[int, int]:
+        """
+        Returns the hash of the key to keep beside it, and the position it hashes to.
+
+        :complexity: O(hash(key))
+        """
+        if self._has_full_hash():
+            key_hash = self.full_hash(key)
+        else:
+            key_hash = self._overwritten_hash(key)
+        return key_hash, key_hash % self.table_size
+
+    def _overwritten_hash(self, key: K) -> int:
+        """
+        Returns the overwritten `hash` of a key, which is kept unboxed beside it.
+
+        :complexity: O(hash(key))
+        :raises ValueError: when it is not in [0, 2**64), e.g. from Python's own `hash`.
+        """
+        key_hash = self.hash(key)
+        if not 0 <= key_hash <= HASH_MASK:
+            raise ValueError(f"hash({key!r}) returned {key_hash}, which is not in [0, 2**64)")
+        return key_hash
+
     @property
+    @abstractmethod
     def table_size(self) -> int:
-        return len(self.array)
+        """ Number of positions keys hash to. """
+        pass
 
     def __len__(self) -> int:
         """
@@ -68,47 +140,313 @@ class LinearProbeTable(Generic[K, V]):
         """
         return self.count
 
+    @abstractmethod
     def _linear_probe(self, key: K, is_insert: bool) -> int:
         """
         Find the correct position for this key in the hash table using linear probing.
-        :complexity best: O(hash(key)) first position is empty
-        :complexity worst: O(hash(key) + N*comp(K)) when we've searched the entire table
-                        where N is the tablesize
+
         :raises KeyError: When the key is not in the table, but is_insert is False.
-        :raises FullError: When a table is full and cannot be inserted.
+        :raises FullError: When the table is full and cannot be inserted.
+        """
+        pass
+
+    @abstractmethod
+    def keys(self) -> list[K]:
+        """ Returns all keys in the hash table. """
+        pass
+
+    @abstractmethod
+    def values(self) -> list[V]:
+        """ Returns all values in the hash table. """
+        pass
+
+    @abstractmethod
+    def _items(self) -> Iterator[tuple[K, V]]:
+        """ Yields every (key, value) pair. """
+        pass
+
+    def __contains__(self, key: K) -> bool:
+        """
+        Checks to see if the given key is in the Hash Table
+
+        :complexity: See linear probe.
+        """
+        try:
+            _ = self[key]
+        except KeyError:
+            return False
+        else:
+            return True
+
+    @abstractmethod
+    def __getitem__(self, key: K) -> V:
+        """
+        Get the value at a certain key
+
+        :raises KeyError: when the key doesn't exist.
+        """
+        pass
+
+    @abstractmethod
+    def __setitem__(self, key: K, data: V) -> None:
+        """
+        Set an (key, value) pair in our hash table.
+
+        :raises FullError: when the table cannot be resized further.
+        """
+        pass
+
+    @abstractmethod
+    def _put(self, key: K, data: V, key_hash: int, position: int) -> None:
+        """ Set an (key, value) pair, given the hash of the key and its position. """
+        pass
+
+    @abstractmethod
+    def __delitem__(self, key: K) -> None:
         """
-        # Initial position
-        position = self.hash(key)
+        Deletes a (key, value) pair in our hash table.
+
+        :raises KeyError: when the key doesn't exist.
+        """
+        pass
+
+    @abstractmethod
+    def _rehash(self, size_index: int|None=None) -> None:
+        """ Resize the table to the next of TABLE_SIZES, or to TABLE_SIZES[size_index] if given. """
+        pass
+
+    @abstractmethod
+    def probe_statistics(self) -> ProbeStatistics:
+        """ Returns the histogram of probe lengths (how far each entry is from its home slot). """
+        pass
+
+    @classmethod
+    def from_items(cls, items: Iterable[tuple[K, V]], expected_size: int|None=None, sort_by_bucket: bool=False, **kwargs) -> HashTable[K, V]:
+        """
+        Returns a new table holding the (key, value) pairs, see `update_many`.
+        Other keyword arguments are passed to the constructor.
+        """
+        table = cls(**kwargs)
+        table.update_many(items, expected_size, sort_by_bucket)
+        return table
+
+    def update_many(self, items: Iterable[tuple[K, V]], expected_size: int|None=None, sort_by_bucket: bool=False) -> None:
+        """
+        Set many (key, value) pairs, later pairs winning over earlier ones with the same key.
+
+        The table is grown straight to the size it will need, rather than through
+        every size on the way, and the keys are all hashed in one pass before any
+        is placed. They can also be placed in order of position, so that
+        consecutive inserts touch neighbouring slots.
+
+        :param expected_size: Number of keys the table will hold afterwards, when known.
+            By default, the items are counted and every key assumed new.
+        :param sort_by_bucket: Place the keys in order of position.
+        :complexity: O(N*hash(K)) without probing, O(N log N) more when sorting, where N is the number of items.
+        :raises FullError: when the table cannot be resized further.
+        """
+        items = list(items)
+        self.reserve(expected_size if expected_size is not None else len(self) + len(items))
+        table_size = self.table_size
+        entries = []
+        for key, data in items:
+            key_hash, position = self._hash_key(key)
+            entries.append((position, key_hash, key, data))
+        if sort_by_bucket:
+            # Stable, so the last value for a key still wins.
+            entries.sort(key=lambda entry: entry[0])
+        for i, (position, key_hash, key, data) in enumerate(entries):
+            if self.table_size != table_size:
+                # More keys than expected. Positions have moved, so place the rest one by one.
+                for _, _, key, data in entries[i:]:
+                    self[key] = data
+                return
+            self._put(key, data, key_hash, position)
+            if len(self) > self.table_size * self.MAX_LOAD_FACTOR:
+                self._rehash()
+
+    def reserve(self, size: int) -> None:
+        """
+        Grow the table (all at once) to the first of TABLE_SIZES which holds size keys.
+
+        :complexity: See `_rehash`, when the table grows.
+        """
+        size_index = self.size_index
+        while size_index < len(self.TABLE_SIZES) - 1 and size > self.TABLE_SIZES[size_index] * self.MAX_LOAD_FACTOR:
+            size_index += 1
+        if size_index > self.size_index:
+            self._rehash(size_index)
+
+    def is_empty(self) -> bool:
+        return self.count == 0
+
+    def is_full(self) -> bool:
+        return self.count == self.table_size
 
-        for _ in range(self.table_size):
-            if self.array[position] is None:
+    def __str__(self) -> str:
+        """
+        Returns all they key/value pairs in our hash table (no particular
+        order).
+        :complexity: O(N * (str(key) + str(value))) where N is the table size
+        """
+        result = ""
+        for (key, value) in self._items():
+            result += "(" + str(key) + "," + str(value) + ")\n"
+        return result
+
+
+class LinearProbeTable(HashTable[K, V]):
+    """
+    Linear Probe Table.
+
+    Type Arguments:
+        - K:    Key Type. In most cases should be string.
+                Otherwise `hash` (or `full_hash`) should be overwritten.
+        - V:    Value Type.
+
+    The hash of each key is kept in `hashes`, beside its (key, value) pair in
+    `array`, so probes compare hashes before keys and deletions find where
+    entries belong without hashing them again. With the default `hash`, this is
+    the size-independent `full_hash`, so resizing only takes a modulo per key.
+
+    A Robin Hood table keeps each cluster ordered by home slot: an insert takes
+    the place of the first entry closer to its home than the insert is to its
+    own, shifting the rest of the cluster along. This evens out probe lengths,
+    and a lookup can stop as soon as it passes where its key would have been.
+
+    `occupied` holds a byte per slot of `array`, set when the slot holds an
+    entry, so iterating can skip runs of empty slots with `bytearray.find`
+    rather than reading them one by one.
+
+    An incremental table spreads each resize over the updates which follow it:
+    the previous array is kept, and every update moves MIGRATION_STEP of its slots
+    into the new one. Lookups check both until it is emptied.
+
+    Unless stated otherwise, all methods have O(1) complexity.
+    """
+
+    # Slots of the previous array moved by each update during an incremental rehash.
+    # Above 1 / MAX_LOAD_FACTOR, so a rehash finishes before the next one is due.
+    MIGRATION_STEP = 8
+
+    def __init__(self, sizes=None, max_load_factor: float|None=None, incremental: bool=False, robin_hood: bool=False) -> None:
+        """
+        Initialise the Hash Table.
+
+        :param sizes: Sizes the table goes through as it grows.
+        :param max_load_factor: Overrides MAX_LOAD_FACTOR for this table.
+        :param incremental: Spread each resize over the following updates.
+            Only used with the default `hash`, as other hashes depend on the table size.
+        :param robin_hood: Insert with Robin Hood hashing.
+        :raises ValueError: when max_load_factor is not in (0, 1).
+        """
+        super().__init__(sizes, max_load_factor)
+        self.incremental = incremental
+        self.robin_hood = robin_hood
+        self.array:ArrayR[tuple[K, V]] = ArrayR(self.TABLE_SIZES[self.size_index])
+        # full_hash of the key in each slot of array, or its `hash` when that is overwritten.
+        # Either way, the slot a key belongs in is its hash modulo the table size.
+        # Kept unboxed, so an overwritten `hash` has to return an int in [0, 2**64), see `_overwritten_hash`.
+        self.hashes:UInt64ArrayR = UInt64ArrayR(self.TABLE_SIZES[self.size_index])
+        self.occupied = bytearray(self.TABLE_SIZES[self.size_index])
+        # During an incremental rehash: the previous array, hashes and occupied, and the next slot of them to move.
+        self.old_array:ArrayR[tuple[K, V]]|None = None
+        self.old_hashes:UInt64ArrayR|None = None
+        self.old_occupied:bytearray|None = None
+        self.migrated = 0
+
+    @property
+    def table_size(self) -> int:
+        return len(self.array)
+
+    def _probe(self, array: ArrayR[tuple[K, V]], hashes: UInt64ArrayR, key: K, key_hash: int, position: int, is_insert: bool) -> int:
+        """
+        Linear probe array from position, comparing hashes before keys.
+        In Robin Hood mode, stops at the first entry closer to its home than the
+        probe is to the key's, which is where the key would be inserted.
+
+        :complexity best: O(1) first position is empty
+        :complexity worst: O(N*comp(K)) where N is the size of array
+        :raises KeyError: When the key is not in array, but is_insert is False.
+        :raises FullError: When array is full and cannot be inserted.
+        """
+        size = len(array)
+        robin_hood = self.robin_hood
+        for distance in range(size):
+            item = array[position]
+            if item is None:
                 # Empty spot. Am I upserting or retrieving?
                 if is_insert:
                     return position
                 else:
                     raise KeyError(key)
-            elif self.array[position][0] == key:
+            elif item is not _MOVED and hashes[position] == key_hash and item[0] == key:
                 return position
+            elif robin_hood and (position - hashes[position]) % size < distance:
+                # The key would have taken this spot.
+                if is_insert:
+                    return position
+                else:
+                    raise KeyError(key)
             else:
                 # Taken by something else. Time to linear probe.
-                position = (position + 1) % self.table_size
+                position = (position + 1) % size
 
         if is_insert:
             raise FullError("Table is full!")
         else:
             raise KeyError(key)
 
+    def _linear_probe(self, key: K, is_insert: bool) -> int:
+        """
+        Find the correct position for this key in the hash table using linear probing.
+        During an incremental rehash, only the new array is searched.
+        In Robin Hood mode, inserting may return a position which `_insert_at` frees up.
+        :complexity best: O(hash(key)) first position is empty
+        :complexity worst: O(hash(key) + N*comp(K)) when we've searched the entire table
+                        where N is the tablesize
+        :raises KeyError: When the key is not in the table, but is_insert is False.
+        :raises FullError: When a table is full and cannot be inserted.
+        """
+        key_hash, position = self._hash_key(key)
+        return self._probe(self.array, self.hashes, key, key_hash, position, is_insert)
+
+    def _old_position(self, key: K, key_hash: int) -> int:
+        """
+        Find the key among the slots of the previous array still to be moved.
+
+        :raises KeyError: When the key is not there.
+        """
+        old_array = self.old_array
+        if old_array is None:
+            raise KeyError(key)
+        return self._probe(old_array, self.old_hashes, key, key_hash, key_hash % len(old_array), False)
+
+    def _forget_old(self, position: int) -> None:
+        """Mark a slot of the previous array as moved."""
+        self.old_array[position] = _MOVED
+        self.old_occupied[position] = 0
+
+    def _items(self) -> Iterator[tuple[K, V]]:
+        """
+        Yields every (key, value) pair, including those still in the previous array.
+
+        :complexity: O(N) for N entries, plus a scan of the occupied bytes.
+        """
+        for array, occupied in ((self.array, self.occupied), (self.old_array, self.old_occupied)):
+            if array is not None:
+                x = occupied.find(1)
+                while x != -1:
+                    yield array[x]
+                    x = occupied.find(1, x + 1)
+
     def keys(self) -> list[K]:
         """
         Returns all keys in the hash table.
 
         :complexity: O(N) where N is self.table_size.
         """
-        res = []
-        for x in range(self.table_size):
-            if self.array[x] is not None:
-                res.append(self.array[x][0])
-        return res
+        return [item[0] for item in self._items()]
 
     def values(self) -> list[V]:
         """
@@ -116,24 +454,7 @@ class LinearProbeTable(Generic[K, V]):
 
         :complexity: O(N) where N is self.table_size.
         """
-        res = []
-        for x in range(self.table_size):
-            if self.array[x] is not None:
-                res.append(self.array[x][1])
-        return res
-
-    def __contains__(self, key: K) -> bool:
-        """
-        Checks to see if the given key is in the Hash Table
-
-        :complexity: See linear probe.
-        """
-        try:
-            _ = self[key]
-        except KeyError:
-            return False
-        else:
-            return True
+        return [item[1] for item in self._items()]
 
     def __getitem__(self, key: K) -> V:
         """
@@ -142,84 +463,463 @@ class LinearProbeTable(Generic[K, V]):
         :complexity: See linear probe.
         :raises KeyError: when the key doesn't exist.
         """
-        position = self._linear_probe(key, False)
+        key_hash, position = self._hash_key(key)
+        try:
+            position = self._probe(self.array, self.hashes, key, key_hash, position, False)
+        except KeyError:
+            return self.old_array[self._old_position(key, key_hash)][1]
         return self.array[position][1]
 
     def __setitem__(self, key: K, data: V) -> None:
         """
         Set an (key, value) pair in our hash table.
 
-        :complexity: See linear probe.
+        :complexity: See linear probe, plus MIGRATION_STEP probes during an incremental rehash.
         :raises FullError: when the table cannot be resized further.
         """
+        key_hash, position = self._hash_key(key)
+        self._put(key, data, key_hash, position)
 
-        position = self._linear_probe(key, True)
+        if self.old_array is not None:
+            self._migrate(self.MIGRATION_STEP)
 
-        if self.array[position] is None:
-            self.count += 1
+        if len(self) > self.table_size * self.MAX_LOAD_FACTOR:
+            self._rehash()
 
-        self.array[position] = (key, data)
+    def _put(self, key: K, data: V, key_hash: int, position: int) -> None:
+        """
+        Set an (key, value) pair, given the hash of the key and its position in array.
 
-        if len(self) > self.table_size / 2:
-            self._rehash()
+        :complexity: See linear probe.
+        """
+        position = self._probe(self.array, self.hashes, key, key_hash, position, True)
+
+        item = self.array[position]
+        if item is not None and self.hashes[position] == key_hash and item[0] == key:
+            self.array[position] = (key, data)
+        else:
+            try:
+                # Moved ahead of the incremental rehash.
+                self._forget_old(self._old_position(key, key_hash))
+            except KeyError:
+                self.count += 1
+            self._insert_at(position, (key, data), key_hash)
+
+    def reserve(self, size: int) -> None:
+        """
+        Grow the table (all at once) to the first of TABLE_SIZES which holds size keys.
+
+        :complexity: See `_rehash`, when the table grows.
+        """
+        super().reserve(size)
+        if self.old_array is not None:
+            self._migrate(len(self.old_array))
 
     def __delitem__(self, key: K) -> None:
         """
         Deletes a (key, value) pair in our hash table.
 
         :complexity best: O(hash(key)) deleting item is not probed and in correct spot.
-        :complexity worst: O(N*hash(key)+N^2*comp(K)) deleting item is midway through large chain.
+        :complexity worst: O(hash(key)+N*comp(K)) deleting item is midway through large chain.
         :raises KeyError: when the key doesn't exist.
         """
-        position = self._linear_probe(key, False)
-        # Remove the element
-        self.array[position] = None
+        key_hash, position = self._hash_key(key)
+        try:
+            position = self._probe(self.array, self.hashes, key, key_hash, position, False)
+        except KeyError:
+            self._forget_old(self._old_position(key, key_hash))
+            self.count -= 1
+            self._migrate(self.MIGRATION_STEP)
+            return
+        self._remove_at(position)
         self.count -= 1
-        # Start moving over the cluster
-        position = (position + 1) % self.table_size
-        while self.array[position] is not None:
-            key2, value = self.array[position]
-            self.array[position] = None
-            # Reinsert.
-            newpos = self._linear_probe(key2, True)
-            self.array[newpos] = (key2, value)
-            position = (position + 1) % self.table_size
+        if self.old_array is not None:
+            self._migrate(self.MIGRATION_STEP)
 
-    def is_empty(self) -> bool:
-        return self.count == 0
+    def _insert_at(self, position: int, item: tuple[K, V], key_hash: int) -> None:
+        """
+        Put a new entry at a position found by `_probe`.
+        If the position is taken (in Robin Hood mode), the rest of the cluster is shifted along a slot.
 
-    def is_full(self) -> bool:
-        return self.count == self.table_size
+        :complexity: O(C) where C is the length of the rest of the cluster.
+        :raises FullError: When there is no empty slot to shift into.
+        """
+        array, hashes = self.array, self.hashes
+        size = len(array)
+        end = position
+        for _ in range(size):
+            if array[end] is None:
+                break
+            end = (end + 1) % size
+        else:
+            raise FullError("Table is full!")
+        self.occupied[end] = 1
+        if end > position:
+            # The shifted run does not wrap around, so it moves in one copy.
+            array.copy_from(array, position, position + 1, end - position)
+            hashes.copy_from(hashes, position, position + 1, end - position)
+        else:
+            while end != position:
+                previous = (end - 1) % size
+                array[end] = array[previous]
+                hashes[end] = hashes[previous]
+                end = previous
+        array[position] = item
+        hashes[position] = key_hash
+
+    def _remove_at(self, hole: int) -> None:
+        """
+        Empty a slot of array, then shift later entries of its cluster back into
+        the hole, as long as that does not move them before the slot they hash to.
 
-    def _rehash(self) -> None:
+        :complexity: O(C) where C is the length of the rest of the cluster.
+        """
+        array, hashes = self.array, self.hashes
+        size = len(array)
+        array[hole] = None
+        hashes[hole] = 0
+        position = (hole + 1) % size
+        while array[position] is not None:
+            home = hashes[position] % size
+            # Can move back unless it belongs somewhere after the hole.
+            if (position - home) % size >= (position - hole) % size:
+                array[hole] = array[position]
+                hashes[hole] = hashes[position]
+                array[position] = None
+                hashes[position] = 0
+                hole = position
+            position = (position + 1) % size
+        self.occupied[hole] = 0
+
+    def _migrate(self, steps: int) -> None:
+        """
+        Move the next `steps` slots of the previous array into the new one.
+
+        :complexity: O(steps) without probing.
+        """
+        old_array, old_hashes = self.old_array, self.old_hashes
+        end = min(self.migrated + steps, len(old_array))
+        for x in range(self.migrated, end):
+            item = old_array[x]
+            if item is not None and item is not _MOVED:
+                key_hash = old_hashes[x]
+                position = self._probe(self.array, self.hashes, item[0], key_hash, key_hash % self.table_size, True)
+                self._insert_at(position, item, key_hash)
+                self._forget_old(x)
+        self.migrated = end
+        if end == len(old_array):
+            self.old_array = self.old_hashes = self.old_occupied = None
+
+    def _rehash(self, size_index: int|None=None) -> None:
         """
-        Need to resize table and reinsert all values
+        Need to resize table and reinsert all values.
+        The table grows to the next of TABLE_SIZES, or to TABLE_SIZES[size_index] if given.
+        Keys are placed from their kept full hash, when there is one, rather than hashed again.
+        An incremental table only swaps in the new array here.
 
-        :complexity best: O(N*hash(K)) No probing.
+        :complexity best: O(N) No probing, full hashes kept, or O(1) incremental.
         :complexity worst: O(N*hash(K) + N^2*comp(K)) Lots of probing.
         Where N is len(self)
         """
-        old_array = self.array
-        self.size_index += 1
-        if self.size_index == len(self.TABLE_SIZES):
+        if self.old_array is not None:
+            # Finish the last one first.
+            self._migrate(len(self.old_array))
+        old_array, old_hashes, old_occupied = self.array, self.hashes, self.occupied
+        if size_index is None:
+            size_index = self.size_index + 1
+        if size_index >= len(self.TABLE_SIZES):
             # Cannot be resized further.
             return
+        self.size_index = size_index
         self.array = ArrayR(self.TABLE_SIZES[self.size_index])
-        self.count = 0
-        for item in old_array:
-            if item is not None:
-                key, value = item
-                self[key] = value
+        self.hashes = UInt64ArrayR(self.TABLE_SIZES[self.size_index])
+        self.occupied = bytearray(self.TABLE_SIZES[self.size_index])
+        has_full_hash = self._has_full_hash()
+        if self.incremental and has_full_hash:
+            self.old_array, self.old_hashes, self.old_occupied, self.migrated = old_array, old_hashes, old_occupied, 0
+            return
+        x = old_occupied.find(1)
+        while x != -1:
+            item = old_array[x]
+            key_hash = old_hashes[x] if has_full_hash else self._overwritten_hash(item[0])
+            position = self._probe(self.array, self.hashes, item[0], key_hash, key_hash % self.table_size, True)
+            self._insert_at(position, item, key_hash)
+            x = old_occupied.find(1, x + 1)
+
+    def probe_statistics(self) -> ProbeStatistics:
+        """
+        Returns the histogram of probe lengths (how far each entry is from its home slot).
+        During an incremental rehash, entries still in the previous array are measured there.
 
-    def __str__(self) -> str:
+        :complexity: O(N) where N is the table size.
         """
-        Returns all they key/value pairs in our hash table (no particular
-        order).
-        :complexity: O(N * (str(key) + str(value))) where N is the table size
+        histogram = []
+        for array, hashes in ((self.array, self.hashes), (self.old_array, self.old_hashes)):
+            if array is None:
+                continue
+            size = len(array)
+            for x in range(size):
+                item = array[x]
+                if item is not None and item is not _MOVED:
+                    distance = (x - hashes[x]) % size
+                    while len(histogram) <= distance:
+                        histogram.append(0)
+                    histogram[distance] += 1
+        total = sum(histogram)
+        mean = sum(distance * count for distance, count in enumerate(histogram)) / total if total else 0.0
+        return ProbeStatistics(histogram, len(histogram) - 1 if histogram else 0, mean)
+
+
+class CompactProbeTable(HashTable[K, V]):
+    """
+    Hash Table using Linear Probing, laid out like CPython's compact dict.
+
+    Entries are appended, in insertion order, to the dense `entry_keys`,
+    `entry_values` and `entry_hashes` arrays. The table which is probed is
+    `index`, an Int32ArrayR holding the number of the entry in each slot (EMPTY
+    when free). keys() and values() are slices of the dense arrays, and a
+    resize only rebuilds the index, from the kept hashes.
+
+    `entry_hashes` is a UInt64ArrayR with room for as many entries as the index
+    takes before it is rebuilt, so only its first len(entry_keys) positions are used.
+
+    Deleting an entry shifts the index back as in LinearProbeTable, but leaves a
+    hole (DELETED) in the dense arrays. Holes are closed up at the next resize,
+    which happens once the dense arrays reach the load limit of the index; when
+    at most half of them are live entries, the index is rebuilt at the same size.
+
+    Unless stated otherwise, all methods have O(1) complexity.
+    """
+
+    # Marks a free slot of index.
+    EMPTY = -1
+
+    def __init__(self, sizes=None, max_load_factor: float|None=None) -> None:
         """
-        result = ""
-        for item in self.array:
-            if item is not None:
-                (key, value) = item
-                result += "(" + str(key) + "," + str(value) + ")\n"
-        return result
+        Initialise the Hash Table.
+
+        :param sizes: Sizes the index goes through as it grows.
+        :param max_load_factor: Overrides MAX_LOAD_FACTOR for this table.
+        :raises ValueError: when max_load_factor is not in (0, 1).
+        """
+        super().__init__(sizes, max_load_factor)
+        size = self.TABLE_SIZES[self.size_index]
+        self.index = Int32ArrayR(size, self.EMPTY)
+        self.entry_keys:list[K] = []
+        self.entry_values:list[V] = []
+        # As in LinearProbeTable: the full_hash of each key, or its `hash` when that is overwritten.
+        self.entry_hashes = UInt64ArrayR(self._entry_capacity(size))
+
+    def _entry_capacity(self, size: int) -> int:
+        """Number of entries the dense arrays reach before an index of this size is rebuilt."""
+        return int(size * self.MAX_LOAD_FACTOR) + 1
+
+    @property
+    def table_size(self) -> int:
+        return len(self.index)
+
+    def _find_slot(self, key: K, key_hash: int, position: int, is_insert: bool) -> int:
+        """
+        Linear probe index from position, comparing hashes before keys.
+
+        :complexity best: O(1) first position is empty
+        :complexity worst: O(N*comp(K)) where N is the size of index
+        :raises KeyError: When the key is not in the table, but is_insert is False.
+        :raises FullError: When index is full and cannot be inserted.
+        """
+        index, entry_hashes, entry_keys = self.index, self.entry_hashes, self.entry_keys
+        size = len(index)
+        for _ in range(size):
+            entry = index[position]
+            if entry == self.EMPTY:
+                if is_insert:
+                    return position
+                raise KeyError(key)
+            elif entry_hashes[entry] == key_hash and entry_keys[entry] == key:
+                return position
+            position = (position + 1) % size
+
+        if is_insert:
+            raise FullError("Table is full!")
+        raise KeyError(key)
+
+    def _linear_probe(self, key: K, is_insert: bool) -> int:
+        """
+        Find the slot of index for this key using linear probing.
+
+        :complexity: See `_find_slot`, plus O(hash(key)).
+        """
+        key_hash, position = self._hash_key(key)
+        return self._find_slot(key, key_hash, position, is_insert)
+
+    def _items(self) -> Iterator[tuple[K, V]]:
+        """
+        Yields every (key, value) pair in insertion order.
+
+        :complexity: O(N) where N is the length of the dense arrays.
+        """
+        for key, value in zip(self.entry_keys, self.entry_values):
+            if key is not DELETED:
+                yield key, value
+
+    def keys(self) -> list[K]:
+        """
+        Returns all keys in the hash table, in insertion order.
+
+        :complexity: O(N) copying a slice, where N is the length of the dense arrays.
+        """
+        if len(self.entry_keys) == self.count:
+            return self.entry_keys[:]
+        return [key for key in self.entry_keys if key is not DELETED]
+
+    def values(self) -> list[V]:
+        """
+        Returns all values in the hash table, in insertion order.
+
+        :complexity: O(N) copying a slice, where N is the length of the dense arrays.
+        """
+        if len(self.entry_keys) == self.count:
+            return self.entry_values[:]
+        return [value for key, value in zip(self.entry_keys, self.entry_values) if key is not DELETED]
+
+    def __getitem__(self, key: K) -> V:
+        """
+        Get the value at a certain key
+
+        :complexity: See linear probe.
+        :raises KeyError: when the key doesn't exist.
+        """
+        key_hash, position = self._hash_key(key)
+        return self.entry_values[self.index[self._find_slot(key, key_hash, position, False)]]
+
+    def __setitem__(self, key: K, data: V) -> None:
+        """
+        Set an (key, value) pair in our hash table.
+
+        :complexity: See linear probe.
+        :raises FullError: when the table cannot be resized further.
+        """
+        key_hash, position = self._hash_key(key)
+        self._put(key, data, key_hash, position)
+        if len(self.entry_keys) > self.table_size * self.MAX_LOAD_FACTOR:
+            self._resize()
+
+    def _put(self, key: K, data: V, key_hash: int, position: int) -> None:
+        """
+        Set an (key, value) pair, given the hash of the key and its position in index.
+
+        :complexity: See linear probe, amortised once the index cannot grow further.
+        """
+        position = self._find_slot(key, key_hash, position, True)
+        entry = self.index[position]
+        if entry != self.EMPTY:
+            self.entry_values[entry] = data
+            return
+        entry = len(self.entry_keys)
+        if entry == len(self.entry_hashes):
+            # Only once the index cannot grow further, so entries go past its load limit.
+            self.entry_hashes.resize(min(2 * entry, self.table_size))
+        self.index[position] = entry
+        self.entry_keys.append(key)
+        self.entry_values.append(data)
+        self.entry_hashes[entry] = key_hash
+        self.count += 1
+
+    def __delitem__(self, key: K) -> None:
+        """
+        Deletes a (key, value) pair in our hash table.
+
+        :complexity best: O(hash(key)) deleting item is not probed and in correct spot.
+        :complexity worst: O(hash(key)+N*comp(K)) deleting item is midway through large chain.
+        :raises KeyError: when the key doesn't exist.
+        """
+        key_hash, position = self._hash_key(key)
+        hole = self._find_slot(key, key_hash, position, False)
+        entry = self.index[hole]
+        self.entry_keys[entry] = DELETED
+        self.entry_values[entry] = None
+        self.count -= 1
+
+        # Shift the rest of the cluster back, as in LinearProbeTable._remove_at.
+        index, entry_hashes = self.index, self.entry_hashes
+        size = len(index)
+        index[hole] = self.EMPTY
+        position = (hole + 1) % size
+        while index[position] != self.EMPTY:
+            home = entry_hashes[index[position]] % size
+            if (position - home) % size >= (position - hole) % size:
+                index[hole] = index[position]
+                index[position] = self.EMPTY
+                hole = position
+            position = (position + 1) % size
+
+    def _resize(self) -> None:
+        """
+        Make room once the dense arrays reach the load limit of the index: grow
+        when more than half of them are live entries, otherwise close up the holes.
+
+        :complexity: See `_rehash`.
+        """
+        if self.count > self.table_size * self.MAX_LOAD_FACTOR / 2:
+            self._rehash()
+        else:
+            self._rehash(self.size_index)
+
+    def _rehash(self, size_index: int|None=None) -> None:
+        """
+        Close up the holes in the dense arrays, and rebuild the index at the next
+        of TABLE_SIZES, or at TABLE_SIZES[size_index] if given.
+        Keys are placed from their kept full hash, when there is one, rather than hashed again.
+        Once the index cannot grow further, it is only rebuilt to close up holes.
+
+        :complexity best: O(N) No probing, full hashes kept.
+        :complexity worst: O(N*hash(K) + N^2) Lots of probing.
+        Where N is the length of the dense arrays plus the size of the index.
+        """
+        if size_index is None:
+            size_index = self.size_index + 1
+        if size_index >= len(self.TABLE_SIZES):
+            if len(self.entry_keys) == self.count:
+                # Cannot be resized further.
+                return
+            size_index = self.size_index
+        self.size_index = size_index
+        size = self.TABLE_SIZES[size_index]
+        old_hashes, length = self.entry_hashes, len(self.entry_keys)
+        entry_hashes = UInt64ArrayR(max(self._entry_capacity(size), length))
+        if length != self.count:
+            live = [entry for entry, key in enumerate(self.entry_keys) if key is not DELETED]
+            self.entry_keys = [self.entry_keys[entry] for entry in live]
+            self.entry_values = [self.entry_values[entry] for entry in live]
+            entry_hashes[:len(live)] = [old_hashes[entry] for entry in live]
+        else:
+            entry_hashes.copy_from(old_hashes, 0, 0, length)
+        self.entry_hashes = entry_hashes
+        self.index = index = Int32ArrayR(size, self.EMPTY)
+        if not self._has_full_hash():
+            # After swapping in the index, as an overwritten `hash` depends on its size.
+            entry_hashes[:len(self.entry_keys)] = [self._overwritten_hash(key) for key in self.entry_keys]
+        for entry in range(len(self.entry_keys)):
+            position = entry_hashes[entry] % size
+            while index[position] != self.EMPTY:
+                position = (position + 1) % size
+            index[position] = entry
+
+    def probe_statistics(self) -> ProbeStatistics:
+        """
+        Returns the histogram of probe lengths (how far each entry is from its home slot).
+
+        :complexity: O(N) where N is the table size.
+        """
+        histogram = []
+        size = len(self.index)
+        for x in range(size):
+            entry = self.index[x]
+            if entry != self.EMPTY:
+                distance = (x - self.entry_hashes[entry]) % size
+                while len(histogram) <= distance:
+                    histogram.append(0)
+                histogram[distance] += 1
+        total = sum(histogram)
+        mean = sum(distance * count for distance, count in enumerate(histogram)) / total if total else 0.0
+        return ProbeStatistics(histogram, len(histogram) - 1 if histogram else 0, mean)
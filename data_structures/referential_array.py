@@ -9,15 +9,23 @@ would be a type called py_object_Array_5). Then (length *
 ctypes.py_object)() is equivalent to the initialisation in MIPS of the
 space to hold the references.
 
+The new array starts out holding NULL pointers rather than None. Rather than
+assigning None to each slot from a Python list, the first slot is set to None
+and then copied over the rest with memmove, doubling the filled part each
+time. The slots do not own a reference to None (only the first does, through
+ctypes), which is safe because None is never deallocated.
+
 Note that while I do check the precondition in __init__ (noone else
 would), I do not check that of getitem or setitem, since that is already
 checked by self.array[index].
 """
+from __future__ import annotations
 __author__ = "Julian Garcia for the __init__ code, Maria Garcia de la Banda for the rest"
 __docformat__ = 'reStructuredText'
 
-from ctypes import py_object
-from typing import TypeVar, Generic
+from array import array
+from ctypes import addressof, memmove, py_object, sizeof
+from typing import TypeVar, Generic, Iterable
 
 T = TypeVar('T')
 
@@ -25,13 +33,20 @@ T = TypeVar('T')
 class ArrayR(Generic[T]):
     def __init__(self, length: int) -> None:
         """ Creates an array of references to objects of the given length
-        :complexity: O(length) for best/worst case to initialise to None
+        :complexity: O(length) for best/worst case to initialise to None,
+            in O(log length) memmoves
         :pre: length > 0
         """
         if length <= 0:
             raise ValueError("Array length should be larger than 0.")
         self.array = (length * py_object)() # initialises the space
-        self.array[:] =  [None for _ in range(length)]
+        self.array[0] = None
+        address, item_size = addressof(self.array), sizeof(py_object)
+        filled = 1
+        while filled < length:
+            copied = min(filled, length - filled)
+            memmove(address + filled * item_size, address, copied * item_size)
+            filled += copied
 
     def __len__(self) -> int:
         """ Returns the length of the array
@@ -39,17 +54,154 @@ class ArrayR(Generic[T]):
         """
         return len(self.array)
 
-    def __getitem__(self, index: int) -> T:
-        """ Returns the object in position index.
-        :complexity: O(1)
+    def __getitem__(self, index: int | slice) -> T | list[T]:
+        """ Returns the object in position index, or a list of those in a slice.
+        :complexity: O(1), or O(length of the slice)
         :pre: index in between 0 and length - self.array[] checks it
         """
         return self.array[index]
 
-    def __setitem__(self, index: int, value: T) -> None:
-        """ Sets the object in position index to value
-        :complexity: O(1)
+    def __setitem__(self, index: int | slice, value: T | Iterable[T]) -> None:
+        """ Sets the object in position index to value, or the positions in a
+        slice to the objects in value.
+        :complexity: O(1), or O(length of the slice)
         :pre: index in between 0 and length - self.array[] checks it
+        :raises ValueError: when a slice and value differ in length.
         """
+        if isinstance(index, slice) and not isinstance(value, (list, tuple)):
+            value = list(value)
         self.array[index] = value
 
+    def copy_from(self, other: ArrayR[T], src: int, dst: int, n: int) -> None:
+        """ Copies positions src to src + n of other into positions dst to dst + n.
+        other may be this array, and the two ranges may overlap.
+        :complexity: O(n), copied in C
+        :pre: both ranges are within their arrays
+        """
+        if not (0 <= src and src + n <= len(other) and 0 <= dst and dst + n <= len(self)):
+            raise IndexError("Copy out of range.")
+        if n > 0:
+            self.array[dst:dst + n] = other.array[src:src + n]
+
+    def extend(self, items: Iterable[T]) -> None:
+        """ Appends the items, growing the array by their number.
+        :complexity: O(length + number of items)
+        """
+        items = list(items)
+        if not items:
+            return
+        length = len(self.array)
+        extended = type(self)(length + len(items))
+        extended.array[:length] = self.array[:]
+        extended.array[length:] = items
+        self.array = extended.array
+
+
+
+class TypedArrayR(ArrayR[T]):
+    """ An array of unboxed numbers of one C type, held in an array.array.
+    Subclasses choose the type with TYPECODE (see the array module).
+
+    Slicing copies the positions into a new array.array in one go. For a
+    slice without copying, take one of view(), which exposes the storage
+    through the buffer protocol (as does memoryview(a) from Python 3.12).
+    """
+    TYPECODE = 'q'
+
+    def __init__(self, length: int, value: T = 0) -> None:
+        """ Creates an array of the given length, with every position set to value
+        :complexity: O(length), copied in C rather than one position at a time
+        :pre: length > 0
+        """
+        if length <= 0:
+            raise ValueError("Array length should be larger than 0.")
+        self.array = array(self.TYPECODE, [value]) * length
+
+    def __setitem__(self, index: int | slice, value: T | Iterable[T]) -> None:
+        """ Sets the number in position index to value, or the positions in a
+        slice to the numbers in value.
+        :complexity: O(1), or O(length of the slice)
+        :pre: index in between 0 and length - self.array[] checks it
+        :raises ValueError: when a slice and value differ in length.
+        """
+        if isinstance(index, slice):
+            if not isinstance(value, array) or value.typecode != self.TYPECODE:
+                value = array(self.TYPECODE, value)
+            # array.array would otherwise resize to fit.
+            if len(range(*index.indices(len(self.array)))) != len(value):
+                raise ValueError("Can only assign a sequence of the same length.")
+        self.array[index] = value
+
+    def copy_from(self, other: TypedArrayR[T], src: int, dst: int, n: int) -> None:
+        """ Copies positions src to src + n of other into positions dst to dst + n,
+        with a single memmove when other has the same type.
+        other may be this array, and the two ranges may overlap.
+        :complexity: O(n)
+        :pre: both ranges are within their arrays
+        """
+        if not (0 <= src and src + n <= len(other) and 0 <= dst and dst + n <= len(self)):
+            raise IndexError("Copy out of range.")
+        if n <= 0:
+            return
+        if isinstance(other, TypedArrayR) and other.TYPECODE == self.TYPECODE:
+            size = self.array.itemsize
+            memmove(self.array.buffer_info()[0] + dst * size, other.array.buffer_info()[0] + src * size, n * size)
+        else:
+            self[dst:dst + n] = other[src:src + n]
+
+    def extend(self, items: Iterable[T]) -> None:
+        """ Appends the items, growing the array by their number.
+        :complexity: O(number of items), amortised
+        """
+        self.array.extend(items if isinstance(items, array) and items.typecode == self.TYPECODE else array(self.TYPECODE, items))
+
+    def __buffer__(self, flags: int) -> memoryview:
+        return memoryview(self.array)
+
+    def view(self) -> memoryview:
+        """ Returns a view of the whole array, sharing its storage
+        :complexity: O(1)
+        """
+        return memoryview(self.array)
+
+    def fill(self, value: T, start: int = 0, stop: int | None = None) -> None:
+        """ Sets positions start to stop (the end by default) to value
+        :complexity: O(stop - start), copied in C
+        """
+        start, stop, _ = slice(start, stop).indices(len(self.array))
+        if stop > start:
+            self.array[start:stop] = array(self.TYPECODE, [value]) * (stop - start)
+
+    def resize(self, length: int, value: T = 0) -> None:
+        """ Changes the length of the array, keeping the numbers which still fit
+        and setting any new positions to value.
+        The kept numbers are copied across with a single memmove.
+        :complexity: O(length)
+        :pre: length > 0
+        """
+        if length <= 0:
+            raise ValueError("Array length should be larger than 0.")
+        resized = array(self.TYPECODE, [value]) * length
+        kept = min(length, len(self.array))
+        memmove(resized.buffer_info()[0], self.array.buffer_info()[0], kept * self.array.itemsize)
+        self.array = resized
+
+
+class Int32ArrayR(TypedArrayR[int]):
+    """ An array of C ints (32 bits on the platforms we support), such as positions in a table. """
+    TYPECODE = 'i'
+
+
+class Int64ArrayR(TypedArrayR[int]):
+    """ An array of signed 64 bit integers. """
+    TYPECODE = 'q'
+
+
+class UInt64ArrayR(TypedArrayR[int]):
+    """ An array of unsigned 64 bit integers, such as full hashes. """
+    TYPECODE = 'Q'
+
+
+class Float64ArrayR(TypedArrayR[float]):
+    """ An array of doubles. """
+    TYPECODE = 'd'
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-from typing import Generic, TypeVar, Iterator
+from typing import Generic, TypeVar, Iterable, Iterator
 from data_structures.hash_table import LinearProbeTable, FullError
-from data_structures.referential_array import ArrayR
+from data_structures.referential_array import ArrayR, Int64ArrayR
 
 K1 = TypeVar('K1')
 K2 = TypeVar('K2')
@@ -19,6 +19,12 @@ class DoubleKeyTable(Generic[K1, K2, V]):
                 Otherwise `hash2` should be overwritten.
         - V:    Value Type.
 
+    The top level is a pair of parallel arrays, holding each 1st key and the
+    internal table of its 2nd keys. Each internal table is a `LinearProbeTable`
+    hashed with `hash2`, which grows through `internal_sizes` on its own once
+    its load passes `internal_max_load_factor`. The top level only grows when
+    its own load (the number of 1st keys) passes `max_load_factor`.
+
     Unless stated otherwise, all methods have O(1) complexity.
     """
 
@@ -27,24 +33,44 @@ class DoubleKeyTable(Generic[K1, K2, V]):
 
     HASH_BASE = 31
 
-    def __init__(self, sizes:list|None=None, internal_sizes:list|None=None) -> None:
-        self.top_level_sizes = self.TABLE_SIZES
-        self.internal_level_sizes = self.TABLE_SIZES
-        if sizes is not None:
-            self.top_level_sizes = sizes
-        if internal_sizes is not None:
-            self.internal_level_sizes = internal_sizes
+    # The top level and internal tables grow once more than this fraction of them is full.
+    MAX_LOAD_FACTOR = LinearProbeTable.MAX_LOAD_FACTOR
 
-        self.top_size_index = 0
-        self.internal_size_index = 0
-        self.count = 0 
-        self.internal_sizes = ArrayR(self.TABLE_SIZES[self.top_size_index]) #Keeping track of the size of each internal hash table for the iterator
+    def __init__(self, sizes:list|None=None, internal_sizes:list|None=None, max_load_factor:float|None=None, internal_max_load_factor:float|None=None) -> None:
+        """
+        Initialise the Hash Table.
 
-        self.array = ArrayR[ArrayR](self.TABLE_SIZES[self.top_size_index])
-        for i in self.array: #More optimal way? 
-            self.array[i] = ArrayR(self.TABLE_SIZES[self.internal_level_sizes])
-            
-        
+        :param sizes: Sizes the top level goes through as it grows.
+        :param internal_sizes: Sizes each internal table goes through as it grows.
+        :param max_load_factor: Load of the top level past which it grows, MAX_LOAD_FACTOR by default.
+        :param internal_max_load_factor: Load of an internal table past which it grows, MAX_LOAD_FACTOR by default.
+        :raises ValueError: when a load factor is not in (0, 1).
+        """
+        if sizes is not None:
+            self.TABLE_SIZES = sizes
+        for load_factor in (max_load_factor, internal_max_load_factor):
+            if load_factor is not None and not 0 < load_factor < 1:
+                raise ValueError("Load factors should be in (0, 1).")
+        self.max_load_factor = max_load_factor if max_load_factor is not None else self.MAX_LOAD_FACTOR
+        self.internal_max_load_factor = internal_max_load_factor if internal_max_load_factor is not None else self.MAX_LOAD_FACTOR
+        # The class sizes, rather than `sizes`, unless given.
+        self.internal_sizes = internal_sizes if internal_sizes is not None else type(self).TABLE_SIZES
+        self.size_index = 0
+        # keys1[i] is the 1st key at position i, tables[i] its internal table,
+        # and homes[i] its hash1, the position it belongs at.
+        self.keys1: ArrayR[K1] = ArrayR(self.TABLE_SIZES[self.size_index])
+        self.tables: ArrayR[LinearProbeTable[K2, V]] = ArrayR(self.TABLE_SIZES[self.size_index])
+        self.homes: Int64ArrayR = Int64ArrayR(self.TABLE_SIZES[self.size_index])
+        # A byte per top-level slot, set when it holds a 1st key.
+        self.occupied = bytearray(self.TABLE_SIZES[self.size_index])
+        # Number of times keys have been added or removed, for iterators to check.
+        self.modifications = 0
+        # Number of 1st keys, and of (1st key, 2nd key) pairs.
+        self.top_count = 0
+        self.count = 0
+        # Number of times the top level, and any internal table, has grown.
+        self.top_rehashes = 0
+        self.internal_rehashes = 0
 
     def hash1(self, key: K1) -> int:
         """
@@ -74,31 +100,78 @@ class DoubleKeyTable(Generic[K1, K2, V]):
             a = a * self.HASH_BASE % (sub_table.table_size - 1)
         return value
 
+    def _new_table(self) -> LinearProbeTable[K2, V]:
+        """Creates an internal table, which hashes its keys with `hash2`."""
+        table = LinearProbeTable(self.internal_sizes, self.internal_max_load_factor)
+        table.hash = lambda key: self.hash2(key, table)
+        return table
+
+    def _top_probe(self, key1: K1, is_insert: bool, home: int|None=None) -> int:
+        """
+        Find the position of the 1st key in the top level using linear probing,
+        starting from its home, hash1(key1), which is computed unless given.
+
+        :complexity best: O(hash1(key1)) first position is empty
+        :complexity worst: O(hash1(key1) + N*comp(K1)) where N is the table size
+        :raises KeyError: When the key is not in the table, but is_insert is False.
+        :raises FullError: When the table is full and cannot be inserted.
+        """
+        keys1 = self.keys1
+        table_size = len(keys1)
+        position = self.hash1(key1) if home is None else home
+        for _ in range(table_size):
+            current = keys1[position]
+            if current is None:
+                if is_insert:
+                    return position
+                raise KeyError(key1)
+            elif current == key1:
+                return position
+            position = (position + 1) % table_size
+
+        if is_insert:
+            raise FullError("Table is full!")
+        raise KeyError(key1)
+
+    def _top_insert(self, key1: K1, home: int|None=None) -> int:
+        """
+        Find the position of the 1st key in the top level, adding it with an empty internal table if new.
+        Its home, hash1(key1), is computed unless given.
+
+        :complexity: See `_top_probe`.
+        :raises FullError: When the table is full and cannot be inserted.
+        """
+        if home is None:
+            home = self.hash1(key1)
+        position = self._top_probe(key1, True, home)
+        if self.keys1[position] is None:
+            self.keys1[position] = key1
+            self.tables[position] = self._new_table()
+            self.homes[position] = home
+            self.occupied[position] = 1
+            self.top_count += 1
+            self.modifications += 1
+        return position
+
     def _linear_probe(self, key1: K1, key2: K2, is_insert: bool) -> tuple[int, int]:
         """
         Find the correct position for this key in the hash table using linear probing.
+        Nothing is added: for a new 1st key, this is the free top-level position
+        and the position key2 would take in a new internal table.
 
+        :complexity: O(hash1(key1) + hash2(key2)) without probing, see `_top_probe` and `LinearProbeTable._linear_probe`.
         :raises KeyError: When the key pair is not in the table, but is_insert is False.
         :raises FullError: When a table is full and cannot be inserted.
         """
-        top_level_position = self.hash1(key1)
-        internal_level_position = self.hash2(key2, self.array[top_level_position])
-
-        for _ in range(len(self.array[top_level_position])):
-            if self.array[top_level_position][internal_level_position] is not None:
-                if is_insert:
-                    return (top_level_position, internal_level_position)
-                else:
-                    raise KeyError(key1, key2)
-            elif self.array[top_level_position][internal_level_position][:2] == (key1, key2):
-                return (top_level_position, internal_level_position)
-            else:
-                internal_level_position = (internal_level_position + 1) % len(self.array[top_level_position])
-        
-        if is_insert:
-            raise FullError(f"Hash table for {key1} is full")
-        else:
-            raise KeyError(key1,key2)
+        top_level_position = self._top_probe(key1, is_insert)
+        table = self.tables[top_level_position]
+        if table is None:
+            table = self._new_table()
+        try:
+            internal_level_position = table._linear_probe(key2, is_insert)
+        except KeyError:
+            raise KeyError(key1, key2) from None
+        return (top_level_position, internal_level_position)
 
     def iter_keys(self, key:K1|None=None) -> Iterator[K1|K2]:
         """
@@ -106,20 +179,24 @@ class DoubleKeyTable(Generic[K1, K2, V]):
             Returns an iterator of all top-level keys in hash table
         key = k:
             Returns an iterator of all keys in the bottom-hash-table for k.
-        """
-        if key is not None:
-            pass
-        else:
-            pass
 
+        Keys are read lazily. Once keys are added to or removed from the table,
+        the iterator raises RuntimeError rather than carrying on.
+
+        :raises KeyError: when k is not a top-level key.
+        """
+        if key is None:
+            return TopLevelKeyIterator(self)
+        return BottomLevelIterator(self, key)
 
     def keys(self, key:K1|None=None) -> list[K1|K2]:
         """
         key = None: returns all top-level keys in the table.
         key = x: returns all bottom-level keys for top-level key x.
+
+        :raises KeyError: when x is not a top-level key.
         """
-        if key is None:
-            pass
+        return list(self.iter_keys(key))
 
     def iter_values(self, key:K1|None=None) -> Iterator[V]:
         """
@@ -127,15 +204,21 @@ class DoubleKeyTable(Generic[K1, K2, V]):
             Returns an iterator of all values in hash table
         key = k:
             Returns an iterator of all values in the bottom-hash-table for k.
+
+        Values are read lazily, as for `iter_keys`.
+
+        :raises KeyError: when k is not a top-level key.
         """
-        raise NotImplementedError()
+        return BottomLevelIterator(self, key, values=True)
 
     def values(self, key:K1|None=None) -> list[V]:
         """
         key = None: returns all values in the table.
         key = x: returns all values for top-level key x.
+
+        :raises KeyError: when x is not a top-level key.
         """
-        raise NotImplementedError()
+        return list(self.iter_values(key))
 
     def __contains__(self, key: tuple[K1, K2]) -> bool:
         """
@@ -154,82 +237,173 @@ class DoubleKeyTable(Generic[K1, K2, V]):
         """
         Get the value at a certain key
 
+        :complexity: See linear probe.
         :raises KeyError: when the key doesn't exist.
         """
-        pos1, pos2 = self._linear_probe(key[0], key[2], False)
-        return self.array[pos1][pos2]
-
+        key1, key2 = key
+        try:
+            return self.tables[self._top_probe(key1, False)][key2]
+        except KeyError:
+            raise KeyError(key1, key2) from None
 
     def __setitem__(self, key: tuple[K1, K2], data: V) -> None:
         """
         Set an (key, value) pair in our hash table.
-        """
 
-        pos1, pos2 = self._linear_probe(key[0], key[2], True)
-        if self.array[pos1][pos2] is None:
+        :complexity: See linear probe.
+        :raises FullError: when a table is full and cannot be resized further.
+        """
+        key1, key2 = key
+        table = self.tables[self._top_insert(key1)]
+        old_count, old_size = len(table), table.table_size
+        # The internal table grows itself past internal_max_load_factor.
+        table[key2] = data
+        if len(table) != old_count:
             self.count += 1
-            self.internal_level_sizes[pos1] += 1
-
-        self.array[pos1][pos2] = (pos1, pos2, data)
-        
-        if len(self.array[pos1]) > self.internal_level_sizes[self.internal_size_index] / 2:
-            self._rehash(); 
+            self.modifications += 1
+        self.internal_rehashes += table.table_size != old_size
 
+        if self.top_count > self.table_size * self.max_load_factor:
+            self._rehash()
 
     def __delitem__(self, key: tuple[K1, K2]) -> None:
         """
         Deletes a (key, value) pair in our hash table.
+        A 1st key is removed along with its last 2nd key.
 
+        :complexity: See `LinearProbeTable.__delitem__`, plus shifting back the rest of the
+            top-level cluster when the 1st key is removed.
         :raises KeyError: when the key doesn't exist.
         """
-        pos1, pos2 = self._linear_probe(key[0], key[2], False)
-        self.array[pos1][pos2] = None
+        key1, key2 = key
+        try:
+            position = self._top_probe(key1, False)
+            table = self.tables[position]
+            del table[key2]
+        except KeyError:
+            raise KeyError(key1, key2) from None
         self.count -= 1
-        self.internal_level_sizes[pos1] -= 1
-
-        pos2 = (pos2 + 1) % len(self.array[pos1])
+        self.modifications += 1
+        if not table.is_empty():
+            return
 
-        while self.array[pos1][pos2] is not None:
-            key1, key2, value = self.array[pos1][pos2]
-            self.array[pos1][pos2] = None
+        # Remove the 1st key, then shift the rest of its cluster back into the hole,
+        # unless that would move a key before its home.
+        keys1, tables, homes = self.keys1, self.tables, self.homes
+        size = self.table_size
+        hole = position
+        keys1[hole] = tables[hole] = None
+        homes[hole] = 0
+        self.top_count -= 1
+        position = (hole + 1) % size
+        while keys1[position] is not None:
+            if (position - homes[position]) % size >= (position - hole) % size:
+                keys1[hole], tables[hole], homes[hole] = keys1[position], tables[position], homes[position]
+                keys1[position] = tables[position] = None
+                homes[position] = 0
+                hole = position
+            position = (position + 1) % size
+        self.occupied[hole] = 0
+
+    @classmethod
+    def from_items(cls, items: Iterable[tuple[tuple[K1, K2], V]], expected_size: int|None=None, sort_by_bucket: bool=False, **kwargs) -> DoubleKeyTable[K1, K2, V]:
+        """
+        Returns a new table holding the ((key1, key2), value) pairs, see `update_many`.
+        Other keyword arguments are passed to the constructor.
+        """
+        table = cls(**kwargs)
+        table.update_many(items, expected_size, sort_by_bucket)
+        return table
 
-            newpos1, newpos2 = self._linear_probe(key1, key2, True)
-            self.array[newpos1][newpos2] = (newpos1, newpos2, value)
-            pos2 = (pos2 + 1) % len(self.array[pos1])
+    def update_many(self, items: Iterable[tuple[tuple[K1, K2], V]], expected_size: int|None=None, sort_by_bucket: bool=False) -> None:
+        """
+        Set many ((key1, key2), value) pairs, later pairs winning over earlier ones with the same keys.
+
+        The pairs are grouped by 1st key first. The top level is then grown
+        straight to the size it needs, and each internal table is loaded with
+        `LinearProbeTable.update_many`, sized for its group.
+
+        :param expected_size: Number of distinct 1st keys the top level will hold afterwards, when known.
+            By default, every 1st key is assumed new. The internal tables are sized for their groups.
+        :param sort_by_bucket: Place the keys of every table in order of position.
+        :complexity: O(N*(hash1(K1) + hash2(K2))) without probing, O(N log N) more when sorting,
+            where N is the number of items.
+        :raises FullError: when a table cannot be resized further.
+        """
+        groups: dict[K1, list[tuple[K2, V]]] = {}
+        for (key1, key2), data in items:
+            groups.setdefault(key1, []).append((key2, data))
+
+        self.reserve(expected_size if expected_size is not None else self.top_count + len(groups))
+        table_size = self.table_size
+        homes = [(self.hash1(key1), key1) for key1 in groups]
+        if sort_by_bucket:
+            homes.sort(key=lambda entry: entry[0])
+        for home, key1 in homes:
+            if self.table_size != table_size:
+                # More 1st keys than there was room for, so homes have moved.
+                home = None
+            table = self.tables[self._top_insert(key1, home)]
+            old_count, old_size = len(table), table.table_size
+            table.update_many(groups[key1], sort_by_bucket=sort_by_bucket)
+            if len(table) != old_count:
+                self.count += len(table) - old_count
+                self.modifications += 1
+            self.internal_rehashes += table.table_size != old_size
+            if self.top_count > self.table_size * self.max_load_factor:
+                self._rehash()
+
+    def reserve(self, size: int) -> None:
+        """
+        Grow the top level (all at once) to the first of TABLE_SIZES which holds size 1st keys.
 
+        :complexity: See `_rehash`, when the top level grows.
+        """
+        size_index = self.size_index
+        while size_index < len(self.TABLE_SIZES) - 1 and size > self.TABLE_SIZES[size_index] * self.max_load_factor:
+            size_index += 1
+        if size_index > self.size_index:
+            self._rehash(size_index)
 
-    def _rehash(self) -> None:
+    def _rehash(self, size_index: int|None=None) -> None:
         """
-        Need to resize table and reinsert all values
+        Need to resize the top level and reinsert all 1st keys.
+        The top level grows to the next of TABLE_SIZES, or to TABLE_SIZES[size_index] if given.
+        The internal tables are moved as they are, without rehashing.
 
-        :complexity best: O(N*hash(K)) No probing.
-        :complexity worst: O(N*hash(K) + N^2*comp(K)) Lots of probing.
-        Where N is len(self)
+        :complexity best: O(N*hash1(K1)) No probing.
+        :complexity worst: O(N*hash1(K1) + N^2*comp(K1)) Lots of probing.
+        Where N is the number of 1st keys.
         """
-        self.top_size_index += 1
-        self.internal_size_index += 1
-        old_array = self.array
-        if self.top_size_index == len(self.TABLE_SIZES): #We cannot resize anymore
+        old_keys1, old_tables = self.keys1, self.tables
+        if size_index is None:
+            size_index = self.size_index + 1
+        if size_index >= len(self.TABLE_SIZES):
+            # Cannot be resized further.
             return
-        
-        self.array = ArrayR(self.TABLE_SIZES[self.top_size_index])
-        self.count = 0
-        for i in range(len(old_array)):
-            old_sub_array = old_array[i]
-            self.array[i] = ArrayR(self.TABLE_SIZES[self.internal_size_index])
-            for elem in old_sub_array:
-                if elem is not None:
-                    key1, key2, val = elem
-                    self[key1][key2] = val
-
-
-       
-
+        self.size_index = size_index
+        self.keys1 = ArrayR(self.TABLE_SIZES[self.size_index])
+        self.tables = ArrayR(self.TABLE_SIZES[self.size_index])
+        self.homes = Int64ArrayR(self.TABLE_SIZES[self.size_index])
+        self.occupied = bytearray(self.TABLE_SIZES[self.size_index])
+        self.top_rehashes += 1
+        self.modifications += 1
+        for i in range(len(old_keys1)):
+            key1 = old_keys1[i]
+            if key1 is not None:
+                home = self.hash1(key1)
+                position = self._top_probe(key1, True, home)
+                self.keys1[position] = key1
+                self.tables[position] = old_tables[i]
+                self.homes[position] = home
+                self.occupied[position] = 1
+
+    @property
     def table_size(self) -> int:
         """
         Return the current size of the table (different from the length)
         """
-        return self.top_level_sizes[self.top_size_index]
+        return len(self.keys1)
 
     def __len__(self) -> int:
         """
@@ -239,62 +413,88 @@ class DoubleKeyTable(Generic[K1, K2, V]):
 
     def __str__(self) -> str:
         """
-        String representation.
+        Returns all the key/value pairs in our hash table (no particular order).
 
-        Not required but may be a good testing tool.
+        :complexity: O(N * (str(key) + str(value))) where N is the total size of the tables.
         """
-        pass
+        result = ""
+        for i in range(self.table_size):
+            key1 = self.keys1[i]
+            if key1 is not None:
+                for key2, value in zip(self.tables[i].keys(), self.tables[i].values()):
+                    result += "(" + str(key1) + "," + str(key2) + "," + str(value) + ")\n"
+        return result
+
+class TopLevelKeyIterator(Generic[K1]):
+    """
+    Iterates over the 1st keys of a DoubleKeyTable, reading the table as it goes.
+    Runs of empty slots are skipped with the occupied bytes of the top level.
+
+    :complexity: O(N) for a full iteration over N 1st keys, plus a scan of the occupied bytes.
+    :raises RuntimeError: from next() once keys have been added to or removed from the table.
+    """
 
-class TopLevelKeyIterator():
-    def __init__(self, hash_table: DoubleKeyTable) -> None:
+    def __init__(self, hash_table: DoubleKeyTable[K1, K2, V]) -> None:
         self.hash_table = hash_table
-        self.index = 0        
-        # self.current = hash_table.array[self.index]
+        self.modifications = hash_table.modifications
+        self.index = 0
 
-        
-    def __iter__(self):
+    def __iter__(self) -> TopLevelKeyIterator[K1]:
         return self
-    
-    def __next__(self):
-        if self.index < len(self.hash_table) - 1:
-            item = self.hash_table.array[self.index]
-            self.index += 1
-            return item
-        else:
+
+    def __next__(self) -> K1:
+        hash_table = self.hash_table
+        if hash_table.modifications != self.modifications:
+            raise RuntimeError("DoubleKeyTable changed during iteration")
+        position = hash_table.occupied.find(1, self.index)
+        if position == -1:
+            self.index = hash_table.table_size
             raise StopIteration
-      
-       
-class BottomLevelIterator():
+        self.index = position + 1
+        return hash_table.keys1[position]
+
+class BottomLevelIterator(Generic[K2, V]):
+    """
+    Iterates over the 2nd keys (or values) of a DoubleKeyTable, reading the table as it goes.
+    Given a 1st key, only its internal table is visited, otherwise every internal table is.
+    Runs of empty slots are skipped with the occupied bytes of each table.
+
+    :complexity: O(N) for a full iteration over N entries, plus a scan of the occupied bytes.
+    :raises RuntimeError: from next() once keys have been added to or removed from the table.
+    """
 
-    def __init__(self, hash_table: DoubleKeyTable, key=None) -> None:
+    def __init__(self, hash_table: DoubleKeyTable[K1, K2, V], key: K1|None=None, values: bool=False) -> None:
+        """
+        :raises KeyError: when key is not a top-level key.
+        """
         self.hash_table = hash_table
-        self.index = 0
+        self.modifications = hash_table.modifications
         self.given_key = key is not None
-        if key is not None: #We only want to traverse a certain index in the hash table
-            self.position = hash_table.hash1(key)
-            # self.current = hash_table.array[self.position][self.index]
-        else: #We want to traverse every value in the table
-            while hash_table.internal_sizes[self.index] == 0:
-                self.index += 1
-            self.internal_index = 0
-
-    def __iter__(self):
-        return self
-    
-    def __next__(self):
-        if self.given_key:
-            if self.index < len(self.hash_table[self.position]):
-                item = self.hash_table[self.position][self.index]
-                self.index += 1
-                return item
-            else:
-                raise StopIteration
+        # Position of the internal table in the top level, and of the next slot in it.
+        if key is not None:
+            self.position = hash_table._top_probe(key, False)
         else:
-            item = self.hash_table[self.index][self.internal_index]
-            self.internal_index += 1
-            if self.internal_index >= self.hash_table.TABLE_SIZES[self.hash_table.internal_size_index] or self.hash_table[self.index][self.internal_index] == None:
-                if self.index >= len(self.hash_table) - 1:
-                    raise StopIteration
-                self.index += 1
-                self.internal_index = 0
-            return item
\ No newline at end of file
+            self.position = hash_table.occupied.find(1)
+        self.index = 0
+        # Index into each slot's (key, value) pair.
+        self.item = 1 if values else 0
+
+    def __iter__(self) -> BottomLevelIterator[K2, V]:
+        return self
+
+    def __next__(self) -> K2|V:
+        hash_table = self.hash_table
+        if hash_table.modifications != self.modifications:
+            raise RuntimeError("DoubleKeyTable changed during iteration")
+        while self.position != -1:
+            table = hash_table.tables[self.position]
+            index = table.occupied.find(1, self.index)
+            if index != -1:
+                self.index = index + 1
+                return table.array[index][self.item]
+            if self.given_key:
+                break
+            self.position = hash_table.occupied.find(1, self.position + 1)
+            self.index = 0
+        self.position = -1
+        raise StopIteration
@@ -10,6 +10,7 @@ from mountain import Mountain
 from utils import av, bezier
 from constants import DrawMode
 from trail import Trail, TrailSeries, TrailSplit
+from trail_journal import TrailJournal, EDIT_MOUNTAIN
 
 @dataclass
 class Box:
@@ -25,8 +26,9 @@ class Box:
                 return True
         return False
 
-# These inheritance models are just for hinting that we are injection
-# the box attributes into the existing trail classes.
+# These inheritance models are just for hinting at the boxes attached to
+# each trail object. As the trail classes are slotted, TrailDraw keeps the
+# boxes of plain trail objects in its own table (see `set_box`/`get_box`).
 
 @dataclass
 class TrailSplitBox(TrailSplit):
@@ -64,8 +66,27 @@ class TrailDraw:
     ### Click constants
     LINE_VERTICAL_BOX = MOUNTAIN_HEIGHT / 2
 
-    def __init__(self, trail: TrailBox) -> None:
+    def __init__(self, trail: TrailBox, journal: TrailJournal|None = None) -> None:
         self.trail = trail
+        # (id(trail object), box name) -> (trail object, Box), refilled on every draw.
+        # The object is kept so that its id is not reused by another while the box is held.
+        self.boxes: dict[tuple[int, str], tuple[Trail|TrailSeries|TrailSplit, Box]] = {}
+        # Records the edits made through actions, if given.
+        self.journal = journal
+        # Path to the mountain most recently handed out for editing.
+        self.edit_path: tuple[str, ...] = ()
+
+    def set_box(self, obj: Trail|TrailSeries|TrailSplit, name: str, box: Box) -> None:
+        self.boxes[id(obj), name] = (obj, box)
+
+    def get_box(self, obj: Trail|TrailSeries|TrailSplit, name: str) -> Box:
+        stored, box = self.boxes.get((id(obj), name), (None, None))
+        if stored is not obj:
+            box = None
+        if box is None:
+            # Box subclasses carry their own boxes.
+            box = getattr(obj, name, None)
+        return box if box is not None else Box()
 
     # VISUAL CALCULATIONS
 
@@ -102,6 +123,7 @@ class TrailDraw:
 
     def draw_in_box(self, height, width, minx, miny, cur_trail: TrailBox|None=None) -> None:
         if cur_trail is None:
+            self.boxes = {}
             ref_trail = self.trail
             cur_trail = self.trail.store
         else:
@@ -109,9 +131,9 @@ class TrailDraw:
             cur_trail = cur_trail.store
         if cur_trail is None:
             self.draw_line(minx, miny + height/2, minx + width, miny + height/2)
-            ref_trail.trail_box = Box(minx, miny + height/2-self.LINE_VERTICAL_BOX, width, 2*self.LINE_VERTICAL_BOX)
+            self.set_box(ref_trail, "trail_box", Box(minx, miny + height/2-self.LINE_VERTICAL_BOX, width, 2*self.LINE_VERTICAL_BOX))
         elif isinstance(cur_trail, TrailSeries):
-            ref_trail.trail_box = Box(minx, miny, width, height)
+            self.set_box(ref_trail, "trail_box", Box(minx, miny, width, height))
             p1 = self.TOTAL_MOUNTAIN_WIDTH
             p2 = self.required_width(cur_trail.following)
             total = p1 + p2
@@ -129,13 +151,13 @@ class TrailDraw:
             self.draw_line(start_mountain_trail_x, mid, start_mountain_x, mid)
             self.draw_line(end_mountain_x, mid, end_mountain_trail_x, mid)
             mountain_actual_height = self.MOUNTAIN_HEIGHT * (end_mountain_x - start_mountain_x) / self.MIN_MOUNTAIN_WIDTH
-            cur_trail.before_box = Box(start_mountain_trail_x, mid - mountain_actual_height/2, start_mountain_x - start_mountain_trail_x, mountain_actual_height)
-            cur_trail.mountain_box = Box(start_mountain_x, mid - mountain_actual_height/2, end_mountain_x - start_mountain_x, mountain_actual_height)
-            cur_trail.after_box = Box(end_mountain_x, mid - mountain_actual_height/2, end_mountain_trail_x - end_mountain_x, mountain_actual_height)
+            self.set_box(cur_trail, "before_box", Box(start_mountain_trail_x, mid - mountain_actual_height/2, start_mountain_x - start_mountain_trail_x, mountain_actual_height))
+            self.set_box(cur_trail, "mountain_box", Box(start_mountain_x, mid - mountain_actual_height/2, end_mountain_x - start_mountain_x, mountain_actual_height))
+            self.set_box(cur_trail, "after_box", Box(end_mountain_x, mid - mountain_actual_height/2, end_mountain_trail_x - end_mountain_x, mountain_actual_height))
             # Draw rest
             self.draw_in_box(height, p2/total*width, minx+p1_total_dist, miny, cur_trail.following)
         else:
-            ref_trail.trail_box = Box(minx, miny, width, height)
+            self.set_box(ref_trail, "trail_box", Box(minx, miny, width, height))
             b1 = self.required_width(cur_trail.top)
             b2 = self.required_width(cur_trail.bottom)
             b3 = self.required_width(cur_trail.following)
@@ -157,8 +179,8 @@ class TrailDraw:
             # Draw branches
             self.draw_branch(minx, mid, minx+self.BRANCH_WIDTH, miny + bot_section + self.BRANCH_SEPARATION + top_section / 2, miny + bot_section / 2)
             self.draw_branch(minx + width - b3_dist, mid, minx + width - self.BRANCH_WIDTH - b3_dist, miny + bot_section + self.BRANCH_SEPARATION + top_section / 2, miny + bot_section / 2)
-            cur_trail.branch_start_box = Box(minx, mid - self.BRANCH_SEPARATION/2 - top_section/2, self.BRANCH_WIDTH, bot_section/2 + top_section/2 + self.BRANCH_SEPARATION)
-            cur_trail.branch_end_box = Box(minx+width-b3_dist-self.BRANCH_WIDTH, mid - self.BRANCH_SEPARATION/2 - top_section/2, self.BRANCH_WIDTH, bot_section/2 + top_section/2 + self.BRANCH_SEPARATION)
+            self.set_box(cur_trail, "branch_start_box", Box(minx, mid - self.BRANCH_SEPARATION/2 - top_section/2, self.BRANCH_WIDTH, bot_section/2 + top_section/2 + self.BRANCH_SEPARATION))
+            self.set_box(cur_trail, "branch_end_box", Box(minx+width-b3_dist-self.BRANCH_WIDTH, mid - self.BRANCH_SEPARATION/2 - top_section/2, self.BRANCH_WIDTH, bot_section/2 + top_section/2 + self.BRANCH_SEPARATION))
             # Draw top & bottom
             self.draw_in_box(top_section, branch_dist, minx+self.BRANCH_WIDTH, miny+bot_section+self.BRANCH_SEPARATION, cur_trail.top)
             self.draw_in_box(bot_section, branch_dist, minx+self.BRANCH_WIDTH, miny, cur_trail.bottom)
@@ -212,7 +234,12 @@ class TrailDraw:
             for t in range(101)
         ], (0, 0, 0), 1)
 
-    def box_and_action(self, mouse_pos: tuple[float, float], mode=DrawMode, cur_trail: Trail|None=None, parent_sets: tuple[Trail, str]|None=None) -> tuple[Box|None, function|None, Trail|None]:
+    def record_edit(self, mountain: Mountain) -> None:
+        """Records that the mountain handed out by the last edit action now has the values of mountain."""
+        if self.journal is not None:
+            self.journal.record(EDIT_MOUNTAIN, self.edit_path, mountain)
+
+    def box_and_action(self, mouse_pos: tuple[float, float], mode=DrawMode, cur_trail: Trail|None=None, parent_sets: tuple[Trail, str]|None=None, path: tuple[str, ...]=()) -> tuple[Box|None, function|None, Trail|None]:
         if cur_trail is None:
             ref_trail = self.trail
             cur_trail = self.trail.store
@@ -220,36 +247,46 @@ class TrailDraw:
         else:
             ref_trail = cur_trail
             cur_trail = cur_trail.store
-        if mouse_pos not in ref_trail.trail_box:
+        if mouse_pos not in self.get_box(ref_trail, "trail_box"):
             return None, None, None
+        def record(cur_method, m):
+            if self.journal is not None:
+                self.journal.record(cur_method.__name__, path, *m)
         def set_m(ref, cur_method):
             def func(*m):
                 ref.store = cur_method(*m)
+                record(cur_method, m)
             return func
         def set_parent(parent_set, cur_method):
             parent, attribute = parent_set
             def func(*m):
                 setattr(parent, attribute, cur_method(*m))
+                record(cur_method, m)
+            return func
+        def get_m(series):
+            def func():
+                self.edit_path = path
+                return series.mountain
             return func
         if cur_trail is None:
             if mode in [DrawMode.ADD_MOUNTAIN, DrawMode.ADD_BRANCH]:
-                return ref_trail.trail_box, set_parent(parent_sets, ref_trail.add_mountain_before if mode == DrawMode.ADD_MOUNTAIN else ref_trail.add_empty_branch_before), cur_trail
+                return self.get_box(ref_trail, "trail_box"), set_parent(parent_sets, ref_trail.add_mountain_before if mode == DrawMode.ADD_MOUNTAIN else ref_trail.add_empty_branch_before), cur_trail
         elif isinstance(cur_trail, TrailSeries):
-            if mouse_pos in cur_trail.before_box and mode in [DrawMode.ADD_MOUNTAIN, DrawMode.ADD_BRANCH]:
-                return cur_trail.before_box, set_m(ref_trail, cur_trail.add_mountain_before if mode == DrawMode.ADD_MOUNTAIN else cur_trail.add_empty_branch_before), cur_trail
-            if mouse_pos in cur_trail.mountain_box and mode in [DrawMode.REMOVE, DrawMode.EDIT]:
-                return cur_trail.mountain_box, (set_m(ref_trail, cur_trail.remove_mountain) if mode == DrawMode.REMOVE else lambda: cur_trail.mountain), cur_trail
-            if mouse_pos in cur_trail.after_box and mode in [DrawMode.ADD_MOUNTAIN, DrawMode.ADD_BRANCH]:
-                return cur_trail.after_box, set_m(ref_trail, cur_trail.add_mountain_after if mode == DrawMode.ADD_MOUNTAIN else cur_trail.add_empty_branch_after), cur_trail
-            return self.box_and_action(mouse_pos, mode, cur_trail.following, (cur_trail, 'following'))
+            if mouse_pos in self.get_box(cur_trail, "before_box") and mode in [DrawMode.ADD_MOUNTAIN, DrawMode.ADD_BRANCH]:
+                return self.get_box(cur_trail, "before_box"), set_m(ref_trail, cur_trail.add_mountain_before if mode == DrawMode.ADD_MOUNTAIN else cur_trail.add_empty_branch_before), cur_trail
+            if mouse_pos in self.get_box(cur_trail, "mountain_box") and mode in [DrawMode.REMOVE, DrawMode.EDIT]:
+                return self.get_box(cur_trail, "mountain_box"), (set_m(ref_trail, cur_trail.remove_mountain) if mode == DrawMode.REMOVE else get_m(cur_trail)), cur_trail
+            if mouse_pos in self.get_box(cur_trail, "after_box") and mode in [DrawMode.ADD_MOUNTAIN, DrawMode.ADD_BRANCH]:
+                return self.get_box(cur_trail, "after_box"), set_m(ref_trail, cur_trail.add_mountain_after if mode == DrawMode.ADD_MOUNTAIN else cur_trail.add_empty_branch_after), cur_trail
+            return self.box_and_action(mouse_pos, mode, cur_trail.following, (cur_trail, 'following'), path + ('following',))
         else:
-            if mouse_pos in cur_trail.branch_start_box and mode == DrawMode.REMOVE:
-                return cur_trail.branch_start_box, set_m(ref_trail, cur_trail.remove_branch), cur_trail
-            if mouse_pos in cur_trail.branch_end_box and mode == DrawMode.REMOVE:
-                return cur_trail.branch_end_box, set_m(ref_trail, cur_trail.remove_branch), cur_trail
-            if mouse_pos in cur_trail.bottom.trail_box:
-                return self.box_and_action(mouse_pos, mode, cur_trail.bottom, (cur_trail, 'bottom'))
-            if mouse_pos in cur_trail.top.trail_box:
-                return self.box_and_action(mouse_pos, mode, cur_trail.top, (cur_trail, 'top'))
-            return self.box_and_action(mouse_pos, mode, cur_trail.following, (cur_trail, 'following'))
+            if mouse_pos in self.get_box(cur_trail, "branch_start_box") and mode == DrawMode.REMOVE:
+                return self.get_box(cur_trail, "branch_start_box"), set_m(ref_trail, cur_trail.remove_branch), cur_trail
+            if mouse_pos in self.get_box(cur_trail, "branch_end_box") and mode == DrawMode.REMOVE:
+                return self.get_box(cur_trail, "branch_end_box"), set_m(ref_trail, cur_trail.remove_branch), cur_trail
+            if mouse_pos in self.get_box(cur_trail.bottom, "trail_box"):
+                return self.box_and_action(mouse_pos, mode, cur_trail.bottom, (cur_trail, 'bottom'), path + ('bottom',))
+            if mouse_pos in self.get_box(cur_trail.top, "trail_box"):
+                return self.box_and_action(mouse_pos, mode, cur_trail.top, (cur_trail, 'top'), path + ('top',))
+            return self.box_and_action(mouse_pos, mode, cur_trail.following, (cur_trail, 'following'), path + ('following',))
         return None, None, None
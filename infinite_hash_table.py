@@ -1,7 +1,6 @@
 from __future__ import annotations
-from typing import Generic, TypeVar
-
-from data_structures.referential_array import ArrayR
+from string import ascii_lowercase
+from typing import Generic, Iterator, TypeVar
 
 K = TypeVar("K")
 V = TypeVar("V")
@@ -12,62 +11,231 @@ class InfiniteHashTable(Generic[K, V]):
 
     Type Arguments:
         - K:    Key Type. In most cases should be string.
-                Otherwise `hash` should be overwritten.
+                Otherwise `hash` should be overwritten, in a subclass:
+                tables have __slots__, so it cannot be set on an instance.
         - V:    Value Type.
 
+    Each level is a table of TABLE_SIZE positions. A position holds a single
+    (key, value) pair, or a table of the next level for the keys which hash
+    there. Rather than a TABLE_SIZE slot array, a table keeps only the
+    positions in use, as in a hash array mapped trie: bit p of `bitmap` is set
+    when position p is in use, and `children` holds two slots for each, in
+    order of position. These are the key and its value, or None and the table
+    of the next level. The slots of position p start at twice the number of
+    bits set below bit p.
+
+    `children` is a tuple, replaced whenever it changes, rather than an ArrayR:
+    a ctypes array takes around 300 bytes before holding anything, more than
+    the references of a whole TABLE_SIZE level.
+
     Unless stated otherwise, all methods have O(1) complexity.
     """
 
     TABLE_SIZE = 27
 
-    def __init__(self) -> None:
-        raise NotImplementedError()
+    __slots__ = ("level", "bitmap", "children", "count")
 
-    def hash(self, key: K) -> int:
-        if self.level < len(key):
-            return ord(key[self.level]) % (self.TABLE_SIZE-1)
+    def __init__(self, level: int = 0) -> None:
+        """
+        :param level: Level of this table, 0 for the top one.
+        """
+        self.level = level
+        self.bitmap = 0
+        self.children: tuple = ()
+        # Number of keys, only kept by the top level table.
+        self.count = 0
+
+    def hash(self, key: K, level: int|None = None) -> int:
+        """
+        Position of a key in a table of the given level, this table's level by default.
+
+        :complexity: O(1)
+        """
+        if level is None:
+            level = self.level
+        if level < len(key):
+            return ord(key[level]) % (self.TABLE_SIZE-1)
         return self.TABLE_SIZE-1
 
+    def _slot(self, position: int) -> int:
+        """Returns where the slots of a position in use start in children."""
+        return 2 * (self.bitmap & ((1 << position) - 1)).bit_count()
+
+    def _insert(self, position: int, key: K|None, value: V|InfiniteHashTable) -> None:
+        """
+        Start using a position, growing children by two slots.
+
+        :complexity: O(P) where P is the number of positions in use.
+        """
+        slot = self._slot(position)
+        self.children = self.children[:slot] + (key, value) + self.children[slot:]
+        self.bitmap |= 1 << position
+
+    def _replace(self, slot: int, key: K|None, value: V|InfiniteHashTable) -> None:
+        """
+        Change what the two slots from slot hold.
+
+        :complexity: O(P) where P is the number of positions in use.
+        """
+        self.children = self.children[:slot] + (key, value) + self.children[slot + 2:]
+
+    def _remove(self, position: int) -> None:
+        """
+        Stop using a position, shrinking children by two slots.
+
+        :complexity: O(P) where P is the number of positions in use.
+        """
+        slot = self._slot(position)
+        self.children = self.children[:slot] + self.children[slot + 2:]
+        self.bitmap &= ~(1 << position)
+
     def __getitem__(self, key: K) -> V:
         """
         Get the value at a certain key
 
+        :complexity: O(L * hash(key)) where L is the number of levels searched.
         :raises KeyError: when the key doesn't exist.
         """
-        raise NotImplementedError()
+        table = self
+        while True:
+            position = table.hash(key)
+            if not table.bitmap >> position & 1:
+                raise KeyError(key)
+            slot = table._slot(position)
+            stored = table.children[slot]
+            if stored is None:
+                table = table.children[slot + 1]
+            elif stored == key:
+                return table.children[slot + 1]
+            else:
+                raise KeyError(key)
 
     def __setitem__(self, key: K, value: V) -> None:
         """
         Set an (key, value) pair in our hash table.
+        When the key's position holds another key, both are moved into tables of
+        the following levels until they hash to different positions.
+
+        :complexity: O(L * (hash(key) + P)) where L is the number of levels
+            searched or added, and P the number of positions in use in each.
+        :raises ValueError: when the key and one already in the table hash the same at every level.
+        """
+        table = self
+        while True:
+            position = table.hash(key)
+            if not table.bitmap >> position & 1:
+                table._insert(position, key, value)
+                self.count += 1
+                return
+            slot = table._slot(position)
+            stored = table.children[slot]
+            if stored is None:
+                table = table.children[slot + 1]
+            elif stored == key:
+                table._replace(slot, key, value)
+                return
+            else:
+                self._check_separable(key, stored, table.level + 1)
+                following = type(self)(table.level + 1)
+                following._insert(following.hash(stored), stored, table.children[slot + 1])
+                table._replace(slot, None, following)
+                table = following
+
+    def _check_separable(self, key: K, other: K, level: int) -> None:
         """
-        raise NotImplementedError()
+        Checks that two keys hash to different positions at some level from level on,
+        before any tables are added for them.
+        Past the end of both keys, every level hashes them the same.
+
+        :complexity: O(L * hash(key)) where L is the number of levels until they part.
+        :raises ValueError: when they never do.
+        """
+        while self.hash(key, level) == self.hash(other, level):
+            if level >= len(key) and level >= len(other):
+                raise ValueError(f"{key!r} and {other!r} hash the same at every level")
+            level += 1
 
     def __delitem__(self, key: K) -> None:
         """
         Deletes a (key, value) pair in our hash table.
+        A table left holding a single key is replaced by that key in the level above.
 
+        :complexity: O(L * (hash(key) + P)) where L is the number of levels
+            searched, and P the number of positions in use in each.
         :raises KeyError: when the key doesn't exist.
         """
-        raise NotImplementedError()
+        path = []
+        table = self
+        while True:
+            position = table.hash(key)
+            if not table.bitmap >> position & 1:
+                raise KeyError(key)
+            slot = table._slot(position)
+            stored = table.children[slot]
+            if stored is None:
+                path.append((table, slot))
+                table = table.children[slot + 1]
+            elif stored == key:
+                break
+            else:
+                raise KeyError(key)
+        table._remove(position)
+        self.count -= 1
+
+        while path and table.bitmap.bit_count() == 1 and table.children[0] is not None:
+            above, slot = path.pop()
+            above._replace(slot, table.children[0], table.children[1])
+            table = above
 
     def __len__(self) -> int:
-        raise NotImplementedError()
+        return self.count
+
+    def _items(self) -> Iterator[tuple[K, V]]:
+        """
+        Yields every (key, value) pair, in order of position at each level.
+
+        :complexity: O(N) where N is the number of keys and tables.
+        """
+        for slot in range(0, len(self.children), 2):
+            key, value = self.children[slot], self.children[slot + 1]
+            if key is None:
+                yield from value._items()
+            else:
+                yield key, value
 
     def __str__(self) -> str:
         """
         String representation.
 
-        Not required but may be a good testing tool.
+        :complexity: O(N * (str(key) + str(value))) where N is the number of keys.
         """
-        raise NotImplementedError()
+        result = ""
+        for (key, value) in self._items():
+            result += "(" + str(key) + "," + str(value) + ")\n"
+        return result
 
     def get_location(self, key) -> list[int]:
         """
         Get the sequence of positions required to access this key.
 
+        :complexity: O(L * hash(key)) where L is the number of levels searched.
         :raises KeyError: when the key doesn't exist.
         """
-        raise NotImplementedError()
+        location = []
+        table = self
+        while True:
+            position = table.hash(key)
+            if not table.bitmap >> position & 1:
+                raise KeyError(key)
+            location.append(position)
+            slot = table._slot(position)
+            stored = table.children[slot]
+            if stored is None:
+                table = table.children[slot + 1]
+            elif stored == key:
+                return location
+            else:
+                raise KeyError(key)
 
     def __contains__(self, key: K) -> bool:
         """
@@ -85,5 +253,22 @@ class InfiniteHashTable(Generic[K, V]):
     def sort_keys(self, current=None) -> list[str]:
         """
         Returns all keys currently in the table in lexicographically sorted order.
+        Keys are assumed to be made of lowercase letters.
+
+        :param current: Table to list the keys of, this one by default.
+        :complexity: O(N * TABLE_SIZE) where N is the number of tables.
         """
-        raise NotImplementedError()
+        if current is None:
+            current = self
+        # Keys which end at this level first, then those continuing with a to z.
+        positions = [self.TABLE_SIZE - 1] + [ord(char) % (self.TABLE_SIZE - 1) for char in ascii_lowercase]
+        keys = []
+        for position in positions:
+            if current.bitmap >> position & 1:
+                slot = current._slot(position)
+                key = current.children[slot]
+                if key is None:
+                    keys.extend(self.sort_keys(current.children[slot + 1]))
+                else:
+                    keys.append(key)
+        return keys
@@ -5,7 +5,6 @@ Requires no student import, but will use your implemented classes as part of it'
 
 import arcade
 import arcade.gui as gui
-import json
 import sys
 import secrets
 from copy import copy
@@ -17,7 +16,7 @@ from trail import Trail, TrailSeries, TrailSplit
 from draw_trails import TrailDraw
 from mountain_organiser import MountainOrganiser
 from double_key_table import DoubleKeyTable
-from serialize import serialize, deserialize
+from trail_journal import TrailJournal
 
 class MyWindow(arcade.Window):
     """ Painter Window """
@@ -278,15 +277,16 @@ class MyWindow(arcade.Window):
         self.reset()
         self.mountain_manager = MountainManager()
         self.cur_filename = sys.argv[1] if len(sys.argv) > 1 else "basic.json"
-        with open(f"stores/{self.cur_filename}", "r") as f:
-            t = deserialize(json.loads(f.read()))
+        # Saves append the edits made to a journal, see trail_journal.py.
+        self.journal = TrailJournal(f"stores/{self.cur_filename}")
+        t = self.journal.load()
         try:
             # Try to add all existing mountains
-            for mountain in t.collect_all_mountains():
+            for mountain in t.iter_mountains():
                 self.mountain_manager.add_mountain(mountain)
         except NotImplementedError:
             pass
-        self.mountain = TrailDraw(t)
+        self.mountain = TrailDraw(t, self.journal)
         self.draw_box = None
 
     def on_draw(self) -> None:
@@ -393,11 +393,14 @@ class MyWindow(arcade.Window):
         to = MountainOrganiser()
         positions = DoubleKeyTable()
         positions.hash1 = lambda k: (k % positions.table_size)
+        positions.update_many(
+            ((mountain.difficulty_level, mountain.name), [])
+            for group in groups
+            for mountain in group
+        )
         all_mountains = []
         for i, group in enumerate(groups):
             to.add_mountains(group)
-            for mountain in group:
-                positions[mountain.difficulty_level, mountain.name] = []
             all_mountains.extend(group)
             for mountain in all_mountains:
                 positions[mountain.difficulty_level, mountain.name].append(to.cur_position(mountain))
@@ -449,6 +452,7 @@ class MyWindow(arcade.Window):
         self.cur_editing_mountain.name = self.input_mountain_name.text
         self.cur_editing_mountain.difficulty_level = int(self.input_difficulty_level.text)
         self.cur_editing_mountain.length = int(self.input_length.text)
+        self.mountain.record_edit(self.cur_editing_mountain)
         try:
             self.mountain_manager.edit_mountain(old_mountain, self.cur_editing_mountain)
         except NotImplementedError:
@@ -463,8 +467,7 @@ class MyWindow(arcade.Window):
 
     def on_file_save_clicked(self, event):
         new_path = str(self.input_file_name.text)
-        with open(f"stores/{new_path}", "w") as f:
-            f.write(serialize(self.mountain.trail))
+        self.journal.save(self.mountain.trail, f"stores/{new_path}")
         # Close the window.
         self.on_file_close_clicked(event)
 
@@ -15,6 +15,13 @@ class WalkerPersonality(ABC):
     def add_mountain(self, mountain: Mountain) -> None:
         self.mountains.append(mountain)
 
+    def add_mountains(self, mountains: list[Mountain]) -> None:
+        """
+        Add a whole section of mountains, in order.
+        Used by `Trail.follow_paths`, override together with `add_mountain`.
+        """
+        self.mountains.extend(mountains)
+
     @abstractmethod
     def select_branch(self, top_branch: Trail, bottom_branch: Trail) -> PersonalityDecision:
         pass
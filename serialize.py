@@ -1,31 +1,83 @@
 from __future__ import annotations
-import dataclasses, json
+import dataclasses, io, json, mmap, re
+from json.decoder import scanstring
+from json.encoder import encode_basestring_ascii
+from typing import IO, Iterator
 
-from trail import Trail, TrailSplit, TrailSeries
+from trail import Trail, TrailSplit, TrailSeries, TrailStore, LazyTrail
 from mountain import Mountain
 
-# https://stackoverflow.com/questions/51286748/make-the-python-json-encoder-support-pythons-new-dataclasses
-class EnhancedJSONEncoder(json.JSONEncoder):
-    def default(self, o):
-        if dataclasses.is_dataclass(o):
-            res = dataclasses.asdict(o)
-            self.remove_box(res)
-            return res
-        return super().default(o)
-
-    def remove_box(self, obj):
-        if isinstance(obj, dict):
-            rm_keys = list(filter(lambda x: x.endswith("_box"), obj.keys()))
-            for key in rm_keys:
-                del obj[key]
-            for key in obj.keys():
-                self.remove_box(obj[key])
-        if isinstance(obj, list):
-            for o in obj:
-                self.remove_box(o)
-
-def serialize(trail):
-    return json.dumps(trail, cls=EnhancedJSONEncoder)
+# Per dataclass, the text written before each saved field, see _field_prefixes.
+_FIELD_PREFIXES: dict[type, tuple[tuple[str, str], ...]] = {}
+
+def _field_prefixes(cls: type) -> tuple[tuple[str, str], ...]|None:
+    """
+    For a dataclass, returns (text before the field, field name) for each field which is saved, in order.
+    Draw boxes are skipped. Returns None when cls is not a dataclass.
+    """
+    prefixes = _FIELD_PREFIXES.get(cls)
+    if prefixes is None:
+        if not dataclasses.is_dataclass(cls):
+            return None
+        names = [field.name for field in dataclasses.fields(cls) if not field.name.endswith("_box")]
+        prefixes = tuple(
+            (("{" if i == 0 else ", ") + encode_basestring_ascii(name) + ": ", name)
+            for i, name in enumerate(names)
+        )
+        _FIELD_PREFIXES[cls] = prefixes
+    return prefixes
+
+def _encode_value(value) -> str:
+    """JSON text of a value which is not a dataclass, exactly as json.dumps writes it."""
+    if value.__class__ is str:
+        return encode_basestring_ascii(value)
+    if value.__class__ is int:
+        return int.__repr__(value)
+    return json.dumps(value)
+
+def serialize_file(trail: Trail, f: IO[str], buffer_size: int = 1 << 12) -> None:
+    """
+    Writes trail to the file object f, in the same format as `serialize`.
+
+    Nodes are walked with an explicit stack and written out as they are reached,
+    so no copy of the trail is made and trails of any depth can be saved.
+    Draw box fields are never visited.
+
+    :complexity: O(C) where C is the number of characters written.
+    """
+    # Stack items are text to write as is (str) or a value to encode, wrapped in a 1-tuple.
+    stack = [(trail,)]
+    parts = []
+    while stack:
+        item = stack.pop()
+        if item.__class__ is str:
+            parts.append(item)
+            continue
+        value = item[0]
+        prefixes = _field_prefixes(value.__class__)
+        if prefixes is None:
+            parts.append(_encode_value(value))
+        elif not prefixes:
+            parts.append("{}")
+        else:
+            stack.append("}")
+            for i in range(len(prefixes) - 1, 0, -1):
+                prefix, name = prefixes[i]
+                stack.append((getattr(value, name),))
+                stack.append(prefix)
+            prefix, name = prefixes[0]
+            stack.append((getattr(value, name),))
+            parts.append(prefix)
+        if len(parts) >= buffer_size:
+            f.write("".join(parts))
+            parts = []
+    f.write("".join(parts))
+
+def serialize(trail: Trail) -> str:
+    """Returns trail as a JSON string. See serialize_file."""
+    f = io.StringIO()
+    serialize_file(trail, f)
+    return f.getvalue()
 
 def deserialize(obj):
     if obj["store"] is None:
@@ -42,3 +94,287 @@ def deserialize(obj):
             deserialize(obj["store"]["following"])
         )
     return Trail(inside)
+
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_STRING_BODY = re.compile(r'(?:[^"\\]|\\.)*"', re.DOTALL)
+_NUMBER = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?')
+_LITERALS = {"true": True, "false": False, "null": None}
+# Token kinds, besides the punctuation characters themselves.
+_STRING = "string"
+_SCALAR = "scalar"
+
+def _json_tokens(f: IO[str], chunk_size: int) -> Iterator[tuple[str, object]]:
+    """
+    Yields (kind, value) for each JSON token read from f, chunk_size characters at a time.
+    Kind is one of '{', '}', '[', ']', ':', ',', _STRING or _SCALAR.
+
+    :raises ValueError: on text which is not JSON.
+    """
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def read_more() -> None:
+        nonlocal buffer, pos, eof
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    while True:
+        pos = _WHITESPACE.match(buffer, pos).end()
+        if pos == len(buffer):
+            if eof:
+                return
+            read_more()
+            continue
+        char = buffer[pos]
+        if char in "{}[]:,":
+            pos += 1
+            yield char, None
+        elif char == '"':
+            body = _STRING_BODY.match(buffer, pos + 1)
+            if body is None:
+                if eof:
+                    raise ValueError("Unterminated string in trail file")
+                read_more()
+                continue
+            value, pos = scanstring(buffer, pos + 1)
+            yield _STRING, value
+        else:
+            number = _NUMBER.match(buffer, pos)
+            if number is not None and number.end() < len(buffer):
+                text = number.group()
+                pos = number.end()
+                yield _SCALAR, float(text) if any(c in text for c in ".eE") else int(text)
+                continue
+            for literal, value in _LITERALS.items():
+                if buffer.startswith(literal, pos):
+                    pos += len(literal)
+                    yield _SCALAR, value
+                    break
+            else:
+                # The token may continue in the next chunk.
+                if not eof:
+                    read_more()
+                    continue
+                if number is not None:
+                    text = number.group()
+                    pos = number.end()
+                    yield _SCALAR, float(text) if any(c in text for c in ".eE") else int(text)
+                    continue
+                raise ValueError(f"Unexpected {buffer[pos:pos + 10]!r} in trail file")
+
+def _build(obj: dict, key: str|None):
+    """Turns a finished JSON object, found under `key` in its parent, into the trail object it describes."""
+    if key == "mountain":
+        return Mountain(**obj)
+    if "store" in obj:
+        return Trail(obj["store"])
+    if "mountain" in obj:
+        return TrailSeries(obj["mountain"], obj["following"])
+    if "top" in obj:
+        return TrailSplit(obj["top"], obj["bottom"], obj["following"])
+    return obj
+
+def deserialize_file(f: IO[str], chunk_size: int = 1 << 16) -> Trail:
+    """
+    Reads a trail saved by `serialize` from a file object, chunk_size characters at a time.
+
+    Unlike `deserialize(json.loads(...))`, no intermediate dictionaries are kept for
+    finished nodes and nothing recurses, so trails of any depth can be loaded.
+
+    :raises ValueError: when f does not hold a JSON trail.
+    :complexity: O(C) where C is the number of characters in the file.
+    """
+    # Each frame is [container, key of the container in its parent, key awaiting a value].
+    stack = []
+    root = None
+    has_root = False
+    for kind, value in _json_tokens(f, chunk_size):
+        if kind in ",:":
+            continue
+        if kind == "{" or kind == "[":
+            parent_key = stack[-1][2] if stack else None
+            stack.append([{} if kind == "{" else [], parent_key, None])
+            continue
+        if kind == "}" or kind == "]":
+            if not stack:
+                raise ValueError(f"Unmatched {kind} in trail file")
+            container, parent_key, _ = stack.pop()
+            value = _build(container, parent_key) if kind == "}" else container
+        elif kind == _STRING and stack and isinstance(stack[-1][0], dict) and stack[-1][2] is None:
+            stack[-1][2] = value
+            continue
+        # A complete value: store it in its parent.
+        if not stack:
+            if has_root:
+                raise ValueError("Extra data in trail file")
+            root, has_root = value, True
+        elif isinstance(stack[-1][0], dict):
+            stack[-1][0][stack[-1][2]] = value
+            stack[-1][2] = None
+        else:
+            stack[-1][0].append(value)
+    if stack or not isinstance(root, Trail):
+        raise ValueError("Trail file is incomplete or not a trail")
+    return root
+
+
+_BYTES_WHITESPACE = re.compile(rb'[ \t\n\r]*')
+_BYTES_STRING_BODY = re.compile(rb'(?:[^"\\]|\\.)*"', re.DOTALL)
+_BYTES_STRUCTURE = re.compile(rb'["{}\[\]]')
+_BYTES_SCALAR = re.compile(rb'[^,:{}\[\]\s]+')
+_OPEN = frozenset(b"{[")
+_CLOSE = frozenset(b"}]")
+
+class _LazyTrailReader:
+    """
+    Decodes trails from the bytes of a file saved by `serialize`, one node at a time.
+
+    Values which have to be stepped over to reach a key are scanned without being
+    built, and the end of every container scanned is remembered, so each byte of
+    the file is scanned at most once however the trail is explored.
+    """
+
+    def __init__(self, data) -> None:
+        self.data = data
+        # Start -> end (exclusive) of every container scanned so far.
+        self.ends: dict[int, int] = {}
+
+    def skip_whitespace(self, pos: int) -> int:
+        return _BYTES_WHITESPACE.match(self.data, pos).end()
+
+    def expect(self, pos: int, char: bytes) -> int:
+        """Returns the position after char, which must be the next non-whitespace character at pos."""
+        pos = self.skip_whitespace(pos)
+        if self.data[pos:pos + 1] != char:
+            raise ValueError(f"Expected {char!r} at byte {pos} of trail file")
+        return pos + 1
+
+    def string(self, pos: int) -> tuple[str, int]:
+        """Returns the JSON string starting at pos, and the position after it."""
+        body = _BYTES_STRING_BODY.match(self.data, pos + 1)
+        if self.data[pos:pos + 1] != b'"' or body is None:
+            raise ValueError(f"Expected a string at byte {pos} of trail file")
+        return json.loads(self.data[pos:body.end()]), body.end()
+
+    def skip_value(self, pos: int) -> int:
+        """Returns the position after the JSON value starting at pos."""
+        data = self.data
+        first = data[pos]
+        if first == ord('"'):
+            return self.string(pos)[1]
+        if first not in _OPEN:
+            scalar = _BYTES_SCALAR.match(data, pos)
+            if scalar is None:
+                raise ValueError(f"Expected a value at byte {pos} of trail file")
+            return scalar.end()
+        starts = []
+        while True:
+            char = data[pos]
+            if char in _OPEN:
+                end = self.ends.get(pos)
+                if end is not None:
+                    pos = end
+                    if not starts:
+                        return pos
+                else:
+                    starts.append(pos)
+                    pos += 1
+            elif char in _CLOSE:
+                pos += 1
+                self.ends[starts.pop()] = pos
+                if not starts:
+                    return pos
+            else:
+                pos = _BYTES_STRING_BODY.match(data, pos + 1).end()
+            structure = _BYTES_STRUCTURE.search(data, pos)
+            if structure is None:
+                raise ValueError("Trail file is incomplete")
+            pos = structure.start()
+
+    def trail(self, find_pos) -> LazyTrail:
+        """A lazy trail for the {"store": ...} object whose position is returned by find_pos."""
+        return LazyTrail(lambda: self.store(find_pos()))
+
+    def store(self, pos: int) -> TrailStore:
+        """Decodes the store of the {"store": ...} object at pos. Its trails are decoded lazily."""
+        store_pos = _LazyMembers(self, self.expect(pos, b"{") - 1).get("store")
+        if self.data[store_pos:store_pos + 4] == b"null":
+            return None
+        members = _LazyMembers(self, store_pos)
+        # `serialize` writes "mountain" or "top" first, so the kind is known without
+        # stepping over the other members, which hold the rest of the trail.
+        first = members.first()
+        if first == "mountain" or (first != "top" and members.has("mountain")):
+            mountain_pos = members.get("mountain")
+            mountain = Mountain(**json.loads(self.data[mountain_pos:self.skip_value(mountain_pos)]))
+            return TrailSeries(mountain, self.trail(lambda: members.get("following")))
+        return TrailSplit(
+            self.trail(lambda: members.get("top")),
+            self.trail(lambda: members.get("bottom")),
+            self.trail(lambda: members.get("following")),
+        )
+
+class _LazyMembers:
+    """The members of a JSON object, read only as far as the keys asked for."""
+
+    def __init__(self, reader: _LazyTrailReader, pos: int) -> None:
+        self.reader = reader
+        self.found: dict[str, int] = {}
+        # Position of the value of the last key found, which has not been stepped over yet.
+        self.last_value: int|None = None
+        self.pos = reader.expect(pos, b"{")
+        self.done = False
+
+    def _read_member(self) -> None:
+        reader = self.reader
+        pos = self.pos
+        if self.last_value is not None:
+            pos = reader.skip_whitespace(reader.skip_value(self.last_value))
+            if reader.data[pos:pos + 1] == b",":
+                pos += 1
+        pos = reader.skip_whitespace(pos)
+        if reader.data[pos:pos + 1] == b"}":
+            self.done = True
+            return
+        key, pos = reader.string(pos)
+        self.last_value = reader.skip_whitespace(reader.expect(pos, b":"))
+        self.found[key] = self.last_value
+        self.pos = self.last_value
+
+    def first(self) -> str|None:
+        """Returns the first key of the object, None when it has none."""
+        if not self.found and not self.done:
+            self._read_member()
+        return next(iter(self.found), None)
+
+    def has(self, key: str) -> bool:
+        """Whether the object has key. Reads members up to it, or to the end."""
+        while key not in self.found and not self.done:
+            self._read_member()
+        return key in self.found
+
+    def get(self, key: str) -> int:
+        """Returns the position of the value for key."""
+        if not self.has(key):
+            raise ValueError(f"Missing {key!r} in trail file")
+        return self.found[key]
+
+def deserialize_lazy(path: str) -> LazyTrail:
+    """
+    Returns the trail saved at path, decoded lazily.
+
+    The file is memory-mapped and each node is only decoded, from its byte offset,
+    when its store is first accessed. Walking one branch of a huge trail (e.g. with
+    `Trail.follow_path`) therefore only builds the nodes on that branch and those the
+    personality inspects. The file stays mapped while any part of the trail is in use.
+
+    :raises ValueError: when the parts of the file decoded are not a JSON trail.
+    """
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    reader = _LazyTrailReader(data)
+    return reader.trail(lambda: reader.skip_whitespace(0))
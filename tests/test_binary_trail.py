@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from ed_utils.decorators import number
+
+from mountain import Mountain
+from trail import Trail, TrailSeries, TrailSplit
+from serialize import serialize, deserialize_file
+from binary_trail import serialize_binary, load_binary, deserialize_binary
+
+class TestBinaryTrail(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".trail")
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def save(self, trail):
+        with open(self.path, "wb") as f:
+            serialize_binary(trail, f)
+
+    @number("8.4")
+    def test_round_trip(self):
+        for json_path in ["stores/basic.json", "stores/methods_example.json"]:
+            with open(json_path) as f:
+                trail = deserialize_file(f)
+            self.save(trail)
+            self.assertEqual(load_binary(self.path).to_trail(), trail)
+            self.assertEqual(serialize(deserialize_binary(self.path)), serialize(trail))
+
+        trail = Trail(TrailSplit(
+            Trail(TrailSeries(Mountain("ünïcödé", -5, 2 ** 40), Trail(None))),
+            Trail(None),
+            Trail(TrailSeries(Mountain("", 0, 0), Trail(None))),
+        ))
+        self.save(trail)
+        loaded = load_binary(self.path)
+        self.assertEqual(loaded.to_trail(), trail)
+        self.assertEqual(loaded.names[0], "ünïcödé")
+        self.assertEqual(loaded.path_statistics(), trail.path_statistics())
+
+        self.save(Trail(None))
+        self.assertEqual(deserialize_binary(self.path), Trail(None))
+
+    @number("8.5")
+    def test_bad_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"{\"store\": null}")
+        self.assertRaises(ValueError, lambda: load_binary(self.path))
+
+        self.save(Trail(TrailSeries(Mountain("m", 1, 1), Trail(None))))
+        with open(self.path, "rb") as f:
+            data = f.read()
+        with open(self.path, "wb") as f:
+            f.write(data[:-1])
+        self.assertRaises(ValueError, lambda: load_binary(self.path))
+
+    @number("8.10")
+    def test_lazy_mountains(self):
+        trail = Trail(None)
+        for i in range(50):
+            trail = Trail(TrailSeries(Mountain(f"m{i}", i, i), trail))
+        self.save(trail)
+        loaded = load_binary(self.path)
+        store = loaded.trail().store
+        self.assertEqual(store.mountain, Mountain("m49", 49, 49))
+        # Only the mountain reached is built.
+        self.assertEqual(sum(mountain is not None for mountain in loaded._mountains), 1)
+        # The bulk methods build the rest, sharing the one already built.
+        mountains = loaded.collect_all_mountains()
+        self.assertEqual(len(mountains), 50)
+        self.assertIs(mountains[0], store.mountain)
+        self.assertIs(mountains[1], store.following.store.mountain)
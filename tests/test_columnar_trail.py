@@ -0,0 +1,62 @@
+import unittest
+from ed_utils.decorators import number
+
+from mountain import Mountain
+from trail import Trail, TrailSeries, TrailSplit
+from personality import TopWalker, BottomWalker, LazyWalker
+from columnar_trail import ColumnarTrail
+
+class TestColumnarTrail(unittest.TestCase):
+
+    def load_example(self):
+        self.top_top = Mountain("top-top", 6, 3)
+        self.top_bot = Mountain("top-bot", 3, 5)
+        self.top_mid = Mountain("top-mid", 7, 2)
+        self.bot_one = Mountain("bot-one", 2, 5)
+        self.bot_two = Mountain("bot-two", 0, 0)
+        self.final   = Mountain("final", 4, 4)
+        self.trail = Trail(TrailSplit(
+            Trail(TrailSplit(
+                Trail(TrailSeries(self.top_top, Trail(None))),
+                Trail(TrailSeries(self.top_bot, Trail(None))),
+                Trail(TrailSeries(self.top_mid, Trail(None))),
+            )),
+            Trail(TrailSeries(self.bot_one, Trail(TrailSplit(
+                Trail(TrailSeries(self.bot_two, Trail(None))),
+                Trail(TrailSplit(Trail(None), Trail(None), Trail(None))),
+                Trail(None),
+            )))),
+            Trail(TrailSeries(self.final, Trail(None)))
+        ))
+        self.columnar = ColumnarTrail.from_trail(self.trail)
+
+    @number("7.8")
+    def test_round_trip(self):
+        self.load_example()
+        self.assertEqual(len(self.columnar.names), 6)
+        self.assertEqual(self.columnar.to_trail(), self.trail)
+        self.assertEqual(self.columnar.trail(), self.trail)
+        self.assertEqual(ColumnarTrail().to_trail(), Trail(None))
+
+        # Shared nodes are stored once.
+        shared = Trail(TrailSeries(self.final, Trail(None)))
+        columnar = ColumnarTrail.from_trail(Trail(TrailSplit(shared, shared, shared)))
+        # The empty trail, the series and the split.
+        self.assertEqual(len(columnar), 3)
+
+    @number("7.9")
+    def test_methods(self):
+        self.load_example()
+        names = lambda mountains: [m.name for m in mountains]
+        make_paths = lambda paths: sorted(map(names, paths))
+
+        self.assertListEqual(names(self.columnar.collect_all_mountains()), names(self.trail.collect_all_mountains()))
+        for walker_class in (TopWalker, BottomWalker, LazyWalker):
+            expected, actual = walker_class(), walker_class()
+            self.trail.follow_path(expected)
+            self.columnar.follow_path(actual)
+            self.assertListEqual(actual.mountains, expected.mountains)
+        for bound in range(8):
+            self.assertListEqual(make_paths(self.columnar.difficulty_maximum_paths(bound)), make_paths(self.trail.difficulty_maximum_paths(bound)))
+            self.assertListEqual(make_paths(self.columnar.difficulty_difference_paths(bound)), make_paths(self.trail.difficulty_difference_paths(bound)))
+        self.assertEqual(self.columnar.path_statistics(), self.trail.path_statistics())
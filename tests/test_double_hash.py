@@ -123,3 +123,96 @@ class TestDoubleHash(unittest.TestCase):
         # with an iterator.
         self.assertRaises(BaseException, lambda: next(key_iterator))
         self.assertRaises(BaseException, lambda: next(value_iterator))
+
+    @number("3.6")
+    def test_independent_resizing(self):
+        dt = DoubleKeyTable(max_load_factor=0.75, internal_max_load_factor=0.25)
+        # One busy top-level key.
+        for i in range(100):
+            dt["hot", f"m{i}"] = i
+        dt["cold", "m0"] = -1
+        self.assertEqual(dt.table_size, DoubleKeyTable.TABLE_SIZES[0])
+        self.assertEqual(dt.top_rehashes, 0)
+        self.assertGreater(dt.internal_rehashes, 0)
+        hot = dt.tables[dt._top_probe("hot", False)]
+        cold = dt.tables[dt._top_probe("cold", False)]
+        self.assertLessEqual(len(hot), hot.table_size * 0.25)
+        self.assertEqual(cold.table_size, DoubleKeyTable.TABLE_SIZES[0])
+
+        # The top level only grows on its own load.
+        for i in range(3):
+            dt[f"k{i}", "m0"] = i
+        self.assertEqual(dt.top_rehashes, 1)
+        self.assertEqual(dt.table_size, DoubleKeyTable.TABLE_SIZES[1])
+        self.assertEqual(dt["hot", "m42"], 42)
+        self.assertEqual(len(dt), 104)
+
+        self.assertRaises(ValueError, lambda: DoubleKeyTable(max_load_factor=1))
+
+    @number("3.7")
+    def test_bulk_load(self):
+        items = [((f"d{i % 7}", f"m{i}"), i) for i in range(700)]
+        for sort_by_bucket in [False, True]:
+            dt = DoubleKeyTable.from_items(items, sort_by_bucket=sort_by_bucket, internal_max_load_factor=0.25)
+            self.assertEqual(len(dt), 700)
+            self.assertEqual(dt.top_rehashes, 1)
+            # Each internal table grows once, straight to its final size.
+            self.assertEqual(dt.internal_rehashes, 7)
+            for (key1, key2), value in items:
+                self.assertEqual(dt[key1, key2], value)
+            self.assertEqual(set(dt.keys()), {f"d{i}" for i in range(7)})
+
+        dt.update_many([(("d0", "m0"), "new"), (("x", "y"), 1)])
+        self.assertEqual((dt["d0", "m0"], dt["x", "y"], len(dt)), ("new", 1, 701))
+
+        # The top level is sized for the expected number of 1st keys, not the groups seen.
+        dt = DoubleKeyTable.from_items(items, expected_size=100)
+        self.assertEqual(dt.table_size, 389)
+        self.assertEqual(len(dt), 700)
+        dt.update_many([(("d0", "m0"), "again")], expected_size=7)
+        self.assertEqual((dt.table_size, dt["d0", "m0"]), (389, "again"))
+
+    @number("3.8")
+    def test_lazy_iterators(self):
+        dt = DoubleKeyTable()
+        for i in range(2000):
+            dt[f"d{i % 50}", f"m{i}"] = i
+        # Leave the tables mostly empty.
+        for i in range(2000):
+            if i % 100 >= 2:
+                del dt[f"d{i % 50}", f"m{i}"]
+        self.assertEqual(len(dt), 40)
+        self.assertEqual(sorted(dt.values()), sorted(i for i in range(2000) if i % 100 < 2))
+        self.assertEqual(set(dt.keys()), {f"d{i}" for i in range(2)})
+        self.assertEqual(set(dt.keys("d1")), {f"m{i}" for i in range(2000) if i % 100 == 1})
+        self.assertEqual(set(dt.values("d0")), {i for i in range(2000) if i % 100 == 0})
+
+        keys = dt.iter_keys()
+        values = dt.iter_values("d0")
+        next(keys)
+        next(values)
+        # Changing a value is fine.
+        dt["d0", "m0"] = -1
+        next(values)
+        dt["new", "key"] = 0
+        self.assertRaises(RuntimeError, lambda: next(keys))
+        self.assertRaises(RuntimeError, lambda: next(values))
+        self.assertRaises(KeyError, lambda: dt.iter_keys("missing"))
+
+    @number("3.9")
+    def test_probe_is_read_only(self):
+        dt = DoubleKeyTable()
+        dt["a", "b"] = 1
+        keys = dt.iter_keys()
+        for i in range(10):
+            position = dt._linear_probe(f"ghost{i}", "x", True)
+            self.assertIsNone(dt.keys1[position[0]])
+        self.assertEqual((dt.keys(), len(dt), dt.top_count), (["a"], 1, 1))
+        self.assertEqual(next(keys), "a")
+
+        # Internal tables go through the class sizes, however the top level grows.
+        dt = DoubleKeyTable(sizes=[5, 13])
+        for i in range(20):
+            dt["a", f"m{i}"] = i
+        self.assertEqual(len(dt.keys("a")), 20)
+        self.assertEqual(dt.table_size, 5)
@@ -0,0 +1,220 @@
+import random
+import unittest
+from ed_utils.decorators import number
+
+from data_structures.hash_table import CompactProbeTable, FullError, LinearProbeTable
+from data_structures.referential_array import Int32ArrayR, UInt64ArrayR
+
+class CountingTable(LinearProbeTable):
+    """Counts calls to full_hash."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        self.hash_calls = 0
+        super().__init__(*args, **kwargs)
+
+    def full_hash(self, key: str) -> int:
+        self.hash_calls += 1
+        return super().full_hash(key)
+
+class TestHashTable(unittest.TestCase):
+
+    @number("9.1")
+    def test_cached_hashes(self):
+        table = CountingTable()
+        for i in range(100):
+            table[f"key{i}"] = i
+        # Resizes reuse the kept hashes.
+        self.assertEqual(table.hash_calls, 100)
+        self.assertGreater(table.size_index, 0)
+        for i in range(100):
+            self.assertEqual(table[f"key{i}"], i)
+        self.assertEqual(set(table.keys()), {f"key{i}" for i in range(100)})
+
+        # An overwritten hash is still used.
+        table = LinearProbeTable(sizes=[5, 13])
+        table.hash = lambda k: ord(k[0]) % table.table_size
+        table["a"] = 1
+        table["b"] = 2
+        table["c"] = 3
+        self.assertEqual(table.table_size, 13)
+        self.assertEqual(table._linear_probe("c", False), ord("c") % 13)
+        del table["a"]
+        self.assertEqual((table["b"], table["c"]), (2, 3))
+
+        # Hashes which cannot be kept unboxed are refused up front, leaving the table as it was.
+        for table in [LinearProbeTable(), CompactProbeTable()]:
+            table.hash = lambda k: -1
+            with self.assertRaises(ValueError):
+                table["a"] = 1
+            self.assertEqual(len(table), 0)
+            table.hash = lambda k: 1 << 64
+            self.assertRaises(ValueError, table.__contains__, "a")
+
+    @number("9.2")
+    def test_incremental_rehash(self):
+        rng = random.Random(1008)
+        table = LinearProbeTable(incremental=True)
+        expected = {}
+        saw_migration = False
+        for i in range(3000):
+            key = f"m{rng.randrange(500)}"
+            if key in expected and rng.random() < 0.3:
+                del table[key]
+                del expected[key]
+            else:
+                table[key] = i
+                expected[key] = i
+            if table.old_array is not None:
+                saw_migration = True
+                # A rehash only moves part of the table at once.
+                self.assertLess(table.migrated, len(table.old_array))
+                self.assertEqual(table[key] if key in expected else None, expected.get(key))
+            self.assertEqual(len(table), len(expected))
+        self.assertTrue(saw_migration)
+        self.assertEqual(dict(zip(table.keys(), table.values())), expected)
+        for key, value in expected.items():
+            self.assertEqual(table[key], value)
+        self.assertNotIn("missing", table)
+
+    @number("9.3")
+    def test_backward_shift_delete(self):
+        table = LinearProbeTable(sizes=[13])
+        table.hash = lambda k: ord(k[0]) % 13
+        # "a" and "n" both hash to 6, "b" to 7 and "c" to 8.
+        for key in ["a", "n", "b", "c"]:
+            table[key] = key.upper()
+        self.assertEqual([table._linear_probe(k, False) for k in "anbc"], [6, 7, 8, 9])
+        del table["a"]
+        # Each moves back a slot, but no further than its home.
+        self.assertEqual([table._linear_probe(k, False) for k in "nbc"], [6, 7, 8])
+        del table["b"]
+        self.assertEqual([table._linear_probe(k, False) for k in "nc"], [6, 8])
+        self.assertEqual((table["n"], table["c"], len(table)), ("N", "C", 2))
+
+        # Deleting does not hash the cluster again.
+        table = CountingTable()
+        for i in range(50):
+            table[f"key{i}"] = i
+        calls = table.hash_calls
+        for i in range(0, 50, 2):
+            del table[f"key{i}"]
+        self.assertEqual(table.hash_calls, calls + 25)
+        for i in range(1, 50, 2):
+            self.assertEqual(table[f"key{i}"], i)
+        self.assertEqual(len(table), 25)
+
+    @number("9.4")
+    def test_robin_hood(self):
+        rng = random.Random(1008)
+        keys = [f"mt-{rng.randrange(10_000)}" for _ in range(3000)]
+        for incremental in [False, True]:
+            table = LinearProbeTable(incremental=incremental, robin_hood=True)
+            expected = {}
+            for i, key in enumerate(keys):
+                if key in expected and i % 3 == 0:
+                    del table[key]
+                    del expected[key]
+                else:
+                    table[key] = i
+                    expected[key] = i
+            self.assertEqual(len(table), len(expected))
+            self.assertEqual(dict(zip(table.keys(), table.values())), expected)
+            for key, value in expected.items():
+                self.assertEqual(table[key], value)
+            self.assertNotIn("mt-10000", table)
+
+            # Along a cluster, each entry is at most one further from home than the last.
+            size = table.table_size
+            for x in range(size):
+                following = (x + 1) % size
+                if table.array[x] is not None and table.array[following] is not None:
+                    distance = (x - table.hashes[x]) % size
+                    self.assertLessEqual((following - table.hashes[following]) % size, distance + 1)
+
+        # Same keys, with a hash which clusters badly.
+        linear, robin_hood = LinearProbeTable(sizes=[1543]), LinearProbeTable(sizes=[1543], robin_hood=True)
+        order = list(range(700))
+        rng.shuffle(order)
+        for table in (linear, robin_hood):
+            table.hash = lambda k, table=table: int(k[3:]) // 40 % table.table_size
+            for i in order:
+                table[f"mt-{i * 7}"] = i
+        linear_stats, robin_hood_stats = linear.probe_statistics(), robin_hood.probe_statistics()
+        self.assertEqual(sum(linear_stats.histogram), 700)
+        self.assertEqual(sum(robin_hood_stats.histogram), 700)
+        # Moving entries around does not change the total, but evens them out.
+        self.assertAlmostEqual(linear_stats.mean_probe_length, robin_hood_stats.mean_probe_length)
+        self.assertLess(robin_hood_stats.max_probe_length, linear_stats.max_probe_length)
+        self.assertEqual(robin_hood["mt-707"], 101)
+
+    @number("9.5")
+    def test_bulk_load(self):
+        items = [(f"key{i}", i) for i in range(1000)] + [("key7", "last")]
+        for sort_by_bucket in [False, True]:
+            table = CountingTable.from_items(items, sort_by_bucket=sort_by_bucket)
+            # Straight to the final size, hashing each key once.
+            self.assertEqual(table.hash_calls, len(items))
+            self.assertEqual(table.table_size, 3079)
+            self.assertEqual(len(table), 1000)
+            self.assertEqual(table["key7"], "last")
+            self.assertEqual(table["key999"], 999)
+
+        # Too small a size is only a hint.
+        table = LinearProbeTable(robin_hood=True)
+        table["old"] = 0
+        table.update_many(items, expected_size=10)
+        self.assertEqual(len(table), 1001)
+        self.assertEqual((table["old"], table["key7"], table["key500"]), (0, "last", 500))
+
+    @number("9.6")
+    def test_compact_table(self):
+        rng = random.Random(1008)
+        table = CompactProbeTable()
+        expected = {}
+        for i in range(3000):
+            key = f"m{rng.randrange(800)}"
+            if key in expected and rng.random() < 0.4:
+                del table[key]
+                del expected[key]
+            else:
+                table[key] = i
+                expected[key] = i
+            self.assertEqual(len(table), len(expected))
+        # In insertion order, like a dict.
+        self.assertEqual(table.keys(), list(expected))
+        self.assertEqual(table.values(), list(expected.values()))
+        for key, value in expected.items():
+            self.assertEqual(table[key], value)
+        self.assertNotIn("missing", table)
+        with self.assertRaises(KeyError):
+            del table["missing"]
+        # Holes are closed up, so the dense arrays do not outgrow the index.
+        self.assertLessEqual(len(table.entry_keys), table.table_size * table.MAX_LOAD_FACTOR)
+
+        # Resizing only rebuilds the index.
+        table = CompactProbeTable.from_items([(f"key{i}", i) for i in range(1000)])
+        self.assertEqual(table.table_size, 3079)
+        entry_keys = table.entry_keys
+        table._rehash()
+        self.assertIs(table.entry_keys, entry_keys)
+        self.assertEqual(table.keys(), [f"key{i}" for i in range(1000)])
+
+        # An overwritten hash is used again on resize.
+        table = CompactProbeTable(sizes=[5, 13])
+        table.hash = lambda k: ord(k[0]) % table.table_size
+        for key in "abcn":
+            table[key] = key.upper()
+        self.assertEqual(table.table_size, 13)
+        self.assertEqual(table._linear_probe("n", False), 9)
+        del table["a"]
+        self.assertEqual([table[k] for k in "bcn"], ["B", "C", "N"])
+
+        # Once the index cannot grow, entries go past its load limit until it is full.
+        table = CompactProbeTable(sizes=[13])
+        for i in range(13):
+            table[f"k{i}"] = i
+        self.assertIsInstance(table.index, Int32ArrayR)
+        self.assertIsInstance(table.entry_hashes, UInt64ArrayR)
+        self.assertEqual([table[f"k{i}"] for i in range(13)], list(range(13)))
+        with self.assertRaises(FullError):
+            table["k13"] = 13
@@ -1,3 +1,4 @@
+import random
 import unittest
 from ed_utils.decorators import number
 
@@ -91,3 +92,55 @@ class TestInfiniteHash(unittest.TestCase):
             "mining"
         ]
         self.assertListEqual(res, expected)
+
+    @number("4.4")
+    def test_compact_tables(self):
+        rng = random.Random(1008)
+        words = ["".join(rng.choice("abcdefghij") for _ in range(rng.randrange(1, 7))) for _ in range(2000)]
+        ih = InfiniteHashTable()
+        expected = {}
+        for i, word in enumerate(words):
+            if word in expected and i % 3 == 0:
+                del ih[word]
+                del expected[word]
+            else:
+                ih[word] = i
+                expected[word] = i
+        self.assertEqual(len(ih), len(expected))
+        self.assertEqual(ih.sort_keys(), sorted(expected))
+        for word, value in expected.items():
+            self.assertEqual(ih[word], value)
+        self.assertNotIn("k", ih)
+
+        # Each table only has room for the positions in use, and at least two of them
+        # (unless it leads on to another table).
+        tables = [ih]
+        while tables:
+            table = tables.pop()
+            used = table.bitmap.bit_count()
+            self.assertEqual(len(table.children), 2 * used)
+            if table is not ih:
+                self.assertTrue(used > 1 or table.children[0] is None)
+            tables.extend(table.children[slot + 1] for slot in range(0, 2 * used, 2) if table.children[slot] is None)
+
+        # Keys which never part are refused, leaving the table as it was.
+        ih = InfiniteHashTable()
+        ih["A"] = 1
+        self.assertRaises(ValueError, ih.__setitem__, "u", 2)
+        self.assertEqual((len(ih), ih.get_location("A"), ih["A"]), (1, [13], 1))
+        ih["Ab"] = 3
+        self.assertRaises(ValueError, ih.__setitem__, "uH", 4)
+        self.assertEqual((len(ih), ih.get_location("Ab")), (2, [13, 20]))
+
+        # A hash overridden in a subclass decides whether keys part.
+        class SevenTable(InfiniteHashTable):
+            def hash(self, key, level=None):
+                if level is None:
+                    level = self.level
+                return ord(key[level]) % 7 if level < len(key) else 7
+        ih = SevenTable()
+        ih["A"] = 1
+        ih["u"] = 2
+        self.assertEqual((ih.get_location("A"), ih.get_location("u"), ih["u"]), ([2], [5], 2))
+        ih["ab"] = 3
+        self.assertRaises(ValueError, ih.__setitem__, "hb", 4)
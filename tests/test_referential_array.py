@@ -0,0 +1,73 @@
+import unittest
+from ed_utils.decorators import number
+
+from data_structures.referential_array import ArrayR, Float64ArrayR, Int32ArrayR, UInt64ArrayR
+
+class TestArrayR(unittest.TestCase):
+
+    @number("10.1")
+    def test_bulk_operations(self):
+        for length in [1, 2, 7, 1000]:
+            a = ArrayR(length)
+            self.assertEqual(a[:], [None] * length)
+        with self.assertRaises(ValueError):
+            ArrayR(0)
+
+        a = ArrayR(6)
+        a[1:4] = (f"m{i}" for i in range(3))
+        self.assertEqual(a[:], [None, "m0", "m1", "m2", None, None])
+        with self.assertRaises(ValueError):
+            a[0:2] = ["too", "many", "items"]
+
+        # Overlapping copies within one array.
+        a.copy_from(a, 1, 2, 3)
+        self.assertEqual(a[:], [None, "m0", "m0", "m1", "m2", None])
+        a.copy_from(a, 2, 0, 3)
+        self.assertEqual(a[:], ["m0", "m1", "m2", "m1", "m2", None])
+        b = ArrayR(2)
+        b.copy_from(a, 3, 0, 2)
+        self.assertEqual(b[:], ["m1", "m2"])
+        with self.assertRaises(IndexError):
+            b.copy_from(a, 5, 0, 2)
+
+        b.extend(["m3"])
+        b.extend([])
+        self.assertEqual((len(b), b[:]), (3, ["m1", "m2", "m3"]))
+
+
+    @number("10.2")
+    def test_typed_arrays(self):
+        a = Int32ArrayR(10, -1)
+        self.assertEqual(len(a), 10)
+        self.assertEqual(a[3], -1)
+        a[3] = 7
+        a.fill(2, 5, 8)
+        self.assertEqual(a[:].tolist(), [-1, -1, -1, 7, -1, 2, 2, 2, -1, -1])
+        with self.assertRaises(OverflowError):
+            a[0] = 2 ** 31
+
+        # Slices share the storage.
+        view = a.view()[2:6]
+        view[0] = 9
+        self.assertEqual(a[2], 9)
+        self.assertEqual(memoryview(a.view()).itemsize, 4)
+        view.release()
+
+        a.resize(12, 5)
+        self.assertEqual(a[:].tolist(), [-1, -1, 9, 7, -1, 2, 2, 2, -1, -1, 5, 5])
+        a.resize(3)
+        self.assertEqual(a[:].tolist(), [-1, -1, 9])
+        with self.assertRaises(ValueError):
+            a.resize(0)
+
+        a[0:2] = [4, 5]
+        a.copy_from(a, 0, 1, 2)
+        a.extend([6])
+        self.assertEqual(a[:].tolist(), [4, 4, 5, 6])
+        with self.assertRaises(ValueError):
+            a[0:2] = [1]
+
+        hashes = UInt64ArrayR(4)
+        hashes[1] = 2 ** 64 - 1
+        self.assertEqual(hashes[1], 2 ** 64 - 1)
+        self.assertEqual(Float64ArrayR(2, 0.5)[1], 0.5)
@@ -0,0 +1,101 @@
+import dataclasses
+import io
+import json
+import os
+import tempfile
+import unittest
+from ed_utils.decorators import number
+
+from mountain import Mountain
+from trail import Trail, TrailSeries, TrailSplit
+from personality import TopWalker, BottomWalker
+from serialize import serialize, serialize_file, deserialize, deserialize_file, deserialize_lazy, _LazyTrailReader
+from draw_trails import Box, TrailBox, TrailSeriesBox
+
+class TestSerialize(unittest.TestCase):
+
+    @number("8.1")
+    def test_deserialize_file(self):
+        for path in ["stores/basic.json", "stores/methods_example.json"]:
+            with open(path) as f:
+                expected = deserialize(json.load(f))
+            for chunk_size in [1, 5, 1 << 16]:
+                with open(path) as f:
+                    self.assertEqual(deserialize_file(f, chunk_size), expected)
+
+        trail = Trail(TrailSplit(
+            Trail(TrailSeries(Mountain('tricky "name" \\ é', -3, 12345), Trail(None))),
+            Trail(None),
+            Trail(TrailSeries(Mountain("final", 4, 4), Trail(None))),
+        ))
+        self.assertEqual(deserialize_file(io.StringIO(serialize(trail)), 3), trail)
+
+        for bad in ['', '{"store": ', '{"store": nul}', '[1, 2]', '{"store": null} {}']:
+            self.assertRaises(ValueError, lambda: deserialize_file(io.StringIO(bad)))
+
+    @number("8.2")
+    def test_deserialize_deep(self):
+        depth = 5000
+        text = '{"store": {"mountain": {"name": "m", "difficulty_level": 1, "length": 2}, "following": ' * depth
+        text += '{"store": null}' + '}}' * depth
+        trail = deserialize_file(io.StringIO(text), 100)
+        count = 0
+        for mountain in trail.iter_mountains():
+            self.assertEqual(mountain, Mountain("m", 1, 2))
+            count += 1
+        self.assertEqual(count, depth)
+
+    @number("8.3")
+    def test_serialize(self):
+        with open("stores/methods_example.json") as f:
+            trail = deserialize_file(f)
+        # Same text as encoding every node as a dictionary.
+        self.assertEqual(serialize(trail), json.dumps(dataclasses.asdict(trail)))
+        f = io.StringIO()
+        serialize_file(trail, f, buffer_size=3)
+        self.assertEqual(f.getvalue(), serialize(trail))
+
+        # Draw boxes are not saved.
+        boxed = TrailBox(TrailSeriesBox(Mountain("m", 1, 2), TrailBox(None, Box(1, 2, 3, 4))))
+        self.assertEqual(serialize(boxed), '{"store": {"mountain": {"name": "m", "difficulty_level": 1, "length": 2}, "following": {"store": null}}}')
+
+        # Deeper than the recursion limit.
+        deep = Trail(None)
+        for i in range(5000):
+            deep = Trail(TrailSplit(Trail(None), Trail(TrailSeries(Mountain(f"m{i}", i, i), Trail(None))), deep))
+        f = io.StringIO()
+        serialize_file(deep, f)
+        f.seek(0)
+        loaded = deserialize_file(f)
+        self.assertListEqual(loaded.collect_all_mountains(), deep.collect_all_mountains())
+
+    @number("8.6")
+    def test_deserialize_lazy(self):
+        for path in ["stores/basic.json", "stores/methods_example.json"]:
+            with open(path) as f:
+                trail = deserialize_file(f)
+            lazy = deserialize_lazy(path)
+            for walker in [TopWalker(), BottomWalker()]:
+                expected = type(walker)()
+                trail.follow_path(expected)
+                lazy.follow_path(walker)
+                self.assertListEqual(walker.mountains, expected.mountains)
+            self.assertEqual(lazy, trail)
+
+        # Only the nodes walked are decoded, so a broken branch that is never taken does not matter.
+        bad = '{"store": {"mountain": {"name": "bad", "difficulty_level": 1, "length": 1, "height": 3}, "following": {"store": null}}}'
+        good = '{"store": {"mountain": {"name": "good", "difficulty_level": 1, "length": 1}, "following": {"store": null}}}'
+        text = '{"store": {"top": %s, "bottom": %s, "following": {"store": null}}}' % (good, bad)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "trail.json")
+            with open(path, "w") as f:
+                f.write(text)
+            walker = TopWalker()
+            deserialize_lazy(path).follow_path(walker)
+            self.assertListEqual(walker.mountains, [Mountain("good", 1, 1)])
+            self.assertRaises(TypeError, deserialize_lazy(path).follow_path, BottomWalker())
+
+        # Telling a split from a series does not step over its branches.
+        reader = _LazyTrailReader(text.encode())
+        self.assertIsInstance(reader.store(0), TrailSplit)
+        self.assertEqual(reader.ends, {})
@@ -1,6 +1,7 @@
 import unittest
 from ed_utils.decorators import number
 
+from draw_trails import Box, TrailDraw
 from mountain import Mountain
 from trail import Trail, TrailSeries, TrailSplit, TrailStore
 
@@ -123,3 +124,22 @@ class TestTrailMethods(unittest.TestCase):
         self.assertEqual(res.mountain, m)
         self.assertEqual(res.following.store, None)
 
+    @number("1.7")
+    def test_slotted(self):
+        m = Mountain("M", 7, 8)
+        split = TrailSplit(Trail(None), Trail(None), Trail(TrailSeries(m, Trail(None))))
+        for obj in (m, split, split.following, split.following.store):
+            self.assertFalse(hasattr(obj, "__dict__"))
+            with self.assertRaises(AttributeError):
+                obj.not_a_field = 1
+
+    @number("1.8")
+    def test_boxes_of_freed_objects(self):
+        draw = TrailDraw(Trail(None))
+        old, new = Trail(None), Trail(None)
+        box = Box(0, 0, 2, 2)
+        draw.set_box(old, "trail_box", box)
+        self.assertIs(draw.get_box(old, "trail_box"), box)
+        # As though new had been given the address of old, once freed.
+        draw.boxes[id(new), "trail_box"] = draw.boxes.pop((id(old), "trail_box"))
+        self.assertEqual(draw.get_box(new, "trail_box"), Box())
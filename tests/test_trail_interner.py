@@ -0,0 +1,59 @@
+import unittest
+from ed_utils.decorators import number
+
+from mountain import Mountain
+from trail import Trail, TrailSeries, TrailSplit
+from trail_interner import TrailInterner
+
+class TestTrailInterner(unittest.TestCase):
+
+    @number("1.5")
+    def test_sharing(self):
+        a, b, c = (Mountain(letter, 5, 5) for letter in "abc")
+        interner = TrailInterner()
+
+        def build():
+            return Trail(TrailSeries(a, Trail(TrailSplit(
+                Trail(TrailSeries(b, Trail(None))),
+                Trail(None),
+                Trail(TrailSeries(c, Trail(None))),
+            ))))
+
+        first = interner.intern(build())
+        second = interner.intern(build())
+        self.assertIs(first, second)
+        self.assertEqual(first, second)
+        self.assertEqual(hash(first), hash(second))
+        # Empty, c, b, the split and a.
+        self.assertEqual(len(interner), 5)
+        # Structure is unchanged.
+        self.assertIsInstance(first.store, TrailSeries)
+        self.assertIs(first.store.mountain, a)
+        self.assertIsInstance(first.store.following.store, TrailSplit)
+        self.assertIs(first.store.following.store.top.store.mountain, b)
+        self.assertIs(first.store.following.store.bottom, interner.empty())
+
+        # Equal mountains which are different objects are not merged.
+        other_a = Mountain("a", 5, 5)
+        third = interner.intern(Trail(TrailSeries(other_a, first.store.following)))
+        self.assertIsNot(third, first)
+        self.assertNotEqual(third, first)
+        self.assertIs(third.store.following, first.store.following)
+
+    @number("1.6")
+    def test_edit_history(self):
+        interner = TrailInterner()
+        mountains = [Mountain(f"m{i}", i, i) for i in range(100)]
+        history = [interner.empty()]
+        for mountain in mountains:
+            history.append(interner.intern(history[-1].add_mountain_before(mountain)))
+        # Each edit only adds one new node.
+        self.assertEqual(len(interner), 101)
+
+        removed = interner.intern_store(history[-1].store.remove_mountain())
+        self.assertIs(removed, history[-2])
+
+        branched = interner.intern_store(history[50].store.add_empty_branch_after())
+        self.assertIs(branched.store.following.store.following, history[49])
+        self.assertEqual(len(interner), 103)
+        self.assertListEqual(branched.collect_all_mountains(), mountains[49::-1])
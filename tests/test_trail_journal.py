@@ -0,0 +1,121 @@
+import os
+import shutil
+import tempfile
+import unittest
+from ed_utils.decorators import number
+
+from constants import DrawMode
+from draw_trails import Box, TrailDraw
+from mountain import Mountain
+from serialize import serialize
+from trail import Trail
+from trail_journal import TrailJournal, replay
+
+class TestTrailJournal(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "basic.json")
+        shutil.copy("stores/basic.json", self.path)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.directory)
+
+    def edit(self, draw: TrailDraw) -> None:
+        """Makes a few edits through the actions of draw."""
+        trail = draw.trail
+        c1 = trail.store.following.store.following
+        # Point the mouse at the after box of c1.
+        box = Box(0, 0, 2, 2)
+        draw.set_box(trail, "trail_box", box)
+        draw.set_box(trail.store.following, "trail_box", box)
+        draw.set_box(c1, "trail_box", box)
+        draw.set_box(c1.store, "after_box", box)
+        _, action, _ = draw.box_and_action((1, 1), DrawMode.ADD_MOUNTAIN)
+        action(Mountain("c2", 3, 3))
+        # c1 now has a new store.
+        draw.set_box(c1.store, "after_box", box)
+        _, action, _ = draw.box_and_action((1, 1), DrawMode.ADD_BRANCH)
+        action()
+        # Edit m1.
+        draw.boxes = {}
+        draw.set_box(trail, "trail_box", box)
+        draw.set_box(trail.store, "mountain_box", box)
+        _, action, _ = draw.box_and_action((1, 1), DrawMode.EDIT)
+        mountain = action()
+        mountain.name = "m1-edited"
+        draw.record_edit(mountain)
+
+    @number("8.7")
+    def test_save_and_replay(self):
+        journal = TrailJournal(self.path)
+        draw = TrailDraw(journal.load(), journal)
+        self.edit(draw)
+        with open(self.path) as f:
+            snapshot = f.read()
+        journal.save(draw.trail)
+
+        # The snapshot is left alone, and the edits are appended after a header.
+        with open(self.path) as f:
+            self.assertEqual(f.read(), snapshot)
+        with open(journal.journal_path) as f:
+            self.assertEqual(len(f.readlines()), 4)
+
+        loaded = TrailJournal(self.path).load()
+        self.assertEqual(loaded, draw.trail)
+        self.assertEqual(loaded.store.mountain.name, "m1-edited")
+        self.assertIn(Mountain("c2", 3, 3), loaded.collect_all_mountains())
+
+        # A save cut short is ignored.
+        with open(journal.journal_path, "a") as f:
+            f.write('{"op": "remove_mo')
+        self.assertEqual(TrailJournal(self.path).load(), draw.trail)
+
+        # Loading cuts it off, so that the next save starts on a new line.
+        journal = TrailJournal(self.path)
+        draw = TrailDraw(journal.load(), journal)
+        draw.trail.store.mountain.length = 7
+        draw.record_edit(draw.trail.store.mountain)
+        journal.save(draw.trail)
+        loaded = TrailJournal(self.path).load()
+        self.assertEqual(loaded, draw.trail)
+        self.assertEqual(loaded.store.mountain.length, 7)
+
+        # The root of an empty trail is replaced.
+        trail = replay(Trail(None), [{"op": "add_mountain_before", "path": [], "mountain": {"name": "a", "difficulty_level": 1, "length": 1}}])
+        self.assertEqual(trail.collect_all_mountains(), [Mountain("a", 1, 1)])
+        self.assertRaises(ValueError, replay, Trail(None), [{"op": "remove_mountain", "path": []}])
+
+    @number("8.8")
+    def test_compaction(self):
+        journal = TrailJournal(self.path, compact_every=2)
+        draw = TrailDraw(journal.load(), journal)
+        self.edit(draw)
+        journal.save(draw.trail)
+        # Enough edits to compact, so a full snapshot is written.
+        self.assertFalse(os.path.exists(journal.journal_path))
+        with open(self.path) as f:
+            self.assertEqual(f.read(), serialize(draw.trail))
+        self.assertEqual(TrailJournal(self.path).load(), draw.trail)
+
+        # Saving elsewhere starts a new snapshot there.
+        other = os.path.join(self.directory, "other.json")
+        draw.trail.store.mountain.length = 10
+        draw.record_edit(draw.trail.store.mountain)
+        journal.save(draw.trail, other)
+        self.assertEqual(journal.path, other)
+        self.assertEqual(TrailJournal(other).load(), draw.trail)
+
+        # A log left beside the snapshot which already holds its edits, as by a
+        # crash part way through compacting, is not replayed again.
+        journal = TrailJournal(other, compact_every=100)
+        draw = TrailDraw(journal.load(), journal)
+        self.edit(draw)
+        journal.save(draw.trail)
+        with open(other, "w") as f:
+            f.write(serialize(draw.trail))
+        self.assertTrue(os.path.exists(journal.journal_path))
+        loaded = TrailJournal(other).load()
+        self.assertEqual(loaded, draw.trail)
+        self.assertEqual(len(loaded.collect_all_mountains()), len(draw.trail.collect_all_mountains()))
+        self.assertFalse(os.path.exists(journal.journal_path))
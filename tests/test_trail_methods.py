@@ -1,4 +1,5 @@
 import unittest
+from fractions import Fraction
 from ed_utils.decorators import number, advanced
 
 from mountain import Mountain
@@ -86,3 +87,87 @@ class TestTrailMethods(unittest.TestCase):
         expected_res.sort()
 
         self.assertListEqual(res, expected_res)
+
+    @number("7.4")
+    def test_iter_mountains(self):
+        self.load_example()
+        it = self.trail.iter_mountains()
+        # Generator, not a list.
+        self.assertIs(next(it), self.top_top)
+        self.assertListEqual(list(it), [
+            self.top_bot, self.top_mid, self.bot_one, self.bot_two, self.final
+        ])
+        self.assertListEqual(list(Trail(None).iter_mountains()), [])
+
+    @number("7.5")
+    def test_difficulty_maximum_paths_many_splits(self):
+        easy = Mountain("easy", 1, 1)
+        hard = Mountain("hard", 9, 1)
+        # 300 splits in a row, only the top branch of each is easy enough.
+        trail = Trail(None)
+        for _ in range(300):
+            trail = Trail(TrailSplit(
+                Trail(TrailSeries(easy, Trail(None))),
+                Trail(TrailSeries(hard, Trail(None))),
+                trail,
+            ))
+        res = trail.difficulty_maximum_paths(5)
+        self.assertEqual(len(res), 1)
+        self.assertEqual(len(res[0]), 300)
+
+        # With every branch allowed there are 2^300 paths, but the first few are cheap.
+        paths = trail.iter_difficulty_maximum_paths(10)
+        self.assertListEqual(next(paths), [easy] * 300)
+        self.assertListEqual(next(paths), [easy] * 299 + [hard])
+
+        self.assertListEqual(trail.difficulty_maximum_paths(0), [])
+
+    @number("7.6")
+    @advanced()
+    def test_difficulty_difference_paths_many_splits(self):
+        low = Mountain("low", 1, 1)
+        mid = Mountain("mid", 3, 1)
+        high = Mountain("high", 5, 1)
+        # 200 splits in a row choosing between low and high, then a final choice.
+        trail = Trail(TrailSplit(
+            Trail(TrailSeries(low, Trail(None))),
+            Trail(TrailSeries(mid, Trail(None))),
+            Trail(None),
+        ))
+        for _ in range(200):
+            trail = Trail(TrailSplit(
+                Trail(TrailSeries(low, Trail(None))),
+                Trail(TrailSeries(high, Trail(None))),
+                trail,
+            ))
+        make_path_string = lambda mountain_list: ", ".join(map(lambda x: x.name, mountain_list))
+        res = sorted(map(make_path_string, trail.difficulty_difference_paths(2)))
+        self.assertListEqual(res, [
+            ", ".join(["high"] * 200 + ["mid"]),
+            ", ".join(["low"] * 200 + ["low"]),
+            ", ".join(["low"] * 200 + ["mid"]),
+        ])
+
+    @number("7.7")
+    def test_path_statistics(self):
+        self.load_example()
+        stats = self.trail.path_statistics()
+        # Paths: top-top/top-bot then top-mid, final / bot-one, bot-two or either empty branch, final.
+        self.assertEqual(stats.path_count, 5)
+        # Lengths: 9, 11, 9, 9, 9. Difficulties: 17, 14, 6, 6, 6.
+        self.assertEqual(stats.min_length, 9)
+        self.assertEqual(stats.max_length, 11)
+        self.assertEqual(stats.mean_length, Fraction(47, 5))
+        self.assertEqual(stats.min_difficulty, 6)
+        self.assertEqual(stats.max_difficulty, 17)
+        self.assertEqual(stats.mean_difficulty, Fraction(49, 5))
+
+        # 2^500 paths, never built.
+        m = Mountain("m", 1, 2)
+        trail = Trail(None)
+        for _ in range(500):
+            trail = Trail(TrailSplit(Trail(TrailSeries(m, Trail(None))), Trail(None), trail))
+        stats = trail.path_statistics()
+        self.assertEqual(stats.path_count, 2 ** 500)
+        self.assertEqual(stats.max_length, 1000)
+        self.assertEqual(stats.mean_difficulty, 250)
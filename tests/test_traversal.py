@@ -59,3 +59,46 @@ class TestTrailMethods(unittest.TestCase):
         self.trail.follow_path(cw)
 
         self.assertListEqual(cw.mountains, [self.bot_one])
+
+    @number("2.3")
+    def test_deep_nesting(self):
+        # Far deeper than the recursion limit.
+        depth = 20000
+        peak = Mountain("peak", 1, 1)
+        trail = Trail(TrailSeries(peak, Trail(None)))
+        followings = []
+        for i in range(depth):
+            following = Mountain(f"f{i}", 1, 1)
+            followings.append(following)
+            trail = Trail(TrailSplit(trail, Trail(None), Trail(TrailSeries(following, Trail(None)))))
+
+        tw = TopWalker()
+        trail.follow_path(tw)
+        self.assertEqual(len(tw.mountains), depth + 1)
+        self.assertIs(tw.mountains[0], peak)
+        self.assertIs(tw.mountains[-1], followings[-1])
+
+        bw = BottomWalker()
+        trail.follow_path(bw)
+        self.assertListEqual(bw.mountains, [followings[-1]])
+
+    @number("2.4")
+    def test_follow_paths(self):
+        self.load_example()
+        walkers = [TopWalker(), BottomWalker(), LazyWalker(), TopWalker(), LazyWalker()]
+        self.trail.follow_paths(walkers)
+
+        for walker in walkers:
+            single = walker.__class__()
+            self.trail.follow_path(single)
+            self.assertListEqual(walker.mountains, single.mountains)
+
+        class StopWalker(WalkerPersonality):
+            def select_branch(self, top_branch: Trail, bottom_branch: Trail) -> PersonalityDecision:
+                return PersonalityDecision.STOP
+
+        sw = StopWalker()
+        tw = TopWalker()
+        self.trail.follow_paths([sw, tw])
+        self.assertListEqual(sw.mountains, [])
+        self.assertListEqual(tw.mountains, [self.top_top, self.top_mid, self.final])
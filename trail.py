@@ -1,14 +1,17 @@
 from __future__ import annotations
 from dataclasses import dataclass
+from fractions import Fraction
 from mountain import Mountain
 from data_structures.linked_stack import LinkedStack
-from typing import TYPE_CHECKING, Union
+from typing import TYPE_CHECKING, Callable, Iterator, TypeVar, Union
 from personality_decision import PersonalityDecision
 # Avoid circular imports for typing.
 if TYPE_CHECKING:
     from personality import WalkerPersonality
 
-@dataclass
+T = TypeVar('T')
+
+@dataclass(slots=True)
 class TrailSplit:
     """
     A split in the trail.
@@ -27,7 +30,7 @@ class TrailSplit:
         return TrailSeries(self.following.store.mountain, Trail(None))
 
 
-@dataclass
+@dataclass(slots=True)
 class TrailSeries:
     """
     A mountain, followed by the rest of the trail
@@ -43,10 +46,11 @@ class TrailSeries:
         """
         Returns a *new* trail which would be the result of:
         Removing the mountain at the beginning of this series.
+        The rest of the trail is shared, not copied.
+
+        :complexity: O(1)
         """
-        if self.following == Trail(None):
-            return None
-        return TrailSeries(self.following.store.mountain, self.following.store.following)#EROROROROROROROROR
+        return self.following.store
 
     def add_mountain_before(self, mountain: Mountain) -> TrailStore:
         """
@@ -79,6 +83,21 @@ class TrailSeries:
 TrailStore = Union[TrailSplit, TrailSeries, None]
 
 @dataclass
+class PathStatistics:
+    """
+    Aggregates over every path through a trail.
+    Lengths and difficulties are the totals along a single path.
+    """
+
+    path_count: int
+    min_length: int
+    max_length: int
+    mean_length: Fraction
+    min_difficulty: int
+    max_difficulty: int
+    mean_difficulty: Fraction
+
+@dataclass(slots=True)
 class Trail:
 
     store: TrailStore = None
@@ -98,57 +117,432 @@ class Trail:
         return Trail(TrailSplit(Trail(None), Trail(None), Trail(self.store)))
 
     def follow_path(self, personality: WalkerPersonality) -> None:
-        """Follow a path and add mountains according to a personality."""
-        
-        current = self
-        go_top = current.store.top
-        go_bot = current.store.bottom
-        following_stack = []
-
-        while following_stack:
-            
-            '''Top/Bot/Lazy Walker--------------------------------------------------------------------------------------------------------------'''
-             
-            while isinstance(current, TrailSplit): #if current is TrailSplit
-                following_stack.append(current.following) #add following to stack
-                    
-                if personality.select_branch(current.store.top, current.store.bottom) == PersonalityDecision.TOP: #if top walker
-                    current = go_top # go to top branch of split
-                    
-                if personality.select_branch(current.store.top, current.store.bottom) == PersonalityDecision.BOTTOM: #if top walker
-                    current = go_bot # go to top branch of split
-
-            while isinstance(current, TrailSeries): #if Trailseries i.e straight line store mountain
+        """
+        Follow a path and add mountains according to a personality.
+
+        Pending `following` trails of each split taken are kept on an explicit
+        stack, so arbitrarily deep nesting never recurses.
+
+        :complexity: O(N) where N is the number of nodes on the path taken.
+        """
+        following_stack = LinkedStack()
+        current = self.store
+
+        while True:
+            if current is None:
+                # Finished this section of the trail, resume after the last split taken.
+                if following_stack.is_empty():
+                    return
+                current = following_stack.pop().store
+            elif isinstance(current, TrailSeries):
                 personality.add_mountain(current.mountain)
-                    
-                while isinstance(current.following, TrailSeries): #if first Trailseries has trail series as its follwing 
-                    personality.add_mountain(current.following.mountain) # keep adding the mountain of the following which is another trailseries
-                    current = current.following #go to its following, then rechecks if the following is a trailseries
-
-
-                while isinstance(current.following, TrailSplit): # if another trail split after the first trail split
-                    following_stack.append(current.following) # store the following of the split
-                    
-                    if personality.select_branch() == PersonalityDecision.TOP: #if top walker
-                        current = current.store.top # go to top branch of split
-                    
-                    if personality.select_branch() == PersonalityDecision.BOTTOM: #if top walker
-                        current = current.store.bottom # go to top branch of split
-                        
-            if isinstance(current.following, None): # if the following is None
-                current =  following_stack.pop() # then pop the following from the stack because that whole split section is finished
-            '''------------------------------------------------------------------------------------------------------------------------'''
-       
-        
+                current = current.following.store
+            else:
+                decision = personality.select_branch(current.top, current.bottom)
+                if decision == PersonalityDecision.STOP:
+                    return
+                following_stack.push(current.following)
+                if decision == PersonalityDecision.TOP:
+                    current = current.top.store
+                else:
+                    current = current.bottom.store
+
+    def follow_paths(self, personalities: list[WalkerPersonality]) -> None:
+        """
+        Follow a path for every personality at once.
+
+        The trail is walked a single time. At each split the walkers are grouped
+        by their decision, so a section of trail shared by a group is only visited
+        once and its mountains are handed to every walker of the group in bulk.
+        Walkers that STOP are dropped from their group.
+
+        :complexity: O(N + W*S) where N is the number of nodes visited by any group,
+            W the number of walkers and S the number of splits each walker decides on,
+            plus the cost of adding the mountains themselves.
+        """
+        # Each frame is (trail, walkers, pending) where pending is a linked chain of
+        # (following, rest) pairs, shared between the groups leaving the same split.
+        frames = LinkedStack()
+        if personalities:
+            frames.push((self, list(personalities), None))
+
+        while not frames.is_empty():
+            trail, walkers, pending = frames.pop()
+            current = trail.store
+            section = []
+            while True:
+                if current is None:
+                    if pending is None:
+                        for walker in walkers:
+                            walker.add_mountains(section)
+                        break
+                    following, pending = pending
+                    current = following.store
+                elif isinstance(current, TrailSeries):
+                    section.append(current.mountain)
+                    current = current.following.store
+                else:
+                    for walker in walkers:
+                        walker.add_mountains(section)
+                    top_walkers = []
+                    bottom_walkers = []
+                    for walker in walkers:
+                        decision = walker.select_branch(current.top, current.bottom)
+                        if decision == PersonalityDecision.TOP:
+                            top_walkers.append(walker)
+                        elif decision == PersonalityDecision.BOTTOM:
+                            bottom_walkers.append(walker)
+                    pending = (current.following, pending)
+                    if bottom_walkers:
+                        frames.push((current.bottom, bottom_walkers, pending))
+                    if top_walkers:
+                        frames.push((current.top, top_walkers, pending))
+                    break
+
+    def iter_mountains(self) -> Iterator[Mountain]:
+        """
+        Yields every mountain on the trail, one at a time.
+
+        Mountains come out in pre-order: at each split, everything on the top branch,
+        then everything on the bottom branch, then everything on the following trail.
+        Only the untaken branches are held on the stack, never the mountains.
+
+        :complexity: O(N) where N is the number of nodes in the trail.
+        """
+        stack = LinkedStack()
+        stack.push(self)
+        while not stack.is_empty():
+            current = stack.pop().store
+            while current is not None:
+                if isinstance(current, TrailSeries):
+                    yield current.mountain
+                    current = current.following.store
+                else:
+                    stack.push(current.following)
+                    stack.push(current.bottom)
+                    current = current.top.store
+
     def collect_all_mountains(self) -> list[Mountain]:
-        """Returns a list of all mountains on the trail."""
-        return 
+        """
+        Returns a list of all mountains on the trail, in the order of `iter_mountains`.
+
+        :complexity: O(N) where N is the number of nodes in the trail.
+        """
+        return list(self.iter_mountains())
+
+    def _fold(self, empty: T, series: Callable[[Mountain, T], T], split: Callable[[T, T, T], T]) -> dict[int, T]:
+        """
+        Summarise every trail inside this one, bottom-up, without recursing.
+
+        :param empty: The value of an empty trail.
+        :param series: Combines a mountain with the value of its following trail.
+        :param split: Combines the values of the top, bottom and following trails.
+        :returns: A dictionary from id(trail) to its value, for every trail reachable from self.
+        :complexity: O(N) calls to `series`/`split` where N is the number of nodes in the trail.
+        """
+        values = {}
+        stack = LinkedStack()
+        stack.push((self, False))
+        while not stack.is_empty():
+            trail, children_done = stack.pop()
+            if id(trail) in values:
+                continue
+            store = trail.store
+            if store is None:
+                values[id(trail)] = empty
+            elif isinstance(store, TrailSeries):
+                if children_done:
+                    values[id(trail)] = series(store.mountain, values[id(store.following)])
+                else:
+                    stack.push((trail, True))
+                    stack.push((store.following, False))
+            else:
+                if children_done:
+                    values[id(trail)] = split(values[id(store.top)], values[id(store.bottom)], values[id(store.following)])
+                else:
+                    stack.push((trail, True))
+                    stack.push((store.following, False))
+                    stack.push((store.bottom, False))
+                    stack.push((store.top, False))
+        return values
+
+    def path_statistics(self) -> PathStatistics:
+        """
+        Returns the number of paths through the trail, and the min/max/mean
+        total length and difficulty over those paths, without building any path.
 
-    def difficulty_maximum_paths(self, max_difficulty: int) -> list[list[Mountain]]: # Input to this should not exceed k > 50, at most 5 branches.
-        # 1008/2085 ONLY!
-        pass
+        :complexity: O(N) arithmetic operations where N is the number of nodes in the trail.
+            (Counts and sums are exact, so each operation is on integers of O(S) bits, S splits.)
+        """
+        # (path count, min length, max length, sum of lengths, min difficulty, max difficulty, sum of difficulties)
+        def series(mountain: Mountain, following: tuple) -> tuple:
+            count, min_len, max_len, sum_len, min_diff, max_diff, sum_diff = following
+            return (
+                count,
+                min_len + mountain.length, max_len + mountain.length, sum_len + count * mountain.length,
+                min_diff + mountain.difficulty_level, max_diff + mountain.difficulty_level, sum_diff + count * mountain.difficulty_level,
+            )
+
+        def split(top: tuple, bottom: tuple, following: tuple) -> tuple:
+            branch_count = top[0] + bottom[0]
+            count = following[0]
+            return (
+                branch_count * count,
+                min(top[1], bottom[1]) + following[1],
+                max(top[2], bottom[2]) + following[2],
+                (top[3] + bottom[3]) * count + following[3] * branch_count,
+                min(top[4], bottom[4]) + following[4],
+                max(top[5], bottom[5]) + following[5],
+                (top[6] + bottom[6]) * count + following[6] * branch_count,
+            )
+
+        count, min_len, max_len, sum_len, min_diff, max_diff, sum_diff = self._fold((1, 0, 0, 0, 0, 0, 0), series, split)[id(self)]
+        return PathStatistics(
+            count,
+            min_len, max_len, Fraction(sum_len, count),
+            min_diff, max_diff, Fraction(sum_diff, count),
+        )
+
+    @staticmethod
+    def _unwind(path: tuple|None) -> list[Mountain]:
+        """Turns a linked (mountain, rest) chain, most recent mountain first, into a list in walking order."""
+        res = []
+        while path is not None:
+            mountain, path = path
+            res.append(mountain)
+        res.reverse()
+        return res
+
+    def iter_difficulty_maximum_paths(self, max_difficulty: int) -> Iterator[list[Mountain]]:
+        """
+        Yields every path through the trail whose mountains all have
+        difficulty_level <= max_difficulty, top branches before bottom branches.
 
-    def difficulty_difference_paths(self, max_difference: int) -> list[list[Mountain]]: # Input to this should not exceed k > 50, at most 5 branches.
-        # 1054 ONLY!
-        pass
+        Whether each sub-trail can be completed at all is worked out once up front,
+        so any branch containing a mountain that is too difficult is pruned before
+        it is entered, and every prefix explored ends in at least one yielded path.
+        Prefixes are shared between paths as linked chains until they are yielded.
+
+        :complexity: O(N + P) where N is the number of nodes in the trail and
+            P the total length of the paths yielded.
+        """
+        completable = self._fold(
+            True,
+            lambda mountain, following: mountain.difficulty_level <= max_difficulty and following,
+            lambda top, bottom, following: (top or bottom) and following,
+        )
+        if not completable[id(self)]:
+            return
+
+        # Each frame is (trail, path, pending), pending being a linked chain of (following, rest).
+        frames = LinkedStack()
+        frames.push((self, None, None))
+        while not frames.is_empty():
+            trail, path, pending = frames.pop()
+            current = trail.store
+            while True:
+                if current is None:
+                    if pending is None:
+                        yield self._unwind(path)
+                        break
+                    following, pending = pending
+                    current = following.store
+                elif isinstance(current, TrailSeries):
+                    path = (current.mountain, path)
+                    current = current.following.store
+                else:
+                    pending = (current.following, pending)
+                    if completable[id(current.bottom)]:
+                        frames.push((current.bottom, path, pending))
+                    if completable[id(current.top)]:
+                        frames.push((current.top, path, pending))
+                    break
+
+    def difficulty_maximum_paths(self, max_difficulty: int) -> list[list[Mountain]]:
+        """
+        Returns every path through the trail whose mountains all have
+        difficulty_level <= max_difficulty.
+        Use `iter_difficulty_maximum_paths` when only some of the paths are needed.
 
+        :complexity: See iter_difficulty_maximum_paths.
+        """
+        return list(self.iter_difficulty_maximum_paths(max_difficulty))
+
+    def iter_difficulty_difference_paths(self, max_difference: int) -> Iterator[list[Mountain]]:
+        """
+        Yields every path through the trail where the difference between the most and
+        least difficult mountains is at most max_difference, top branches before bottom branches.
+
+        Every sub-trail is first summarised, bottom-up, by the (min, max) difficulty ranges
+        its paths can cover (only those within max_difference, and only the tightest ones).
+        The walk carries the running min/max of the current prefix, and a branch is only
+        entered if one of its ranges, together with the ranges of the trail still pending
+        after it, keeps the spread within max_difference.
+        The summaries cost more than they save when few branches can be pruned, in
+        which case this is somewhat slower than building every path and filtering.
+
+        :complexity: O(N*D^2 + P*D^2) where N is the number of nodes in the trail,
+            P the total length of the paths yielded and D the number of distinct difficulties.
+        """
+        ranges = self._fold(
+            EMPTY_RANGES,
+            lambda mountain, following: combine_ranges(
+                ((mountain.difficulty_level, mountain.difficulty_level),), following, max_difference
+            ),
+            lambda top, bottom, following: combine_ranges(top | bottom, following, max_difference),
+        )
+        if not ranges[id(self)]:
+            return
+
+        # Each frame is (trail, path, low, high, pending), pending being a linked chain of
+        # (following, rest, ranges of following and everything in rest).
+        chains = PendingChains(max_difference)
+        frames = LinkedStack()
+        frames.push((self, None, EMPTY_RANGE[0], EMPTY_RANGE[1], None))
+        while not frames.is_empty():
+            trail, path, low, high, pending = frames.pop()
+            current = trail.store
+            while True:
+                if current is None:
+                    if pending is None:
+                        yield self._unwind(path)
+                        break
+                    following, pending, _ = pending
+                    current = following.store
+                elif isinstance(current, TrailSeries):
+                    mountain = current.mountain
+                    path = (mountain, path)
+                    difficulty = mountain.difficulty_level
+                    if difficulty < low:
+                        low = difficulty
+                    if difficulty > high:
+                        high = difficulty
+                    current = current.following.store
+                else:
+                    pending = chains.after_split(id(current), current.following, ranges[id(current.following)], pending)
+                    for branch in (current.bottom, current.top):
+                        if chains.can_enter(low, high, ranges[id(branch)], pending):
+                            frames.push((branch, path, low, high, pending))
+                    break
+
+    def difficulty_difference_paths(self, max_difference: int) -> list[list[Mountain]]:
+        """
+        Returns every path through the trail where the difference between the most and
+        least difficult mountains is at most max_difference.
+        Use `iter_difficulty_difference_paths` when only some of the paths are needed.
+
+        :complexity: See iter_difficulty_difference_paths.
+        """
+        return list(self.iter_difficulty_difference_paths(max_difference))
+
+
+class LazyTrail(Trail):
+    """
+    A Trail whose store is only built when it is first accessed.
+
+    `load` is called at most once, and should return the TrailStore, whose own
+    trails may in turn be lazy. This lets a walker inspect only the parts of a
+    large trail it actually needs.
+
+    Subclasses can override `_build` instead, keeping whatever it reads in
+    `_load` (anything but None), to avoid a closure per trail.
+    """
+
+    __slots__ = ("_load",)
+
+    def __init__(self, load: Callable[[], TrailStore]) -> None:
+        self._load = load
+
+    def _build(self) -> TrailStore:
+        """Builds the store, called at most once."""
+        return self._load()
+
+    @property
+    def store(self) -> TrailStore:
+        if self._load is not None:
+            _TRAIL_STORE.__set__(self, self._build())
+            self._load = None
+        return _TRAIL_STORE.__get__(self)
+
+    @store.setter
+    def store(self, value: TrailStore) -> None:
+        self._load = None
+        _TRAIL_STORE.__set__(self, value)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Trail):
+            return NotImplemented
+        return self.store == other.store
+
+    __hash__ = None
+
+# The slot holding Trail.store, which LazyTrail.store shadows.
+_TRAIL_STORE = Trail.__dict__["store"]
+
+# A range of difficulties is a (min, max) pair. The empty path covers no difficulties at all.
+EMPTY_RANGE = (float("inf"), float("-inf"))
+EMPTY_RANGES = frozenset((EMPTY_RANGE,))
+
+def combine_ranges(firsts, seconds, max_difference: int) -> frozenset[tuple[float, float]]:
+    """
+    Returns the ranges covered by following a path with a range in firsts by one with a
+    range in seconds, dropping those wider than max_difference and those containing another.
+
+    :complexity: O(F*S + R^2) where F, S are the sizes of firsts and seconds, R of the result.
+    """
+    combined = set()
+    for first_low, first_high in firsts:
+        for second_low, second_high in seconds:
+            low = min(first_low, second_low)
+            high = max(first_high, second_high)
+            if high - low <= max_difference:
+                combined.add((low, high))
+    return frozenset(
+        (low, high) for low, high in combined
+        if not any(other != (low, high) and low <= other[0] and other[1] <= high for other in combined)
+    )
+
+
+class PendingChains:
+    """
+    The linked chains of (following, rest, ranges) still pending during a walk of
+    `iter_difficulty_difference_paths`, the ranges covering following and everything in rest.
+
+    The chain pending after a split does not depend on the path taken to it, so each
+    is built once, keyed by the split and the chain pending before it.
+    """
+
+    def __init__(self, max_difference: int) -> None:
+        self.max_difference = max_difference
+        # The chains themselves keep those they are keyed by alive, so ids are not reused.
+        self.chains: dict[tuple[int, int], tuple] = {}
+
+    def after_split(self, split: int, following, following_ranges: frozenset, pending: tuple|None) -> tuple:
+        """
+        Returns the chain pending inside a split, given a key for the split, what follows it
+        (and the ranges that covers) and the chain pending before it.
+
+        :complexity: O(1) when already built, see `combine_ranges` otherwise.
+        """
+        key = (split, id(pending))
+        chain = self.chains.get(key)
+        if chain is None:
+            after = following_ranges
+            if pending is not None:
+                after = combine_ranges(after, pending[2], self.max_difference)
+            chain = self.chains[key] = (following, pending, after)
+        return chain
+
+    def can_enter(self, low: float, high: float, branch_ranges: frozenset, pending: tuple) -> bool:
+        """
+        Whether a branch with these ranges, followed by the pending chain, keeps a path
+        whose prefix covers low to high within max_difference.
+
+        :complexity: O(B*A) where B and A are the numbers of ranges of the branch and chain.
+        """
+        max_difference = self.max_difference
+        return any(
+            max(high, b_high, a_high) - min(low, b_low, a_low) <= max_difference
+            for b_low, b_high in branch_ranges
+            for a_low, a_high in pending[2]
+        )
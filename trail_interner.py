@@ -0,0 +1,131 @@
+"""
+Hash-consing for trails.
+
+A TrailInterner hands out a single shared node for every distinct sub-trail,
+so that a long history of edited trails only costs memory for the parts that differ.
+Interned nodes compare and hash by identity, which is exact as two interned
+nodes are structurally equal exactly when they are the same object.
+
+Interned nodes must be treated as immutable: edit them through the usual
+*new*-trail returning methods, then intern the result.
+Mountains are shared by identity, as they are edited in place.
+"""
+from __future__ import annotations
+
+from mountain import Mountain
+from trail import Trail, TrailSeries, TrailSplit
+from data_structures.linked_stack import LinkedStack
+
+
+class _Interned:
+    """Mixin giving O(1) identity equality and hashing."""
+
+    __slots__ = ()
+
+    def __eq__(self, other: object) -> bool:
+        return self is other
+
+    def __hash__(self) -> int:
+        return id(self)
+
+
+class InternedTrail(_Interned, Trail):
+    __slots__ = ()
+
+class InternedTrailSeries(_Interned, TrailSeries):
+    __slots__ = ()
+
+class InternedTrailSplit(_Interned, TrailSplit):
+    __slots__ = ()
+
+
+class TrailInterner:
+    """
+    Table of canonical trail nodes.
+
+    Nodes are keyed on the identity of their (already interned) parts,
+    so each lookup is O(1) no matter how large the sub-trail is.
+    """
+
+    def __init__(self) -> None:
+        self.nodes: dict[tuple, InternedTrail] = {}
+        # id -> node, for every node this interner handed out.
+        self.members: dict[int, InternedTrail] = {}
+        self._empty = self._lookup((None,), lambda: None)
+
+    def __len__(self) -> int:
+        """Returns the number of distinct sub-trails interned so far."""
+        return len(self.nodes)
+
+    def _lookup(self, key: tuple, make_store) -> InternedTrail:
+        node = self.nodes.get(key)
+        if node is None:
+            node = InternedTrail(make_store())
+            self.nodes[key] = node
+            self.members[id(node)] = node
+        return node
+
+    def empty(self) -> InternedTrail:
+        """Returns the shared empty trail."""
+        return self._empty
+
+    def series(self, mountain: Mountain, following: InternedTrail) -> InternedTrail:
+        """Returns the shared trail of `mountain` followed by the interned trail `following`."""
+        return self._lookup(
+            (id(mountain), id(following)),
+            lambda: InternedTrailSeries(mountain, following),
+        )
+
+    def split(self, top: InternedTrail, bottom: InternedTrail, following: InternedTrail) -> InternedTrail:
+        """Returns the shared trail splitting into the interned trails `top` and `bottom`, then `following`."""
+        return self._lookup(
+            (id(top), id(bottom), id(following)),
+            lambda: InternedTrailSplit(top, bottom, following),
+        )
+
+    def is_interned(self, trail: Trail) -> bool:
+        return self.members.get(id(trail)) is trail
+
+    def intern(self, trail: Trail) -> InternedTrail:
+        """
+        Returns the shared node structurally equal to `trail`.
+
+        Sub-trails which are already interned are not walked again, so interning
+        the result of an edit of an interned trail only visits the new nodes.
+
+        :complexity: O(N) where N is the number of nodes of trail which are not yet interned.
+        """
+        if self.is_interned(trail):
+            return trail
+        values: dict[int, InternedTrail] = {}
+        stack = LinkedStack()
+        stack.push((trail, False))
+        while not stack.is_empty():
+            current, children_done = stack.pop()
+            if id(current) in values:
+                continue
+            if self.is_interned(current):
+                values[id(current)] = current
+                continue
+            store = current.store
+            if store is None:
+                values[id(current)] = self._empty
+            elif isinstance(store, TrailSeries):
+                if children_done:
+                    values[id(current)] = self.series(store.mountain, values[id(store.following)])
+                else:
+                    stack.push((current, True))
+                    stack.push((store.following, False))
+            else:
+                if children_done:
+                    values[id(current)] = self.split(values[id(store.top)], values[id(store.bottom)], values[id(store.following)])
+                else:
+                    stack.push((current, True))
+                    stack.push((store.following, False))
+                    stack.push((store.bottom, False))
+                    stack.push((store.top, False))
+        return values[id(trail)]
+
+    def intern_store(self, store: TrailSeries|TrailSplit|None) -> InternedTrail:
+        """Interns a bare trail store, as returned by the TrailSeries/TrailSplit edit methods."""
+        return self.intern(Trail(store))
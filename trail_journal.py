@@ -0,0 +1,217 @@
+"""
+Journaled saving of trails.
+
+Rather than rewriting the whole trail on every save, a `TrailJournal` keeps the
+last full snapshot (in the usual `serialize` format) and appends the edits made
+since then to a log beside it, one JSON object per line:
+
+    {"op": "add_mountain_after", "path": ["following", "top"], "mountain": {...}}
+
+`path` leads from the root trail to the edited trail, through the `top`, `bottom`
+and `following` trails of each store on the way. Loading replays the log onto the
+snapshot, and once the log holds `compact_every` edits the next save writes a new
+snapshot and clears it.
+
+The first line of the log names the snapshot it was written against, by digest:
+
+    {"snapshot": "<sha1 of the snapshot file>"}
+
+so a log left behind by a crash part way through compaction, when the new
+snapshot already holds its edits, is not replayed a second time.
+"""
+from __future__ import annotations
+import dataclasses, hashlib, json, os
+from typing import Iterable, Iterator
+
+from mountain import Mountain
+from serialize import serialize_file, deserialize_file
+from trail import Trail
+
+JOURNAL_SUFFIX = ".journal"
+
+# Edits applied to an empty trail, which replace the trail itself.
+TRAIL_EDITS = frozenset(["add_mountain_before", "add_empty_branch_before"])
+# Edits applied to the store of a trail, which replace the store.
+STORE_EDITS = frozenset([
+    "add_mountain_before", "add_empty_branch_before",
+    "add_mountain_after", "add_empty_branch_after",
+    "remove_mountain", "remove_branch",
+])
+# Changes the mountain of a series in place.
+EDIT_MOUNTAIN = "edit"
+
+def apply_edit(root: Trail, edit: dict) -> Trail:
+    """
+    Applies a journaled edit to the trail, the same way the GUI applied it.
+    Returns the root trail, which is replaced when the edit is at the root of an empty trail.
+
+    :raises ValueError: when the edit does not fit the trail.
+    :complexity: O(P) where P is the length of the edit's path.
+    """
+    op = edit["op"]
+    holder = [root]
+    parent, attribute = holder, 0
+    trail = root
+    try:
+        for step in edit["path"]:
+            if step not in ("top", "bottom", "following"):
+                raise ValueError(f"Unknown step {step!r} in journaled edit")
+            parent, attribute = trail.store, step
+            trail = getattr(trail.store, step)
+        mountain = Mountain(**edit["mountain"]) if "mountain" in edit else None
+        args = () if mountain is None else (mountain,)
+        if op == EDIT_MOUNTAIN:
+            current = trail.store.mountain
+            current.name, current.difficulty_level, current.length = mountain.name, mountain.difficulty_level, mountain.length
+        elif trail.store is None and op in TRAIL_EDITS:
+            new_trail = getattr(trail, op)(*args)
+            if parent is holder:
+                holder[0] = new_trail
+            else:
+                setattr(parent, attribute, new_trail)
+        elif trail.store is not None and op in STORE_EDITS:
+            trail.store = getattr(trail.store, op)(*args)
+        else:
+            raise ValueError(f"Cannot apply {op!r} to the trail at {edit['path']}")
+    except (AttributeError, TypeError, KeyError) as e:
+        raise ValueError(f"Journaled edit {edit} does not fit the trail") from e
+    return holder[0]
+
+def replay(trail: Trail, edits: Iterable[dict]) -> Trail:
+    """Applies each edit in order, returning the root trail."""
+    for edit in edits:
+        trail = apply_edit(trail, edit)
+    return trail
+
+def snapshot_digest(path: str) -> str:
+    """
+    Returns the digest of the snapshot at path, which its log is headed with.
+
+    :complexity: O(S) for a file of S bytes.
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def read_journal(path: str) -> Iterator[dict]:
+    """
+    Yields the edits logged at path, if any, skipping the header.
+    A last line cut short (by a crash part way through a save) is ignored.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "r") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                return
+            edit = json.loads(line)
+            if "op" in edit:
+                yield edit
+
+class TrailJournal:
+    """
+    Saves a trail as a snapshot, followed by a log of the edits made to it.
+
+    Edits are recorded as the GUI makes them and held until `save`, so unsaved
+    edits are lost on exit, just as with a full save.
+    """
+
+    def __init__(self, path: str, compact_every: int = 256) -> None:
+        self.path = path
+        self.compact_every = compact_every
+        # Number of edits in the log on disk.
+        self.logged = 0
+        # Encoded edits not yet saved.
+        self.pending: list[str] = []
+        # Digest of the snapshot at path, once loaded or written.
+        self.snapshot: str|None = None
+
+    @property
+    def journal_path(self) -> str:
+        return self.path + JOURNAL_SUFFIX
+
+    def load(self) -> Trail:
+        """
+        Returns the snapshot with the logged edits replayed onto it.
+
+        :complexity: O(N + E*P) for a snapshot of N nodes and E edits with paths of length at most P.
+        """
+        self.snapshot = snapshot_digest(self.path)
+        with open(self.path, "r") as f:
+            trail = deserialize_file(f)
+        self._tidy_journal()
+        edits = list(read_journal(self.journal_path))
+        self.logged = len(edits)
+        self.pending = []
+        return replay(trail, edits)
+
+    def _tidy_journal(self) -> None:
+        """
+        Prepares the log for appending: a last line cut short by a crash is cut
+        off, and a log headed with another snapshot (left by a crash part way
+        through `compact`) is removed.
+        A log without a header, as written before headers, is kept.
+
+        :complexity: O(S) for a log of S bytes.
+        """
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "rb+") as f:
+            data = f.read()
+            end = data.rfind(b"\n") + 1
+            if end > 0:
+                first = json.loads(data[:data.find(b"\n")])
+                stale = first.get("snapshot", self.snapshot) != self.snapshot
+            else:
+                stale = True
+            if not stale and end < len(data):
+                f.truncate(end)
+        if stale:
+            os.remove(self.journal_path)
+
+    def record(self, op: str, path: Iterable[str], mountain: Mountain|None = None) -> None:
+        """Records an edit made at path, to be written on the next save."""
+        edit = {"op": op, "path": list(path)}
+        if mountain is not None:
+            edit["mountain"] = dataclasses.asdict(mountain)
+        self.pending.append(json.dumps(edit) + "\n")
+
+    def save(self, trail: Trail, path: str|None = None) -> None:
+        """
+        Saves the trail. Only the pending edits are written, unless the log is
+        due to be compacted or the trail is being saved somewhere new.
+
+        :complexity: O(E) for E pending edits, O(N) for a trail of N nodes when a snapshot is written.
+        """
+        if path is not None and path != self.path:
+            self.path = path
+            self.compact(trail)
+        elif self.logged + len(self.pending) >= self.compact_every:
+            self.compact(trail)
+        elif self.pending:
+            if self.snapshot is None:
+                self.snapshot = snapshot_digest(self.path)
+            with open(self.journal_path, "a") as f:
+                if f.tell() == 0:
+                    f.write(json.dumps({"snapshot": self.snapshot}) + "\n")
+                f.writelines(self.pending)
+            self.logged += len(self.pending)
+            self.pending = []
+
+    def compact(self, trail: Trail) -> None:
+        """
+        Writes a full snapshot of the trail and clears the log.
+        The log is headed with the previous snapshot, so should this stop
+        between replacing the snapshot and removing the log, loading ignores it.
+        """
+        temporary = self.path + ".tmp"
+        with open(temporary, "w") as f:
+            serialize_file(trail, f)
+        self.snapshot = snapshot_digest(temporary)
+        os.replace(temporary, self.path)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.logged = 0
+        self.pending = []